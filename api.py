@@ -1,50 +1,132 @@
 import os
 import shutil
+import uuid
+import mimetypes
+import asyncio
 import uvicorn
 import time
-from fastapi import FastAPI, UploadFile, File, HTTPException, Query
-from starlette.responses import FileResponse
-from typing import List
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Depends
+from starlette.responses import StreamingResponse
+from typing import List, Optional
 
 # Import services from src package
 from src.services.s3_service import LocalS3Service
 from src.services.file_service import LocalFileService
-
-app = FastAPI(title="Local RAG Parser API")
+from src.services.job_queue import JobQueue, run_workers
+from src.services.chunker import Chunker
+from src.services.tokenizer import estimate_tokens
+from src.services.ocr_service import start_ocr_pool, stop_ocr_pool
+from src.services.ocr_cache import configure_ocr_cache
+from src.models.models import OutputOptions, ParseOptions
+from src.schemas import OutputFormat
+from src.core.detector import get_stream_for_file
 
 # Initialize services
 s3_service = LocalS3Service(base_path="local_storage")
-file_service = LocalFileService(s3_service=s3_service)
+# Бюджет чанка в токенах под лимит модели эмбеддингов (0 - как раньше, 500 символов)
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "0"))
+# Сколько файлов парсится одновременно (семафор + отдельный пул потоков)
+file_service = LocalFileService(
+    s3_service=s3_service,
+    max_concurrency=int(os.getenv("PARSER_MAX_CONCURRENCY", "4")),
+    chunker=Chunker(CHUNK_TOKENS, CHUNK_TOKENS // 5, tokenizer=estimate_tokens) if CHUNK_TOKENS else None
+)
+# Очередь фоновых задач; воркеры можно поднять и отдельным процессом (python -m src.services.job_queue)
+job_queue = JobQueue(os.path.join(s3_service.base_path, "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Кэш результатов OCR по хэшу картинки страницы, МБ на диске (0 - выключен)
+OCR_CACHE_MB = int(os.getenv("OCR_CACHE_MB", "256"))
+if OCR_CACHE_MB > 0:
+    configure_ocr_cache(os.path.join(s3_service.base_path, "ocr_cache"), OCR_CACHE_MB * 1024 * 1024)
+# Процессы OCR с прогретой моделью, общие для всех запросов (0 - одна модель в процессе API, как раньше)
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "0"))
+# Потоков torch на процесс OCR (0 - поровну делим ядра между процессами)
+OCR_THREADS_PER_WORKER = int(os.getenv("OCR_THREADS_PER_WORKER", "0"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    stop = asyncio.Event()
+    workers_task = None
+    if OCR_WORKERS > 0:
+        start_ocr_pool(OCR_WORKERS, OCR_THREADS_PER_WORKER or None)
+    if JOB_WORKERS > 0:
+        job_queue.requeue_stale()
+        workers_task = asyncio.create_task(run_workers(job_queue, file_service, JOB_WORKERS, stop))
+    yield
+    stop.set()
+    if workers_task:
+        await workers_task
+    if OCR_WORKERS > 0:
+        await asyncio.to_thread(stop_ocr_pool)
+
+app = FastAPI(title="Local RAG Parser API", lifespan=lifespan)
+
+def parse_options(
+    ocr_enabled: bool = Query(True, description="Включить OCR для сканов"),
+    workers: int = Query(1, ge=1, description="Количество процессов для постраничного парсинга PDF"),
+    ocr_batch_size: int = Query(0, ge=0, description="Сколько страниц распознавать одним батчем OCR (0 - постранично)"),
+    excel_read_only: bool = Query(False, description="Потоковое чтение больших Excel (без объединенных ячеек)"),
+    excel_rows_per_unit: int = Query(0, ge=0, description="Резать листы Excel на блоки по N строк (0 - один блок на лист)"),
+    image_max_side: int = Query(2560, ge=0, description="Уменьшать изображения до этой длинной стороны перед OCR (0 - полный размер)"),
+    image_grayscale: bool = Query(True, description="Распознавать изображения в оттенках серого"),
+    image_binarize: bool = Query(False, description="Бинаризовать изображения перед OCR (для бледных сканов)")
+) -> ParseOptions:
+    """Общие параметры парсинга для /parse и /parse/batch."""
+    return ParseOptions(
+        use_ocr=ocr_enabled,
+        pdf_workers=workers,
+        ocr_batch_size=ocr_batch_size,
+        excel_read_only=excel_read_only,
+        excel_rows_per_unit=excel_rows_per_unit,
+        image_max_side=image_max_side,
+        image_grayscale=image_grayscale,
+        image_binarize=image_binarize
+    )
+
+def output_options(
+    output_format: OutputFormat = Query(OutputFormat.JSON, description="Формат результата: json | json_compact | json_gzip | json_zstd | msgpack"),
+    omit_redundant: bool = Query(False, description="Не дублировать текст таблиц и doc_id чанков (восстанавливаются при чтении)")
+) -> OutputOptions:
+    """Формат сохраняемого ParsedDocument для /parse, /parse/batch и /jobs."""
+    return OutputOptions(format=output_format, omit_redundant=omit_redundant)
 
 @app.post("/parse")
 async def parse_file(
     file: UploadFile = File(...),
-    ocr_enabled: bool = Query(True, description="Включить OCR для сканов"),
-    max_pages: int = Query(None, description="Лимит страниц для обработки")
+    options: ParseOptions = Depends(parse_options),
+    output: OutputOptions = Depends(output_options),
+    max_pages: int = Query(None, description="Лимит страниц для обработки"),
+    stream: bool = Query(False, description="Отдавать чанки потоком NDJSON по мере готовности"),
+    previous: Optional[UploadFile] = File(None, description="Прошлый результат парсинга этого файла: неизмененные страницы PDF и листы Excel не парсятся заново")
 ):
     """
     Парсит загруженный файл, сохраняет результат локально (как S3) 
     и возвращает ссылки на скачивание.
+    С stream=true отдает NDJSON: записи чанков по мере парсинга и финальную запись с метаданными.
     """
     start_time = time.time()
     
     # Generate a unique file ID (simple timestamp based for now)
-    file_id = str(int(time.time() * 1000))
+    file_id = uuid.uuid4().hex
 
     try:
+        previous_doc = None
+        if previous is not None:
+            previous_doc = await file_service.load_previous(await previous.read(), previous.filename)
+
+        if stream:
+            records = await file_service.stream_file(file, file_id, options, output, previous_doc)
+            return StreamingResponse(records, media_type="application/x-ndjson")
+
         # Process the file using the service layer
-        # Wrap single file in a list as the service expects a list
-        result = await file_service.process_files(
-            files=[file], 
-            file_ids=[file_id]
-        )
-        
-        # Return the first result since we only processed one file
+        result = await file_service.process_file(file, file_id, options, output, previous_doc)
         return {
-            "initial_link": result["initial_links"][0],
-            "parsed_link": result["parsed_links"][0],
-            "content_type": result["content_types"][0],
-            "parsing_time_sec": round(time.time() - start_time, 2)
+            "initial_link": result["initial_link"],
+            "parsed_link": result["parsed_link"],
+            "content_type": result["content_type"],
+            "parsing_time_sec": round(time.time() - start_time, 2),
+            "cache_hit": result["cache_hit"]
         }
 
     except ValueError as ve:
@@ -53,16 +135,110 @@ async def parse_file(
         # Log error here if logger was available
         raise HTTPException(status_code=500, detail=f"Internal Error: {e}")
 
+@app.post("/parse/batch")
+async def parse_batch(
+    files: List[UploadFile] = File(...),
+    options: ParseOptions = Depends(parse_options),
+    output: OutputOptions = Depends(output_options)
+):
+    """
+    Парсит несколько файлов параллельно (не больше PARSER_MAX_CONCURRENCY одновременно).
+    Возвращает результат и время по каждому файлу; ошибка одного файла не валит остальные.
+    """
+    start_time = time.time()
+    batch_id = uuid.uuid4().hex
+    file_ids = [f"{batch_id}_{i}" for i in range(len(files))]
+
+    results = await file_service.process_batch(files=files, file_ids=file_ids, options=options, output=output)
+    return {
+        "results": results,
+        "total_time_sec": round(time.time() - start_time, 2)
+    }
+
+@app.post("/diff")
+async def diff_file(
+    file: UploadFile = File(...),
+    previous: UploadFile = File(..., description="Прошлый ParsedDocument этого документа (json / json.gz / json.zst / msgpack)"),
+    options: ParseOptions = Depends(parse_options),
+    output: OutputOptions = Depends(output_options)
+):
+    """
+    Парсит файл (неизмененные страницы/листы берутся из previous) и сравнивает чанки
+    с прошлым результатом парсинга:
+    added - новые чанки (их нужно эмбеддить), removed - id удаленных чанков,
+    unchanged - пары (chunk_id, previous_chunk_id) для чанков с тем же текстом.
+    """
+    file_id = uuid.uuid4().hex
+    try:
+        previous_doc = await file_service.load_previous(await previous.read(), previous.filename)
+        return await file_service.diff_file(file, file_id, previous_doc, options, output)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Error: {e}")
+
+@app.post("/jobs")
+async def create_job(
+    file: UploadFile = File(...),
+    options: ParseOptions = Depends(parse_options),
+    output: OutputOptions = Depends(output_options)
+):
+    """
+    Ставит файл в очередь на парсинг и сразу возвращает id задачи.
+    Статус и прогресс - через GET /jobs/{job_id}.
+    """
+    job_id = uuid.uuid4().hex
+    # Проверяем формат до сохранения, чтобы не копить заведомо упавшие задачи
+    try:
+        get_stream_for_file(file.filename, options)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    init_key, content_hash = await file_service.store_upload(file, job_id)
+    await asyncio.to_thread(job_queue.enqueue, file.filename, init_key, content_hash, options, job_id, output)
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/jobs/{job_id}"
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Статус задачи: queued | running | done | failed, прогресс по страницам и ссылка на результат."""
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "file_name": job["file_name"],
+        "pages_done": job["pages_done"],
+        "pages_total": job["pages_total"],
+        "parsed_link": job["parsed_link"],
+        "cache_hit": bool(job["cache_hit"]) if job["cache_hit"] is not None else None,
+        "error": job["error"]
+    }
+
 @app.get("/download/{path:path}")
 async def download_file(path: str):
     """
     Serve files from the local storage (imitating S3 public links).
+    The file is streamed in blocks read off the event loop.
     """
-    file_path = os.path.join(s3_service.base_path, path)
-    if not os.path.exists(file_path):
+    if not await s3_service.exists(path):
         raise HTTPException(status_code=404, detail="File not found")
 
-    return FileResponse(file_path)
+    media_type, encoding = mimetypes.guess_type(path)
+    if encoding:
+        # .json.gz / .json.zst отдаем как архив, а не как JSON
+        media_type = f"application/{encoding}"
+    media_type = media_type or "application/octet-stream"
+    size = await asyncio.to_thread(os.path.getsize, s3_service.get_path(path))
+    return StreamingResponse(
+        s3_service.iter_file(path),
+        media_type=media_type,
+        headers={"Content-Length": str(size)}
+    )
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
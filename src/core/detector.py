@@ -1,18 +1,64 @@
 import os
-from src.parsers.excel_parser import parse_excel
-from src.parsers.docx_parser import parse_docx
-from src.parsers.pdf_parser import parse_pdf
-from src.parsers.image_parser import parse_image
+from src.models.models import ParseOptions, ParsedDocument
+from src.core.stream import ProgressCallback
+from typing import Optional
 
-def get_parser_for_file(file_path: str):
+def get_stream_for_file(
+    file_path: str,
+    options: Optional[ParseOptions] = None,
+    progress: Optional[ProgressCallback] = None,
+    previous: Optional[ParsedDocument] = None
+):
+    """
+    Returns a callable path -> UnitStream for the file type.
+    progress(done, total) is forwarded to the parser.
+    previous (an earlier parse of the same file) lets PDF and Excel reuse
+    unchanged pages/sheets; other formats are always parsed in full.
+    Parser modules are imported on demand, so parsing a DOCX never pays for
+    pdfplumber, PIL or the OCR stack.
+    """
+    options = options or ParseOptions()
     ext = file_path.lower().split('.')[-1]
     if ext =='docx':
-        return parse_docx
+        from src.parsers.docx_parser import iter_units
+        return lambda path: iter_units(path, progress=progress)
     elif ext in ['xlsx', 'xls']:
-        return parse_excel
+        from src.parsers.excel_parser import iter_units
+        return lambda path: iter_units(
+            path,
+            read_only=options.excel_read_only,
+            rows_per_unit=options.excel_rows_per_unit,
+            progress=progress,
+            previous=previous
+        )
     elif ext == 'pdf':
-        return lambda path: parse_pdf(path, use_ocr=True)
-    elif ext in ['png', 'jpg', 'jpeg']:
-        return parse_image
+        from src.parsers.pdf_parser import iter_units
+        return lambda path: iter_units(
+            path,
+            use_ocr=options.use_ocr,
+            workers=options.pdf_workers,
+            ocr_batch_size=options.ocr_batch_size,
+            progress=progress,
+            previous=previous
+        )
+    elif ext in ['png', 'jpg', 'jpeg', 'tif', 'tiff']:
+        from src.parsers.image_parser import iter_units
+        return lambda path: iter_units(
+            path,
+            max_side=options.image_max_side,
+            grayscale=options.image_grayscale,
+            binarize=options.image_binarize,
+            progress=progress
+        )
     else:       
-        raise ValueError(f'{ext} format does not supported yet')
\ No newline at end of file
+        raise ValueError(f'{ext} format does not supported yet')
+
+def get_parser_for_file(
+    file_path: str,
+    options: Optional[ParseOptions] = None,
+    progress: Optional[ProgressCallback] = None,
+    previous: Optional[ParsedDocument] = None
+):
+    """Returns a callable path -> ParsedDocument; a thin wrapper over get_stream_for_file."""
+    stream_for = get_stream_for_file(file_path, options, progress, previous)
+    return lambda path: stream_for(path).to_document()
@@ -0,0 +1,41 @@
+from typing import Any, Callable, Dict, Generator, Iterator, Optional, Tuple
+from src.models.models import ContentUnit, ParsedDocument
+from src.core.utils import create_source_info
+
+UnitGenerator = Generator[ContentUnit, None, Tuple[str, Dict[str, Any]]]
+# progress(done, total) - pages for PDF, sheets for Excel, 1/1 for single-part documents
+ProgressCallback = Callable[[int, int], None]
+
+class UnitStream:
+    """
+    ContentUnits of a document, yielded while the parser is still running.
+    The wrapped generator returns (doc_id, metadata) when it is exhausted;
+    both are only available after the stream has been fully consumed.
+    """
+    def __init__(self, generator: UnitGenerator, file_path: str):
+        self._generator = generator
+        self.file_path = file_path
+        self.doc_id: Optional[str] = None
+        self.metadata: Optional[Dict[str, Any]] = None
+        self._consumed = False
+
+    def __iter__(self) -> Iterator[ContentUnit]:
+        if self._consumed:
+            raise RuntimeError("UnitStream can only be iterated once")
+        self._consumed = True
+        self.doc_id, self.metadata = yield from self._generator
+
+    @property
+    def finished(self) -> bool:
+        return self.doc_id is not None
+
+    def to_document(self) -> ParsedDocument:
+        """Consume the stream and build the ParsedDocument the list-based parsers return."""
+        units = list(self)
+        return ParsedDocument(
+            doc_id=self.doc_id,
+            source=create_source_info(self.file_path),
+            content_units=units,
+            metadata=self.metadata,
+            chunks=[]
+        )
@@ -1,8 +1,4 @@
-from textwrap import indent
-import json
 import sys
-from src.parsers.docx_parser import parse_docx
-from src.parsers.excel_parser import parse_excel
 from src.core.detector import get_parser_for_file
 import os
 from src.services.chunker import Chunker
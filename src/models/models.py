@@ -1,6 +1,7 @@
 from datetime import datetime
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, List, Any, Union
+from src.schemas import OutputFormat
 
 class Chunk(BaseModel):
     chunk_id: str
@@ -21,6 +22,20 @@ class ContentUnit(BaseModel):
     order_index:int = Field(..., description='Block order in document')
     order_index_in_page: Optional[int] = Field(None, description='Block order in page')
 
+class ParseOptions(BaseModel):
+    use_ocr: bool = True
+    pdf_workers: int = Field(1, ge=1, description='Processes for page-parallel PDF parsing')
+    ocr_batch_size: int = Field(0, ge=0, description='Pages per batched OCR pass, 0 = OCR page by page')
+    excel_read_only: bool = Field(False, description='Stream Excel sheets with flat memory (merged cells are not filled)')
+    excel_rows_per_unit: int = Field(0, ge=0, description='Split sheets into table units of this many rows, 0 = one unit per sheet')
+    image_max_side: int = Field(2560, ge=0, description='Downscale images so the longer side fits before OCR, 0 = full resolution')
+    image_grayscale: bool = Field(True, description='OCR images in grayscale')
+    image_binarize: bool = Field(False, description='OCR images as black and white (Otsu threshold), for faint scans')
+
+class OutputOptions(BaseModel):
+    format: OutputFormat = Field(OutputFormat.JSON, description='Serialization of the stored ParsedDocument')
+    omit_redundant: bool = Field(False, description='Drop table unit text and chunk doc_id, rebuilt on load')
+
 class SourceInfo(BaseModel):
     file_name: str
     file_path: str
@@ -10,11 +10,11 @@ from langdetect import detect
 from src.models.models import ContentUnit, ParsedDocument, SourceInfo
 from src.services.table_serializer import TableSerializer
 from src.services.normalizer import Normalizer
-from src.core.utils import create_source_info
+from typing import Optional
+from src.core.stream import UnitStream, ProgressCallback
 
-def parse_docx(file_path: str) -> ParsedDocument:
+def _generate_units(file_path: str, progress: Optional[ProgressCallback]):
     doc = Document(file_path)
-    units: list[ContentUnit] = []
     content_hasher = hashlib.md5()
     order_index = 0
     full_text_for_lang = ""
@@ -41,14 +41,14 @@ def parse_docx(file_path: str) -> ParsedDocument:
                 unit_type = "heading" 
 
             content_hasher.update(cleaned_text.encode("utf-8"))
-            units.append(ContentUnit(
+            yield ContentUnit(
                 type=unit_type,
                 text=cleaned_text,
                 table=None,
                 section_title=block.style.name if unit_type == "heading" else None,
                 order_index=order_index,
                 order_index_in_page=0
-            ))
+            )
             order_index += 1
 
         elif isinstance(block, Table):
@@ -60,20 +60,20 @@ def parse_docx(file_path: str) -> ParsedDocument:
                     if cell._tc == prev_tc:
                         row_cells.append("") 
                     else:
-                        row_cells.append(Normalizer.clean_text(cell.text))
+                        row_cells.append(Normalizer.clean_cell(cell.text))
                     prev_tc = cell._tc
                 table_data.append(row_cells)
             
             serialized_text = TableSerializer.to_row_kv_text(table_data)
             content_hasher.update(serialized_text.encode("utf-8"))
             
-            units.append(ContentUnit(
+            yield ContentUnit(
                 type="table",
                 text=serialized_text,
                 table={"rows": table_data},
                 order_index=order_index,
                 order_index_in_page=0 
-            ))
+            )
             order_index += 1
 
     detected_lang = "unknown"
@@ -83,9 +83,6 @@ def parse_docx(file_path: str) -> ParsedDocument:
     except:
         pass
 
-    doc_id = content_hasher.hexdigest()
-    source = create_source_info(file_path)
-    
     metadata = {
         'language': detected_lang,
         'author': doc.core_properties.author,
@@ -93,11 +90,13 @@ def parse_docx(file_path: str) -> ParsedDocument:
         'pages_count': None, 
         'warnings': []
     }
-    
-    return ParsedDocument(
-        doc_id=doc_id,
-        source=source,
-        content_units=units,
-        metadata=metadata,
-        chunks=[]
-    )
+    if progress:
+        progress(1, 1)
+    return content_hasher.hexdigest(), metadata
+
+def iter_units(file_path: str, progress: Optional[ProgressCallback] = None) -> UnitStream:
+    """Stream DOCX paragraphs and tables in body order."""
+    return UnitStream(_generate_units(file_path, progress), file_path)
+
+def parse_docx(file_path: str) -> ParsedDocument:
+    return iter_units(file_path).to_document()
@@ -1,80 +1,377 @@
-import pandas as pd
-import hashlib, os, datetime, openpyxl
-from typing import List, Any    
+import io, hashlib, os, re, datetime, posixpath, zipfile, openpyxl
+import xml.etree.ElementTree as ET
+from typing import List, Any, Dict, Tuple, Optional
 from src.models.models import ContentUnit, ParsedDocument, SourceInfo
 from src.services.table_serializer import TableSerializer
 from src.services.normalizer import Normalizer
-from src.core.utils import create_source_info
+from src.core.stream import UnitStream, ProgressCallback
 
-def get_cell_value(sheet, cell):
+def build_merged_value_map(sheet) -> Dict[Tuple[int, int], Any]:
+    """
+    Строит индекс (row, col) -> значение верхней левой ячейки для всех объединенных областей.
+    Строится один раз на лист, дальше поиск по ячейке O(1).
+    """
+    merged_values = {}
+    for merged_range in sheet.merged_cells.ranges:
+        anchor_value = sheet.cell(merged_range.min_row, merged_range.min_col).value
+        for row in range(merged_range.min_row, merged_range.max_row + 1):
+            for col in range(merged_range.min_col, merged_range.max_col + 1):
+                merged_values[(row, col)] = anchor_value
+    return merged_values
+
+def get_cell_value(sheet, cell, merged_values: Optional[Dict[Tuple[int, int], Any]] = None):
     """
     Возвращает значение ячейки, учитывая объединенные области.
     Если ячейка объединена, берет значение из основной (верхней левой) ячейки.
+    merged_values - индекс из build_merged_value_map; без него области перебираются на каждую ячейку.
     """
+    if merged_values is not None:
+        return merged_values.get((cell.row, cell.column), cell.value)
     for merged_range in sheet.merged_cells.ranges:
         if cell.coordinate in merged_range:
             return sheet.cell(merged_range.min_row, merged_range.min_col).value
     return cell.value
-def parse_excel(file_path:str) -> ParsedDocument:
-    wb = openpyxl.load_workbook(file_path, data_only=True)
-    excel_data = pd.read_excel(file_path, sheet_name=None)
+
+def iter_sheet_values(sheet, read_only: bool = False):
+    """
+    Отдает сырые значения строк листа.
+    В read_only режиме openpyxl не знает об объединенных ячейках, поэтому они не заполняются.
+    """
+    if read_only:
+        yield from sheet.iter_rows(values_only=True)
+        return
+    merged_values = build_merged_value_map(sheet)
+    for row in sheet.iter_rows():
+        yield [get_cell_value(sheet, cell, merged_values) for cell in row]
+
+def iter_clean_rows(sheet, read_only: bool = False):
+    """Нормализованные непустые строки листа, по одной."""
+    for values in iter_sheet_values(sheet, read_only):
+        row_values = [Normalizer.clean_cell(str(val)) if val is not None else "" for val in values]
+        if any(row_values):
+            yield row_values
+
+def iter_row_blocks(rows, rows_per_block: int):
+    """
+    Группирует строки листа в блоки по rows_per_block строк данных, не держа лист в памяти.
+    Первая строка считается заголовком и повторяется в каждом блоке.
+    Отдает (headers, block_rows, first_row_number).
+    """
+    headers = None
+    block = []
+    first_row_number = 1
+    for row_values in rows:
+        if headers is None:
+            headers = row_values
+            continue
+        block.append(row_values)
+        if len(block) == rows_per_block:
+            yield headers, block, first_row_number
+            first_row_number += len(block)
+            block = []
+    if block or (headers is not None and first_row_number == 1):
+        yield headers, block, first_row_number
+
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_SHARED_STRING_RE = re.compile(rb'<si>.*?</si>|<si/>', re.S)
+_CELL_RE = re.compile(rb'<c\b([^>]*)>(.*?)</c>', re.S)
+_VALUE_RE = re.compile(rb'<v>(\d+)</v>')
+# Выделение ячеек и активный лист меняются без изменения данных
+_SHEET_VIEWS_RE = re.compile(rb'<sheetViews>.*?</sheetViews>', re.S)
+_STYLE_SECTIONS_RE = re.compile(rb'<numFmts\b.*?</numFmts>|<cellXfs\b.*?</cellXfs>', re.S)
+_BLOCK_SIZE = 1024 * 1024
+_EMPTY_SHEET_XML = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData/></worksheet>'
+)
+
+def _sheet_parts(archive: zipfile.ZipFile) -> Dict[str, str]:
+    """Имя листа -> путь его XML внутри xlsx."""
+    workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+    rels = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    targets = {rel.get("Id"): rel.get("Target") for rel in rels.iter(f"{_PKG_REL_NS}Relationship")}
+    parts = {}
+    for sheet in workbook.iter(f"{_MAIN_NS}sheet"):
+        target = targets.get(sheet.get(f"{_REL_NS}id"))
+        if target:
+            parts[sheet.get("name")] = target.lstrip("/") if target.startswith("/") else posixpath.normpath(f"xl/{target}")
+    return parts
+
+def _read_blocks(archive: zipfile.ZipFile, part: str):
+    """Части xlsx блоками по _BLOCK_SIZE байт, без чтения целиком."""
+    with archive.open(part) as stream:
+        while True:
+            block = stream.read(_BLOCK_SIZE)
+            if not block:
+                return
+            yield block
+
+def _iter_xml_matches(blocks, pattern, start_tag: bytes):
+    """
+    pattern.finditer по XML, читаемому блоками. Между блоками переносится только
+    хвост с незакрытым элементом (от первого start_tag после последнего совпадения).
+    """
+    carry = b""
+    for block in blocks:
+        buffer = carry + block
+        end = 0
+        for match in pattern.finditer(buffer):
+            yield match
+            end = match.end()
+        start = buffer.find(start_tag, end)
+        carry = buffer[start:] if start >= 0 else buffer[max(end, len(buffer) - len(start_tag) + 1):]
+
+def _hashed_blocks(blocks, hasher):
+    """Пропускает блоки дальше, попутно хэшируя XML листа без <sheetViews> (он идет до <sheetData>)."""
+    head = b""
+    for block in blocks:
+        if head is None:
+            hasher.update(block)
+        else:
+            head += block
+            if b"<sheetData" in head:
+                hasher.update(_SHEET_VIEWS_RE.sub(b"", head))
+                head = None
+        yield block
+    if head:
+        hasher.update(_SHEET_VIEWS_RE.sub(b"", head))
+
+class _SheetFingerprints:
+    """
+    Отпечаток листа по сырому XML внутри xlsx, без загрузки книги:
+    XML листа (без sheetViews), используемые им общие строки, форматы чисел (от них
+    зависят даты) и опции, меняющие ContentUnits. XML листов читается потоково,
+    в памяти только хэши общих строк. Для не-xlsx файлов отпечатков нет.
+    """
+    def __init__(self, file_path: str, read_only: bool, rows_per_unit: int):
+        self.tag = f"read_only={read_only}:rows={rows_per_unit}".encode("utf-8")
+        self.archive = None
+        self.parts: Dict[str, str] = {}
+        try:
+            self.archive = zipfile.ZipFile(file_path)
+            names = set(self.archive.namelist())
+            self.parts = {name: part for name, part in _sheet_parts(self.archive).items() if part in names}
+            self.shared_strings = []
+            if "xl/sharedStrings.xml" in names:
+                self.shared_strings = [
+                    hashlib.md5(match.group(0)).digest()
+                    for match in _iter_xml_matches(_read_blocks(self.archive, "xl/sharedStrings.xml"), _SHARED_STRING_RE, b"<si")
+                ]
+            styles = self.archive.read("xl/styles.xml") if "xl/styles.xml" in names else b""
+            self.styles_hash = hashlib.md5(b"".join(_STYLE_SECTIONS_RE.findall(styles))).digest()
+        except (zipfile.BadZipFile, KeyError, ET.ParseError, OSError):
+            self.close()
+            self.parts = {}
+
+    def get(self, name: str) -> Optional[str]:
+        part = self.parts.get(name)
+        if part is None:
+            return None
+        xml_hasher = hashlib.md5()
+        strings_hasher = hashlib.md5()
+        matched = True
+        blocks = _hashed_blocks(_read_blocks(self.archive, part), xml_hasher)
+        for match in _iter_xml_matches(blocks, _CELL_RE, b"<c"):
+            attrs, body = match.groups()
+            if not matched or b't="s"' not in attrs:
+                continue
+            value = _VALUE_RE.search(body)
+            index = int(value.group(1)) if value else -1
+            if 0 <= index < len(self.shared_strings):
+                strings_hasher.update(self.shared_strings[index])
+            else:
+                # Не смогли сопоставить строку - берем общие строки целиком
+                strings_hasher.update(b"".join(self.shared_strings))
+                matched = False
+
+        hasher = hashlib.md5(self.tag)
+        hasher.update(name.encode("utf-8"))
+        hasher.update(self.styles_hash)
+        hasher.update(xml_hasher.digest())
+        hasher.update(strings_hasher.digest())
+        return hasher.hexdigest()
+
+    def close(self) -> None:
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
+
+def sheet_fingerprints(file_path: str, read_only: bool = False, rows_per_unit: int = 0) -> Dict[str, str]:
+    """Отпечатки всех листов xlsx (см. _SheetFingerprints). Для не-xlsx файлов - пустой словарь."""
+    fingerprints = _SheetFingerprints(file_path, read_only, rows_per_unit)
+    try:
+        return {name: fingerprints.get(name) for name in fingerprints.parts}
+    finally:
+        fingerprints.close()
+
+def _without_sheets(file_path: str, blank_parts: set) -> io.BytesIO:
+    """
+    Копия xlsx в памяти, где XML перечисленных листов заменен пустым листом:
+    openpyxl в обычном режиме разбирает все листы при загрузке, а неизмененные
+    листы при повторном парсинге не нужны. Части пишутся без сжатия - быстрее.
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(file_path) as src, zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as dst:
+        for item in src.infolist():
+            data = _EMPTY_SHEET_XML if item.filename in blank_parts else src.read(item.filename)
+            dst.writestr(item.filename, data)
+    buffer.seek(0)
+    return buffer
+
+def _reusable_sheets(previous: Optional[ParsedDocument]) -> Dict[str, List[ContentUnit]]:
+    """Отпечаток листа -> его ContentUnits из прошлого парсинга."""
+    if previous is None:
+        return {}
+    units_by_sheet = {}
+    for unit in previous.content_units:
+        units_by_sheet.setdefault(unit.sheet_name, []).append(unit)
+    return {
+        sheet['fingerprint']: units_by_sheet.get(sheet['sheet_name'], [])
+        for sheet in (previous.metadata or {}).get('sheets') or []
+    }
+
+def _generate_units(
+    file_path: str,
+    read_only: bool,
+    rows_per_unit: int,
+    progress: Optional[ProgressCallback],
+    previous: Optional[ParsedDocument] = None
+):
+    fingerprinter = _SheetFingerprints(file_path, read_only, rows_per_unit)
+    try:
+        return (yield from _generate_sheet_units(file_path, read_only, rows_per_unit, progress, previous, fingerprinter))
+    finally:
+        fingerprinter.close()
+
+def _generate_sheet_units(
+    file_path: str,
+    read_only: bool,
+    rows_per_unit: int,
+    progress: Optional[ProgressCallback],
+    previous: Optional[ParsedDocument],
+    fingerprinter: _SheetFingerprints
+):
+    # Без previous отпечатки нужны только для metadata - каждый лист хэшируется после
+    # своего разбора, а не все листы до первого блока
+    fingerprints = {}
+    reusable = _reusable_sheets(previous)
+    if previous is not None:
+        fingerprints = {name: fingerprinter.get(name) for name in fingerprinter.parts}
+    reused_names = {name for name, fingerprint in fingerprints.items() if fingerprint in reusable}
+    source = file_path
+    if reused_names and not read_only:
+        # read_only читает листы лениво, ему копия не нужна
+        source = _without_sheets(file_path, {fingerprinter.parts[name] for name in reused_names})
+    wb = openpyxl.load_workbook(source, data_only=True, read_only=read_only)
     content_hasher = hashlib.md5()
-    units: List[ContentUnit] = []
     author = None
     try:
         author = wb.properties.creator
     except: 
         pass
     all_sheet_names = wb.sheetnames
+    worksheets_count = len(wb.worksheets)
     order_count = 0
+    warnings = []
+    if read_only:
+        warnings.append("Read-only mode: merged cells are not filled from their anchor cell")
+    sheets = []
+    sheets_reused = 0
     
-    for sheet_name in all_sheet_names:
-        sheet = wb[sheet_name]
-        rows_data = []
-        for row in sheet.iter_rows():
-            row_values = []
-            for cell in row:
-                val = get_cell_value(sheet, cell)
-                row_values.append(Normalizer.clean_text(str(val)) if val is not None else "")
-            if any(row_values):
-                rows_data.append(row_values)
-        if not rows_data:
-            continue
-            
-        headers = rows_data[0] if rows_data else []
-        serialized_text = TableSerializer.to_row_kv_text(rows_data)
-        content_hasher.update(serialized_text.encode('utf-8'))
-        units.append(ContentUnit(
-			type='table', 
-            text=serialized_text,
-			table={
-       				'sheet_name': sheet_name,
-					'headers': headers,
-           			'rows': rows_data},
-			sheet_name = sheet_name,
-			section_title=sheet_name,
-			order_index = order_count,
-            order_index_in_page=0
-		))
-        order_count+=1
+    try:
+        for sheets_done, sheet_name in enumerate(all_sheet_names, start=1):
+            if sheet_name in reused_names:
+                fingerprint = fingerprints[sheet_name]
+                sheets.append({'sheet_name': sheet_name, 'fingerprint': fingerprint})
+                previous_units = reusable[fingerprint]
+                # Лист не изменился - берем блоки из прошлого парсинга, меняем только порядок
+                sheets_reused += 1
+                for unit in previous_units:
+                    content_hasher.update(unit.text.encode('utf-8'))
+                    yield unit.model_copy(update={'order_index': order_count})
+                    order_count += 1
+                if progress:
+                    progress(sheets_done, len(all_sheet_names))
+                continue
+
+            sheet = wb[sheet_name]
+            clean_rows = iter_clean_rows(sheet, read_only)
+            if rows_per_unit > 0:
+                blocks = iter_row_blocks(clean_rows, rows_per_unit)
+            else:
+                sheet_rows = list(clean_rows)
+                blocks = [(sheet_rows[0], sheet_rows[1:], 1)] if sheet_rows else []
+
+            for block_index, (headers, block_rows, first_row_number) in enumerate(blocks):
+                rows_data = [headers] + block_rows
+                serialized_text = TableSerializer.to_row_kv_text(rows_data, first_row_number=first_row_number)
+                content_hasher.update(serialized_text.encode('utf-8'))
+                table = {
+                    'sheet_name': sheet_name,
+                    'headers': headers,
+                    'rows': rows_data
+                }
+                if rows_per_unit > 0:
+                    table['first_row_number'] = first_row_number
+                yield ContentUnit(
+                    type='table',
+                    text=serialized_text,
+                    table=table,
+                    sheet_name=sheet_name,
+                    section_title=sheet_name,
+                    order_index=order_count,
+                    order_index_in_page=block_index
+                )
+                order_count += 1
+            fingerprint = fingerprints.get(sheet_name) if previous is not None else fingerprinter.get(sheet_name)
+            sheets.append({'sheet_name': sheet_name, 'fingerprint': fingerprint})
+            if progress:
+                progress(sheets_done, len(all_sheet_names))
+    finally:
+        if read_only:
+            # read-only книга держит открытый файл до close(), в том числе при ошибке
+            wb.close()
     
-    doc_id = content_hasher.hexdigest()
     props = wb.properties
-    source = create_source_info(file_path)
     
     metadata = {
-		'language': None,
-		'author': author,   
-		'title': props.title,
-		'pages_count': len(excel_data),
-		'sheet_names': all_sheet_names,
-		"warnings": []
-	}
-    
-    return ParsedDocument(
-		doc_id = doc_id, 
-		source = source,
-		content_units = units,
-		metadata = metadata,
-  		chunks = []
-	)
+        'language': None,
+        'author': author,
+        'title': props.title,
+        'pages_count': worksheets_count,
+        'sheet_names': all_sheet_names,
+        "warnings": warnings,
+        'sheets': sheets
+    }
+    if previous is not None:
+        metadata['sheets_reused'] = sheets_reused
+    return content_hasher.hexdigest(), metadata
+
+def iter_units(
+    file_path: str,
+    read_only: bool = False,
+    rows_per_unit: int = 0,
+    progress: Optional[ProgressCallback] = None,
+    previous: Optional[ParsedDocument] = None
+) -> UnitStream:
+    """
+    Потоково отдает табличные блоки книги, загруженной один раз через openpyxl.
+    read_only=True читает листы потоково (память не растет с размером файла),
+    но без заполнения объединенных ячеек.
+    rows_per_unit > 0 режет каждый лист на табличные блоки по столько строк данных
+    (с заголовком в каждом блоке) вместо одного ContentUnit на лист.
+    progress(sheets_done, sheets_count) вызывается после каждого листа.
+    previous - прошлый ParsedDocument этого файла: листы, чей отпечаток есть
+    в его metadata['sheets'], не перечитываются, а берутся оттуда.
+    """
+    return UnitStream(_generate_units(file_path, read_only, rows_per_unit, progress, previous), file_path)
+
+def parse_excel(
+    file_path: str,
+    read_only: bool = False,
+    rows_per_unit: int = 0,
+    previous: Optional[ParsedDocument] = None
+) -> ParsedDocument:
+    return iter_units(file_path, read_only=read_only, rows_per_unit=rows_per_unit, previous=previous).to_document()
@@ -1,14 +1,17 @@
-from PIL import Image
+from PIL import Image, ImageOps
 import hashlib
 import os
 import datetime
 import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 from src.models.models import ContentUnit, ParsedDocument, SourceInfo
 from src.services.normalizer import Normalizer
-from src.services.ocr_service import get_ocr_service
+from src.services.ocr_service import get_ocr_pool, get_ocr_service
+from src.services.ocr_cache import get_ocr_cache, ocr_cache_stats, recognize_cached
 from src.services.table_serializer import TableSerializer
-from src.core.utils import create_source_info
+from src.core.stream import UnitStream, ProgressCallback
 
 
 def parse_table_from_ocr_text(text: str) -> Optional[List[List[str]]]:
@@ -58,65 +61,240 @@ def parse_table_from_ocr_text(text: str) -> Optional[List[List[str]]]:
     return None
 
 
-def parse_image(file_path: str) -> ParsedDocument:
+# Longer side of the image handed to OCR. easyocr's detector works on at most
+# 2560 px (canvas_size), larger inputs only cost decode time and memory
+IMAGE_MAX_SIDE = 2560
+
+
+def _otsu_threshold(img: Image.Image) -> int:
+    """Gray level that best separates the histogram of an "L" image into ink and paper."""
+    histogram = img.histogram()
+    total = sum(histogram)
+    sum_all = sum(level * count for level, count in enumerate(histogram))
+    sum_below = weight_below = 0
+    best_level, best_variance = 127, -1.0
+    for level, count in enumerate(histogram):
+        weight_below += count
+        if weight_below == 0:
+            continue
+        weight_above = total - weight_below
+        if weight_above == 0:
+            break
+        sum_below += level * count
+        mean_below = sum_below / weight_below
+        mean_above = (sum_all - sum_below) / weight_above
+        variance = weight_below * weight_above * (mean_below - mean_above) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+
+def preprocess_image(
+    img: Image.Image,
+    max_side: int = IMAGE_MAX_SIDE,
+    grayscale: bool = True,
+    binarize: bool = False
+) -> Image.Image:
     """
-    Parse image file with table detection support.
-    Uses existing OCR service and heuristic table detection.
+    Prepares an opened image for OCR:
+    - JPEGs (and MPO, the JPEG variant many phone cameras write) are decoded at a
+      reduced scale (Image.draft) when that still covers max_side, and straight to grayscale;
+    - grayscale converts to "L", other modes (palette, RGBA, CMYK, 16 bit) go to RGB;
+    - the longer side is downscaled to max_side (0 = keep full resolution);
+    - EXIF orientation is applied, so phone photos are not OCR'd sideways;
+    - binarize (Otsu threshold, implies grayscale) maps pixels to black or white.
+    """
+    if binarize:
+        grayscale = True
+    is_jpeg = img.format in ('JPEG', 'MPO')
+    if is_jpeg and max_side and max(img.size) > max_side:
+        ratio = max_side / max(img.size)
+        img.draft('L' if grayscale else 'RGB', (round(img.width * ratio), round(img.height * ratio)))
+    elif is_jpeg and grayscale:
+        img.draft('L', img.size)
+
+    # Convert and downscale before rotating: fewer bytes to resize and transpose.
+    # convert() keeps the EXIF data exif_transpose reads
+    if grayscale:
+        if img.mode != 'L':
+            img = img.convert('L')
+    elif img.mode not in ('L', 'RGB'):
+        img = img.convert('RGB')
+    if max_side and max(img.size) > max_side:
+        # resize, not thumbnail: the opened file (a TIFF being seeked through)
+        # must not be resized in place
+        ratio = max_side / max(img.size)
+        size = (max(1, round(img.width * ratio)), max(1, round(img.height * ratio)))
+        img = img.resize(size, Image.Resampling.BICUBIC, reducing_gap=2.0)
+    img = ImageOps.exif_transpose(img)
+
+    if binarize:
+        threshold = _otsu_threshold(img)
+        img = img.point([0] * (threshold + 1) + [255] * (255 - threshold))
+    return img
+
+
+def _pages_count(img: Image.Image) -> int:
+    """
+    Pages of an image: TIFF frames are pages (fax and scanner archives). Other
+    formats' extra frames are not: an MPO phone photo carries a second preview
+    or stereo frame, an animated PNG its animation - only the first frame is read.
+    """
+    return getattr(img, 'n_frames', 1) if img.format == 'TIFF' else 1
+
+
+def _iter_frames(img: Image.Image, max_side: int, grayscale: bool, binarize: bool):
+    """
+    (page_number, stored size, preprocessed frame) per page of a multi-page
+    TIFF, or once for any other image. Frames are decoded one at a time
+    on seek, never all at once.
+    """
+    for index in range(_pages_count(img)):
+        img.seek(index)
+        yield index + 1, img.size, preprocess_image(img, max_side, grayscale, binarize)
+
+
+def _ocr_frame(ocr_service, frame: Image.Image):
+    results, cache_hits = recognize_cached(ocr_service, [frame])
+    return results[0][0], cache_hits[0], frame.size
+
+
+def _ocr_frames(ocr_service, frames, parallel: int):
+    """
+    (page_number, stored size, (text, cache_hit, OCR'd size)) in frame order.
+    With parallel > 1 that many frames are OCR'd concurrently (on the OCR pool)
+    while the next ones are decoded; at most 2 * parallel frames are held.
     """
-    ocr_service = get_ocr_service()
+    if parallel <= 1:
+        for page_number, image_size, frame in frames:
+            yield page_number, image_size, _ocr_frame(ocr_service, frame)
+        return
+
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        in_flight = deque()
+        for page_number, image_size, frame in frames:
+            in_flight.append((page_number, image_size, executor.submit(_ocr_frame, ocr_service, frame)))
+            if len(in_flight) >= 2 * parallel:
+                page_number, image_size, future = in_flight.popleft()
+                yield page_number, image_size, future.result()
+        for page_number, image_size, future in in_flight:
+            yield page_number, image_size, future.result()
+
+
+def _generate_units(
+    file_path: str,
+    max_side: int,
+    grayscale: bool,
+    binarize: bool,
+    progress: Optional[ProgressCallback]
+):
+    ocr_service = get_ocr_service(file_path)
+    # Frames are only OCR'd concurrently on the pool: the reader of this process
+    # already uses all cores for one image
+    ocr_pool = get_ocr_pool()
     img = Image.open(file_path)
+    frames_count = _pages_count(img)
+    multi_frame = frames_count > 1
     
-    units: List[ContentUnit] = []
     hasher = hashlib.md5()
     order_index = 0
     warnings = []
+    pages = []
+    cache_hits = 0
     
-    # Extract text using existing OCR service
-    text = ocr_service.extract_text(img)
-    cleaned_text = Normalizer.clean_text(text)
+    with img:
+        frames = _iter_frames(img, max_side, grayscale, binarize)
+        # Extract text using existing OCR service (or the OCR cache)
+        for page_number, image_size, (text, cache_hit, ocr_image_size) in _ocr_frames(
+            ocr_service, frames, ocr_pool.workers if ocr_pool else 1
+        ):
+            cache_hits += cache_hit
+            # Units and warnings of a multi-frame image carry the frame as the page
+            unit_page = page_number if multi_frame else None
+            prefix = f"Page {page_number}: " if multi_frame else ""
+            cleaned_text = Normalizer.clean_text(text)
+            
+            # Try to detect table structure
+            table_data = parse_table_from_ocr_text(text)
+            
+            if table_data:
+                # Found table structure - create table unit
+                serialized = TableSerializer.to_row_kv_text(table_data)
+                hasher.update(serialized.encode('utf-8'))
+                
+                yield ContentUnit(
+                    type="table",
+                    text=serialized,
+                    table={"rows": table_data},
+                    page_number=unit_page,
+                    order_index=order_index,
+                    order_index_in_page=0
+                )
+                
+                warnings.append(f"{prefix}Table detected with {len(table_data)} rows")
+            else:
+                # No table structure found - extract as plain text
+                hasher.update(cleaned_text.encode('utf-8'))
+                
+                yield ContentUnit(
+                    type="text",
+                    text=cleaned_text,
+                    page_number=unit_page,
+                    order_index=order_index,
+                    order_index_in_page=0
+                )
+                
+                warnings.append(f"{prefix}No table structure detected, extracted as plain text")
+            
+            order_index += 1
+            pages.append({
+                'page_number': page_number,
+                'image_size': list(image_size),
+                'ocr_image_size': list(ocr_image_size),
+                'table_detected': table_data is not None
+            })
+            if progress:
+                progress(page_number, frames_count)
     
-    # Try to detect table structure
-    table_data = parse_table_from_ocr_text(text)
-    
-    if table_data:
-        # Found table structure - create table unit
-        serialized = TableSerializer.to_row_kv_text(table_data)
-        hasher.update(serialized.encode('utf-8'))
-        
-        units.append(ContentUnit(
-            type="table",
-            text=serialized,
-            table={"rows": table_data},
-            order_index=order_index,
-            order_index_in_page=0
-        ))
-        
-        warnings.append(f"Table detected with {len(table_data)} rows")
+    metadata = {
+        'type': 'image',
+        'table_detected': any(page['table_detected'] for page in pages),
+        'warnings': warnings
+    }
+    if multi_frame:
+        metadata['pages_count'] = frames_count
+        metadata['pages'] = pages
     else:
-        # No table structure found - extract as plain text
-        hasher.update(cleaned_text.encode('utf-8'))
-        
-        units.append(ContentUnit(
-            type="text",
-            text=cleaned_text,
-            order_index=0,
-            order_index_in_page=0
-        ))
-        
-        warnings.append("No table structure detected, extracted as plain text")
-    
-    doc_id = hasher.hexdigest()
-    
-    source = create_source_info(file_path)
-    
-    return ParsedDocument(
-        doc_id=doc_id,
-        source=source,
-        content_units=units,
-        metadata={
-            'type': 'image',
-            'table_detected': table_data is not None,
-            'warnings': warnings
-        },
-        chunks=[]
-    )
+        metadata['image_size'] = pages[0]['image_size']
+        metadata['ocr_image_size'] = pages[0]['ocr_image_size']
+    if get_ocr_cache() is not None:
+        metadata['ocr_cache'] = ocr_cache_stats(cache_hits, frames_count - cache_hits)
+    return hasher.hexdigest(), metadata
+
+
+def iter_units(
+    file_path: str,
+    max_side: int = IMAGE_MAX_SIDE,
+    grayscale: bool = True,
+    binarize: bool = False,
+    progress: Optional[ProgressCallback] = None
+) -> UnitStream:
+    """
+    Stream the units of an image file.
+    Uses existing OCR service and heuristic table detection.
+    The image is preprocessed first, see preprocess_image. Multi-frame images
+    (TIFF) give units per frame with page_number set.
+    """
+    return UnitStream(_generate_units(file_path, max_side, grayscale, binarize, progress), file_path)
+
+
+def parse_image(
+    file_path: str,
+    max_side: int = IMAGE_MAX_SIDE,
+    grayscale: bool = True,
+    binarize: bool = False
+) -> ParsedDocument:
+    """
+    Parse image file with table detection support.
+    """
+    return iter_units(file_path, max_side, grayscale, binarize).to_document()
@@ -1,24 +1,26 @@
-import os
-import re
+import time
 import hashlib
 import datetime
-from typing import List, Tuple
+import multiprocessing
+from typing import Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
 import pdfplumber
+from pdfminer.pdftypes import PDFObjRef, PDFStream, resolve1
 from langdetect import detect
 from src.models.models import ContentUnit, ParsedDocument, SourceInfo
-from src.services.normalizer import Normalizer
+from src.services.normalizer import Normalizer, OCR_FIXES, FIX_RE, SPACING_RE
 from src.services.ocr_service import get_ocr_service
-from src.core.utils import create_source_info
+from src.services.ocr_cache import configure_ocr_cache, get_ocr_cache, ocr_cache_stats, recognize_cached
+from src.core.stream import UnitStream, ProgressCallback
 from src.services.table_serializer import TableSerializer
 
-OCR_FIXES = {
-    "morelless": "more/less", "rvn": "run", "eqwal": "equal", 
-    "yow": "you", "vvith": "with", "vvas": "was", "tlie": "the",
-    "n i m p r o vement": "improvement", "rvnning": "running"
-}
-
-FIX_RE = re.compile(r'\b(' + '|'.join(map(re.escape, OCR_FIXES.keys())) + r')\b', re.IGNORECASE)
-SPACING_RE = re.compile(r'(?<=\b\w)\s+(?=\w\b)')
+# Render resolutions tried in order while OCR confidence stays below OCR_MIN_CONFIDENCE
+OCR_DPI_STEPS = (150, 300)
+OCR_MIN_CONFIDENCE = 0.6
+# Images smaller than this (in points) on a page with text are not OCR'd: logos, icons
+OCR_MIN_REGION_SIZE = 36
+# An image covering this share of the page is a scan: OCR the whole page
+OCR_FULL_PAGE_RATIO = 0.8
 
 def super_clean_text(text: str) -> str:
     if not text: return ""
@@ -91,95 +93,414 @@ def extract_text_excluding_tables(page, table_bboxes: List[Tuple]) -> str:
     return filtered_page.extract_text() or ""
 
 
-def parse_pdf(file_path: str, use_ocr: bool = True) -> ParsedDocument:
-    units: List[ContentUnit] = []
+def _parse_page(page, page_number: int, use_ocr: bool, defer_ocr: bool = False, ocr_owner: Optional[str] = None) -> dict:
+    """
+    Extract one page into position-less unit fields.
+    order_index is assigned later, when pages are merged in document order.
+    With defer_ocr the OCR targets are left in the result for a batched _run_ocr.
+    """
+    page_units = []
+    warnings = []
+    found_tables = page.find_tables()
+    table_bboxes = []
+
+    # Process tables first
+    if found_tables:
+        for table in found_tables:
+            table_bboxes.append(table.bbox)
+            table_data = table.extract()
+            cleaned_table = []
+
+            if table_data:
+                for row in table_data:
+                    cleaned_row = [Normalizer.clean_pdf_cell(str(cell)) if cell else "" for cell in row]
+                    if any(cleaned_row):
+                        cleaned_table.append(cleaned_row)
+
+            if cleaned_table:
+                # Apply forward-fill for empty cells
+                cleaned_table = forward_fill_table(cleaned_table)
+
+                # Check if first row is prose (not a proper header)
+                if is_prose_header(cleaned_table[0]):
+                    # Treat all rows as data, use generic column names
+                    warnings.append(f"Page {page_number}: Table header detected as prose, using generic column names")
+
+                serialized = TableSerializer.to_row_kv_text(cleaned_table)
+                page_units.append(dict(
+                    type="table",
+                    text=serialized,
+                    table={"rows": cleaned_table},
+                    page_number=page_number,
+                    bbox=list(table.bbox)
+                ))
+
+    text = extract_text_excluding_tables(page, table_bboxes)
+    cleaned_text = Normalizer.clean_text(text)
+    page_result = {
+        'page_number': page_number,
+        'units': page_units,
+        'text': '',
+        'warnings': warnings,
+        'ocr_used': False,
+        # OCR render resolution, seconds spent in OCR and image regions OCR'd
+        # (0 = the whole page); None / 0.0 when the page was not OCR'd
+        'ocr_dpi': None,
+        'ocr_time': 0.0,
+        'ocr_regions': None
+    }
+
+    if len(cleaned_text) < 50 and use_ocr:
+        regions = _image_regions(page) if cleaned_text else []
+        page_result['ocr_targets'] = _ocr_targets(page, regions)
+        page_result['ocr_regions'] = len(regions)
+        page_result['fallback_text'] = cleaned_text
+        if defer_ocr:
+            # Text units are added once the batched OCR pass has run
+            return page_result
+        _run_ocr([page_result], batched=False, owner=ocr_owner)
+        return page_result
+
+    _add_text_units(page_result, cleaned_text)
+    return page_result
+
+
+def _add_text_units(page_result: dict, cleaned_text: str) -> None:
+    # cleaned_text is clean_text output, the OCR fixes are the only pass left
+    cleaned_text = Normalizer.fix_ocr_artifacts(cleaned_text)
+    page_result['text'] = cleaned_text
+    if cleaned_text:
+        blocks = [b.strip() for b in cleaned_text.split('\n\n') if b.strip()]
+
+        for block in blocks:
+            section_title = None
+            if len(block) < 100 and not block.endswith('.'):
+                section_title = block
+
+            page_result['units'].append(dict(
+                type="text",
+                text=block,
+                page_number=page_result['page_number'],
+                section_title=section_title
+            ))
+
+
+def _image_regions(page) -> List[Tuple[float, float, float, float]]:
+    """
+    Bboxes of the embedded images worth OCR-ing, top to bottom. Empty when an image
+    covers most of the page (a scan): then the whole page is rendered anyway.
+    """
+    x0, top, x1, bottom = page.bbox
+    page_area = (x1 - x0) * (bottom - top)
+    regions = []
+    for image in page.images:
+        bbox = (max(image['x0'], x0), max(image['top'], top), min(image['x1'], x1), min(image['bottom'], bottom))
+        width, height = bbox[2] - bbox[0], bbox[3] - bbox[1]
+        if width < OCR_MIN_REGION_SIZE or height < OCR_MIN_REGION_SIZE:
+            continue
+        if width * height >= OCR_FULL_PAGE_RATIO * page_area:
+            return []
+        regions.append(bbox)
+    return sorted(regions, key=lambda bbox: (bbox[1], bbox[0]))
+
+
+def _ocr_targets(page, regions: List[Tuple[float, float, float, float]]) -> List[Callable]:
+    """
+    Renderers (dpi -> PIL image) of what to OCR on a text-poor page: the image
+    regions when the page already has some text, otherwise the whole page.
+    Rendering is left to the OCR pass, so deferred pages hold no images.
+    """
+    if regions:
+        return [lambda dpi, bbox=bbox: page.crop(bbox).to_image(resolution=dpi).original for bbox in regions]
+    return [lambda dpi: page.to_image(resolution=dpi).original]
+
+
+def _run_ocr(pending: List[dict], batched: bool = True, owner: Optional[str] = None) -> None:
+    """
+    OCR the targets of text-poor pages and finish their text units.
+    Renders found in the OCR cache are not recognized again.
+    Targets are rendered at the first of OCR_DPI_STEPS and only those recognized
+    below OCR_MIN_CONFIDENCE are rendered again at the next step; the most
+    confident result is kept. With batched, each step is one batched inference.
+    Falls back to the pdfplumber text of each page if OCR fails.
+    owner (the PDF path) is the fair-scheduling key when OCR runs in a pool.
+    """
+    if not pending:
+        return
+    targets = [(page_result, render) for page_result in pending for render in page_result.pop('ocr_targets')]
+    for page_result in pending:
+        page_result['ocr_cache_hits'] = page_result['ocr_cache_misses'] = 0
+    # Per target: (text, confidence, dpi); per page: OCR seconds
+    best = [None] * len(targets)
+    seconds = {id(page_result): 0.0 for page_result in pending}
+    try:
+        ocr_service = get_ocr_service(owner)
+        todo = list(range(len(targets)))
+        for dpi in OCR_DPI_STEPS:
+            start = time.perf_counter()
+            images = [targets[i][1](dpi) for i in todo]
+            results, cache_hits = recognize_cached(ocr_service, images, batched)
+            del images
+            # Batch time is shared by the pages of the batch in proportion to their targets
+            share = (time.perf_counter() - start) / len(todo)
+            for i, (text, confidence), cache_hit in zip(todo, results, cache_hits):
+                page_result = targets[i][0]
+                seconds[id(page_result)] += share
+                page_result['ocr_cache_hits' if cache_hit else 'ocr_cache_misses'] += 1
+                if best[i] is None or confidence >= best[i][1]:
+                    best[i] = (text, confidence, dpi)
+            todo = [i for i in todo if best[i][1] < OCR_MIN_CONFIDENCE]
+            if not todo:
+                break
+    except Exception as e:
+        best = None
+        for page_result in pending:
+            page_result['warnings'].append(f"OCR failed on page {page_result['page_number']}: {e}")
+
+    for page_result in pending:
+        cleaned_text = page_result.pop('fallback_text')
+        page_result['ocr_time'] = round(seconds[id(page_result)], 3)
+        if best is not None:
+            page_best = [best[i] for i, (owner, _) in enumerate(targets) if owner is page_result]
+            page_result['ocr_dpi'] = max(dpi for _, _, dpi in page_best)
+            ocr_text = Normalizer.clean_text("\n".join(text for text, _, _ in page_best))
+            if ocr_text:
+                page_result['ocr_used'] = True
+            if page_result['ocr_regions']:
+                # Region OCR adds to the text pdfplumber found instead of replacing it
+                ocr_text = f"{cleaned_text} {ocr_text}".strip()
+            cleaned_text = ocr_text
+        _add_text_units(page_result, cleaned_text)
+    pending.clear()
+
+
+def _iter_parsed_pages(numbered_pages, use_ocr: bool, ocr_batch_size: int, ocr_owner: Optional[str] = None):
+    """
+    Parse (page_number, page) pairs in order. With ocr_batch_size > 1, OCR-needed
+    pages are collected and recognized together in batches of that size, then
+    yielded in page order. Pages are only held from the first page waiting for OCR
+    on; while none is waiting, each page is yielded as soon as it is parsed.
+    """
+    if ocr_batch_size <= 1 or not use_ocr:
+        for page_number, page in numbered_pages:
+            yield _parse_page(page, page_number, use_ocr, ocr_owner=ocr_owner)
+        return
+
+    window = []
+    pending = []
+    for page_number, page in numbered_pages:
+        page_result = _parse_page(page, page_number, use_ocr, defer_ocr=True)
+        needs_ocr = 'ocr_targets' in page_result
+        if not pending and not needs_ocr:
+            yield page_result
+            continue
+        window.append(page_result)
+        if needs_ocr:
+            pending.append(page_result)
+        if len(pending) >= ocr_batch_size:
+            _run_ocr(pending, owner=ocr_owner)
+            yield from window
+            window = []
+    _run_ocr(pending, owner=ocr_owner)
+    yield from window
+
+
+def _parse_pages(file_path: str, page_numbers: List[int], use_ocr: bool, ocr_batch_size: int = 0) -> List[dict]:
+    """
+    Process-pool worker: opens the PDF itself and parses the given pages.
+    """
+    with pdfplumber.open(file_path) as pdf:
+        numbered_pages = [(n, pdf.pages[n - 1]) for n in page_numbers]
+        return list(_iter_parsed_pages(numbered_pages, use_ocr, ocr_batch_size, file_path))
+
+
+def _init_page_worker(ocr_cache_dir: Optional[str], ocr_cache_max_bytes: int) -> None:
+    """Process-pool initializer: workers start clean, so the OCR cache is set up again."""
+    configure_ocr_cache(ocr_cache_dir, ocr_cache_max_bytes)
+
+
+def _page_ranges(pages_count: int, workers: int) -> List[Tuple[int, int]]:
+    """
+    Split pages into contiguous shards, a few per worker so slow pages balance out.
+    """
+    shard_size = max(1, -(-pages_count // (workers * 4)))
+    return [(start, min(start + shard_size, pages_count)) for start in range(0, pages_count, shard_size)]
+
+
+def _iter_page_results(pdf, file_path: str, use_ocr: bool, workers: int, ocr_batch_size: int, reused: Dict[int, dict]):
+    """
+    Page results in page order: pages in `reused` come from the previous parse,
+    the rest are extracted (in a process pool with workers > 1).
+    """
+    todo = [n for n in range(1, len(pdf.pages) + 1) if n not in reused]
+    if workers > 1 and len(todo) > 1:
+        shards = [todo[start:end] for start, end in _page_ranges(len(todo), workers)]
+        ocr_cache = get_ocr_cache()
+        # Not fork: this runs in a server thread while other threads (OCR pool
+        # dispatch, cache locks) may hold locks a forked child would inherit held
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        executor = ProcessPoolExecutor(
+            max_workers=min(workers, len(shards)),
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_init_page_worker,
+            initargs=(ocr_cache.cache_dir, ocr_cache.max_bytes) if ocr_cache else (None, 0)
+        )
+        # map() yields shards in page order as soon as each one is done
+        parsed = (
+            page_result
+            for shard in executor.map(
+                _parse_pages,
+                [file_path] * len(shards),
+                shards,
+                [use_ocr] * len(shards),
+                [ocr_batch_size] * len(shards)
+            )
+            for page_result in shard
+        )
+    else:
+        executor = None
+        parsed = _iter_parsed_pages(((n, pdf.pages[n - 1]) for n in todo), use_ocr, ocr_batch_size, file_path)
+
+    try:
+        for page_number in range(1, len(pdf.pages) + 1):
+            yield reused[page_number] if page_number in reused else next(parsed)
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+
+def _hash_resources(hasher, resources, seen: set) -> None:
+    resources = resolve1(resources) or {}
+    xobjects = resolve1(resources.get('XObject')) or {}
+    for name in sorted(xobjects, key=str):
+        ref = xobjects[name]
+        if isinstance(ref, PDFObjRef):
+            if ref.objid in seen:
+                continue
+            seen.add(ref.objid)
+        xobject = resolve1(ref)
+        if not isinstance(xobject, PDFStream):
+            continue
+        hasher.update(str(name).encode('utf-8'))
+        data = xobject.get_rawdata()
+        hasher.update(data if data is not None else xobject.get_data())
+        # Form XObjects carry their own resources
+        _hash_resources(hasher, xobject.get('Resources'), seen)
+
+    fonts = resolve1(resources.get('Font')) or {}
+    for name in sorted(fonts, key=str):
+        font = resolve1(fonts[name]) or {}
+        hasher.update(f"{name}={font.get('BaseFont')}".encode('utf-8'))
+
+
+def page_fingerprint(page, use_ocr: bool) -> str:
+    """
+    Fingerprint of a page from its raw PDF objects: content streams, images and
+    form XObjects, font names and page boxes, plus the OCR flag (it changes the units).
+    No layout analysis is needed, so every page can be checked cheaply on a re-parse.
+    """
+    page_obj = page.page_obj
+    hasher = hashlib.md5(f"ocr={use_ocr}".encode('utf-8'))
+    hasher.update(repr((page_obj.mediabox, page_obj.cropbox, page_obj.rotate)).encode('utf-8'))
+    for stream in page_obj.contents:
+        stream = resolve1(stream)
+        if isinstance(stream, PDFStream):
+            hasher.update(stream.get_data())
+    _hash_resources(hasher, page_obj.resources, set())
+    return hasher.hexdigest()
+
+
+def _reusable_pages(previous: Optional[ParsedDocument]) -> Dict[str, dict]:
+    """
+    fingerprint -> page record and units of the previous parse.
+    Documents parsed before fingerprints were stored have nothing to reuse.
+    """
+    if previous is None:
+        return {}
+    units_by_page = {}
+    for unit in previous.content_units:
+        units_by_page.setdefault(unit.page_number, []).append(unit)
+    return {
+        page['fingerprint']: {**page, 'units': units_by_page.get(page['page_number'], [])}
+        for page in (previous.metadata or {}).get('pages') or []
+    }
+
+
+def _reused_page_result(previous_page: dict, page_number: int) -> dict:
+    """Page result built from the previous parse, moved to page_number."""
+    units = [
+        unit.model_dump(exclude={'order_index', 'order_index_in_page'}) | {'page_number': page_number}
+        for unit in previous_page['units']
+    ]
+    return {
+        'page_number': page_number,
+        'units': units,
+        'text': '\n\n'.join(u['text'] for u in units if u['type'] == 'text'),
+        'warnings': list(previous_page['warnings']),
+        'ocr_used': previous_page['ocr_used'],
+        # How the reused units were produced; no OCR ran for them in this parse
+        'ocr_dpi': previous_page.get('ocr_dpi'),
+        'ocr_time': 0.0,
+        'ocr_regions': previous_page.get('ocr_regions')
+    }
+
+
+def _generate_units(
+    file_path: str,
+    use_ocr: bool,
+    workers: int,
+    ocr_batch_size: int,
+    progress: Optional[ProgressCallback],
+    previous: Optional[ParsedDocument] = None
+):
     hasher = hashlib.md5()
     order_index = 0
     warnings = []
     full_text_for_lang = ""
     ocr_actually_used = False
-    file_stats = os.stat(file_path)
-    
+    pages = []
+    ocr_cache_hits = ocr_cache_misses = 0
+
     with pdfplumber.open(file_path) as pdf:
         pages_count = len(pdf.pages)
         pdf_meta = pdf.metadata
-        
-        for page_number, page in enumerate(pdf.pages, start=1):
-            found_tables = page.find_tables()
-            table_bboxes = []
-            order_index_in_page = 0
-            
-            # Process tables first
-            if found_tables:
-                for table in found_tables:
-                    table_bboxes.append(table.bbox)
-                    table_data = table.extract()
-                    cleaned_table = []
-                    
-                    if table_data:
-                        for row in table_data:
-                            cleaned_row = [super_clean_text(Normalizer.clean_text(str(cell) if cell else "")) for cell in row]
-                            if any(cleaned_row):
-                                cleaned_table.append(cleaned_row)
-                    
-                    if cleaned_table:
-                        # Apply forward-fill for empty cells
-                        cleaned_table = forward_fill_table(cleaned_table)
-                        
-                        # Check if first row is prose (not a proper header)
-                        if is_prose_header(cleaned_table[0]):
-                            # Treat all rows as data, use generic column names
-                            warnings.append(f"Page {page_number}: Table header detected as prose, using generic column names")
-                        
-                        serialized = TableSerializer.to_row_kv_text(cleaned_table)
-                        hasher.update(serialized.encode("utf-8"))
-                        units.append(ContentUnit(
-                            type="table",
-                            text=serialized,
-                            table={"rows": cleaned_table},
-                            page_number=page_number,
-                            bbox=list(table.bbox),
-                            order_index=order_index,
-                            order_index_in_page=order_index_in_page
-                        ))
-                        order_index += 1
-                        order_index_in_page += 1
-
-            text = extract_text_excluding_tables(page, table_bboxes)
-            cleaned_text = Normalizer.clean_text(text)
-            
-            if len(cleaned_text) < 50 and use_ocr:
-                try:
-                    im = page.to_image(resolution=300).original
-                    ocr_text = get_ocr_service().extract_text(im)
-                    cleaned_text = Normalizer.clean_text(ocr_text)
-                    if cleaned_text:
-                        ocr_actually_used = True
-                except Exception as e:
-                    warnings.append(f"OCR failed on page {page_number}: {e}")
-            cleaned_text = Normalizer.dehyphenate(cleaned_text)
-            cleaned_text = super_clean_text(cleaned_text)
-            if cleaned_text:
-                if len(full_text_for_lang) < 1000:
-                    full_text_for_lang += cleaned_text + " "
-                blocks = [b.strip() for b in cleaned_text.split('\n\n') if b.strip()]
-                
-                for block in blocks:
-                    section_title = None
-                    if len(block) < 100 and not block.endswith('.'):
-                        section_title = block
-                        
-                    hasher.update(block.encode('utf-8'))
-                    units.append(ContentUnit(
-                        type="text",
-                        text=block,
-                        page_number=page_number,
-                        section_title=section_title,
-                        order_index=order_index,
-                        order_index_in_page=order_index_in_page
-                    ))
-                    order_index += 1
-                    order_index_in_page += 1
+        fingerprints = [page_fingerprint(page, use_ocr) for page in pdf.pages]
+        reusable = _reusable_pages(previous)
+        reused = {
+            page_number: _reused_page_result(reusable[fingerprint], page_number)
+            for page_number, fingerprint in enumerate(fingerprints, start=1)
+            if fingerprint in reusable
+        }
+
+        page_results = _iter_page_results(pdf, file_path, use_ocr, workers, ocr_batch_size, reused)
+        for pages_done, page_result in enumerate(page_results, start=1):
+            pages.append({
+                'page_number': page_result['page_number'],
+                'fingerprint': fingerprints[page_result['page_number'] - 1],
+                'ocr_used': page_result['ocr_used'],
+                'ocr_dpi': page_result['ocr_dpi'],
+                'ocr_time': page_result['ocr_time'],
+                'ocr_regions': page_result['ocr_regions'],
+                'warnings': page_result['warnings']
+            })
+            warnings.extend(page_result['warnings'])
+            ocr_cache_hits += page_result.get('ocr_cache_hits', 0)
+            ocr_cache_misses += page_result.get('ocr_cache_misses', 0)
+            if page_result['ocr_used']:
+                ocr_actually_used = True
+            if page_result['text'] and len(full_text_for_lang) < 1000:
+                full_text_for_lang += page_result['text'] + " "
+
+            for order_index_in_page, fields in enumerate(page_result['units']):
+                hasher.update(fields['text'].encode('utf-8'))
+                yield ContentUnit(
+                    **fields,
+                    order_index=order_index,
+                    order_index_in_page=order_index_in_page
+                )
+                order_index += 1
+            if progress:
+                progress(pages_done, pages_count)
 
     # Detect language
     lang = None
@@ -192,22 +513,50 @@ def parse_pdf(file_path: str, use_ocr: bool = True) -> ParsedDocument:
     if ocr_actually_used:
         warnings.append("Document was processed using OCR fallback.")
     
-    doc_id = hasher.hexdigest()
-    source = create_source_info(file_path)
-    
     metadata = {
         'language': lang, 
         'author': pdf_meta.get('Author') if pdf_meta else None,
         'title': pdf_meta.get('Title') if pdf_meta else None,
         'pages_count': pages_count,
         'warnings': warnings,
-        'ocr_enabled': use_ocr
+        'ocr_enabled': use_ocr,
+        'pages': pages
     }
+    if previous is not None:
+        metadata['pages_reused'] = len(reused)
+    if use_ocr and get_ocr_cache() is not None:
+        metadata['ocr_cache'] = ocr_cache_stats(ocr_cache_hits, ocr_cache_misses)
+    return hasher.hexdigest(), metadata
+
+
+def iter_units(
+    file_path: str,
+    use_ocr: bool = True,
+    workers: int = 1,
+    ocr_batch_size: int = 0,
+    progress: Optional[ProgressCallback] = None,
+    previous: Optional[ParsedDocument] = None
+) -> UnitStream:
+    """
+    Stream the units of a PDF page by page.
+    With workers > 1 page ranges are parsed in a process pool and merged back
+    in page order, so the result is identical to the serial path.
+    With ocr_batch_size > 1 text-poor pages are OCR'd in batches instead of one
+    inference call per page.
+    progress(pages_done, pages_count) is called after each page.
+    With a previous ParsedDocument of this file, pages whose fingerprint is in its
+    metadata['pages'] reuse the previous units instead of being extracted and OCR'd again.
+    """
+    return UnitStream(_generate_units(file_path, use_ocr, workers, ocr_batch_size, progress, previous), file_path)
+
 
-    return ParsedDocument(
-        doc_id=doc_id,
-        source=source,
-        content_units=units,
-        metadata=metadata,
-        chunks=[]
-    )
+def parse_pdf(
+    file_path: str,
+    use_ocr: bool = True,
+    workers: int = 1,
+    ocr_batch_size: int = 0,
+    previous: Optional[ParsedDocument] = None
+) -> ParsedDocument:
+    return iter_units(
+        file_path, use_ocr=use_ocr, workers=workers, ocr_batch_size=ocr_batch_size, previous=previous
+    ).to_document()
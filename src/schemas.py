@@ -6,6 +6,13 @@ class ContentType(str, Enum):
     TEXT = "text"
     TABLE = "table"
 
+class OutputFormat(str, Enum):
+    JSON = "json"                  # indent=2, как было
+    JSON_COMPACT = "json_compact"
+    JSON_GZIP = "json_gzip"
+    JSON_ZSTD = "json_zstd"        # нужен пакет zstandard
+    MSGPACK = "msgpack"            # нужен пакет msgpack, колоночный
+
 class FileResponse(BaseModel):
     initial_links: List[str] = Field(description="Ссылки на оригиналы в S3")
     parsed_links: List[str] = Field(description="Ссылки на распарсенные Markdown/JSON в S3")
@@ -0,0 +1,47 @@
+from collections import defaultdict, deque
+from typing import Deque, Dict, List
+from pydantic import BaseModel
+from src.models.models import Chunk, ParsedDocument
+from src.services.chunker import Chunker
+
+class UnchangedChunk(BaseModel):
+    chunk_id: str
+    previous_chunk_id: str
+
+class ChunkDiff(BaseModel):
+    doc_id: str
+    previous_doc_id: str
+    added: List[Chunk]
+    removed: List[str]
+    unchanged: List[UnchangedChunk]
+
+def diff_chunks(previous: ParsedDocument, current: ParsedDocument) -> ChunkDiff:
+    """
+    Compare the chunks of two parses of a document by text.
+    Chunk ids include doc_id and position, so an edit earlier in the document
+    changes the ids of later chunks; matching on the text hash still reports
+    those chunks as unchanged (with both ids), and only `added` needs embedding.
+    Identical texts are paired in document order.
+    """
+    previous_by_hash: Dict[str, Deque[Chunk]] = defaultdict(deque)
+    for chunk in previous.chunks:
+        previous_by_hash[Chunker.text_hash(chunk.text)].append(chunk)
+
+    added = []
+    unchanged = []
+    for chunk in current.chunks:
+        candidates = previous_by_hash.get(Chunker.text_hash(chunk.text))
+        if candidates:
+            unchanged.append(UnchangedChunk(chunk_id=chunk.chunk_id, previous_chunk_id=candidates.popleft().chunk_id))
+        else:
+            added.append(chunk)
+
+    matched = {u.previous_chunk_id for u in unchanged}
+    removed = [chunk.chunk_id for chunk in previous.chunks if chunk.chunk_id not in matched]
+    return ChunkDiff(
+        doc_id=current.doc_id,
+        previous_doc_id=previous.doc_id,
+        added=added,
+        removed=removed,
+        unchanged=unchanged
+    )
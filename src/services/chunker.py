@@ -1,18 +1,139 @@
+import re
 import uuid
-from typing import List, Optional
+import hashlib
+from itertools import accumulate
+from typing import Iterable, Iterator, List, Optional
 from src.models.models import ContentUnit, Chunk
 from src.services.table_serializer import TableSerializer
+from src.services.tokenizer import TokenCounter, Tokenizer
+
+# Namespace for chunk ids: uuid5(doc_id, position, text hash)
+CHUNK_ID_NAMESPACE = uuid.UUID("6f1c3a52-3d0e-5b8e-9a41-2c7f0d9e8b13")
+_NAMESPACE_BYTES = CHUNK_ID_NAMESPACE.bytes
+# Word with its trailing whitespace; token-mode blocks are cut between pieces
+_PIECE_RE = re.compile(r"\s*\S+\s*|\s+")
 
 class Chunker:
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 100):
+    # Bump when chunk boundaries or ids change, so cached documents are re-chunked
+    VERSION = 5
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 100, tokenizer: Optional[Tokenizer] = None):
+        """
+        chunk_size and chunk_overlap are in characters, or in tokens when a
+        tokenizer callback (text -> token count) is given; counts are memoized.
+        In token mode the [Section]/[Page] context prefix counts against chunk_size
+        (the embedding model sees it); in characters it is not part of the budget.
+        """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.tokenizer = TokenCounter(tokenizer) if tokenizer else None
+
+    @property
+    def size_unit(self) -> str:
+        """What chunk_size counts: "chars" or the tokenizer name (part of the parse cache key)."""
+        return f"tokens:{self.tokenizer.name}" if self.tokenizer else "chars"
+
+    def _measure(self, text: str) -> int:
+        if not self.tokenizer:
+            return len(text)
+        if len(text) <= self.tokenizer.max_cached_len:
+            return self.tokenizer(text)
+        # Long text: sum of memoized word counts, the measure _iter_token_blocks cuts by
+        return sum(self._token_pieces(text)[1])
+
+    @staticmethod
+    def _context_prefix(section_title: Optional[str], page_number: Optional[int]) -> str:
+        context_prefix = ""
+        if section_title:
+            context_prefix += f"[Section: {section_title}]\n"
+        if page_number:
+            context_prefix += f"[Page: {page_number}] "
+        return context_prefix
+
+    def _budget(self, section_title: Optional[str], page_number: Optional[int]) -> int:
+        """Size left for the chunk body once the context prefix is added (token mode only)."""
+        if not self.tokenizer:
+            return self.chunk_size
+        return max(1, self.chunk_size - self._measure(self._context_prefix(section_title, page_number)))
+
+    def _fits(self, text: str, limit: int) -> bool:
+        """measure(text) <= limit, stopping early on long texts (a 100k-row table is not counted in full)."""
+        if not self.tokenizer or len(text) <= self.tokenizer.max_cached_len:
+            return self._measure(text) <= limit
+        total = 0
+        for piece in _PIECE_RE.finditer(text):
+            total += self.tokenizer(piece.group())
+            if total > limit:
+                return False
+        return True
+
+    def _token_pieces(self, text: str):
+        """Words (with trailing whitespace) of a text and their token counts."""
+        pieces = _PIECE_RE.findall(text)
+        return pieces, self.tokenizer.count_many(pieces)
 
     def split_units(self, units: List[ContentUnit], doc_id: str) -> List[Chunk]:
-        chunks = []
-        current_chunk_text = ""
+        return list(self.iter_chunks(units, doc_id))
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def make_chunk_id(doc_id: str, position: int, text: str) -> str:
+        """
+        Deterministic chunk id: the same document parsed again gets the same ids,
+        so unchanged chunks do not have to be re-embedded.
+        Equals str(uuid.uuid5(CHUNK_ID_NAMESPACE, name)), built without UUID objects
+        (they were most of the chunking time on documents with many chunks).
+        """
+        name = f"{doc_id}:{position}:{Chunker.text_hash(text)}"
+        digest = bytearray(hashlib.sha1(_NAMESPACE_BYTES + name.encode("utf-8")).digest()[:16])
+        digest[6] = (digest[6] & 0x0F) | 0x50  # version 5
+        digest[8] = (digest[8] & 0x3F) | 0x80  # RFC 4122 variant
+        h = digest.hex()
+        return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+    @staticmethod
+    def restamp(chunks: Iterable[Chunk], doc_id: str) -> List[Chunk]:
+        """Move chunks to another doc_id, recomputing their ids."""
+        return [
+            chunk.model_copy(update={
+                "doc_id": doc_id,
+                "chunk_id": Chunker.make_chunk_id(doc_id, position, chunk.text)
+            })
+            for position, chunk in enumerate(chunks)
+        ]
+
+    def iter_chunks(self, units: Iterable[ContentUnit], doc_id: str) -> Iterator[Chunk]:
+        """
+        Yield chunks as units arrive, so a UnitStream can be chunked while the
+        parser is still running. Only the current text buffer is held in memory.
+        For a stream the content doc_id is known only once parsing has finished,
+        so streaming callers pass a provisional key and restamp the chunks after.
+        """
+        for position, chunk in enumerate(self._iter_chunks(units, doc_id)):
+            chunk.chunk_id = self.make_chunk_id(doc_id, position, chunk.text)
+            yield chunk
+
+    def _iter_chunks(self, units: Iterable[ContentUnit], doc_id: str) -> Iterator[Chunk]:
+        # Text buffer is a list of parts joined once per chunk; buffer_len is the
+        # length of that join, so size checks never build the string
+        buffer_parts = []
+        buffer_len = 0
         current_units = []
         current_section = None
+        separator_size = self._measure("\n\n")
+
+        def flush():
+            return self._create_chunk(
+                text="\n\n".join(buffer_parts),
+                doc_id=doc_id,
+                page_number=current_units[0].page_number if current_units else None,
+                section_title=current_section,
+                is_table=False,
+                order_index=current_units[0].order_index if current_units else 0
+            )
         
         for unit in units:
             # Update current section context
@@ -22,21 +143,14 @@ class Chunker:
             # Treat tables specially - they are atomic units unless too large
             if unit.type == "table":
                 # First, flush any accumulated text
-                if current_chunk_text:
-                    chunks.append(self._create_chunk(
-                        text=current_chunk_text,
-                        doc_id=doc_id,
-                        page_number=current_units[0].page_number if current_units else None,
-                        section_title=current_section,
-                        is_table=False,
-                        order_index=current_units[0].order_index if current_units else 0
-                    ))
-                    current_chunk_text = ""
+                if buffer_parts:
+                    yield flush()
+                    buffer_parts = []
+                    buffer_len = 0
                     current_units = []
 
                 # Handle the table
-                table_chunks = self._process_table_unit(unit, doc_id, current_section)
-                chunks.extend(table_chunks)
+                yield from self._process_table_unit(unit, doc_id, current_section)
                 continue
             
             # For text units, try to group them
@@ -45,56 +159,52 @@ class Chunker:
                 continue
 
             # If adding this unit exceeds chunk size, flush current buffer
-            if len(current_chunk_text) + len(unit_text) > self.chunk_size and current_chunk_text:
-                chunks.append(self._create_chunk(
-                    text=current_chunk_text,
-                    doc_id=doc_id,
-                    page_number=current_units[0].page_number if current_units else None,
-                    section_title=current_section,
-                    is_table=False,
-                    order_index=current_units[0].order_index if current_units else 0
-                ))
-                current_chunk_text = ""
+            token_pieces = None
+            if self.tokenizer and len(unit_text) > self.tokenizer.max_cached_len:
+                # Counted once here and reused if the unit has to be split
+                token_pieces = self._token_pieces(unit_text)
+                unit_size = sum(token_pieces[1])
+            else:
+                unit_size = self._measure(unit_text)
+            # The buffered chunk gets the prefix of its first unit's page and the current section
+            budget = self._budget(current_section, (current_units[0] if current_units else unit).page_number)
+            if buffer_len + unit_size > budget and buffer_parts:
+                yield flush()
+                buffer_parts = []
+                buffer_len = 0
                 current_units = []
+                budget = self._budget(current_section, unit.page_number)
 
             # If the unit itself is huge, split it
-            if len(unit_text) > self.chunk_size:
-                text_blocks = self._split_text(unit_text)
-                for block in text_blocks:
-                    chunks.append(self._create_chunk(
+            if unit_size > budget:
+                for block in self._iter_blocks(unit_text, token_pieces, budget):
+                    yield self._create_chunk(
                         text=block,
                         doc_id=doc_id,
                         page_number=unit.page_number,
                         section_title=unit.section_title or current_section,
                         is_table=False,
                         order_index=unit.order_index
-                    ))
+                    )
             else:
                 # Accumulate
-                if current_chunk_text:
-                    current_chunk_text += "\n\n"
-                current_chunk_text += unit_text
+                if buffer_parts:
+                    buffer_len += separator_size
+                buffer_parts.append(unit_text)
+                buffer_len += unit_size
                 current_units.append(unit)
 
         # Flush final buffer
-        if current_chunk_text:
-            chunks.append(self._create_chunk(
-                text=current_chunk_text,
-                doc_id=doc_id,
-                page_number=current_units[0].page_number if current_units else None,
-                section_title=current_section,
-                is_table=False,
-                order_index=current_units[0].order_index if current_units else 0
-            ))
-
-        return chunks
+        if buffer_parts:
+            yield flush()
 
     def _process_table_unit(self, unit: ContentUnit, doc_id: str, section_title: Optional[str]) -> List[Chunk]:
         """
         Process a table unit. If it fits in chunk_size, return 1 chunk.
         If it's too big, split by rows and REPEAT HEADERS in each chunk.
         """
-        if len(unit.text) <= self.chunk_size:
+        budget = self._budget(section_title, unit.page_number)
+        if self._fits(unit.text, budget):
             return [self._create_chunk(
                 text=unit.text,
                 doc_id=doc_id,
@@ -108,7 +218,7 @@ class Chunker:
         # If 'table' field matches the expected structure: {'rows': [['col1', 'col2'], ['val1', 'val2']]}
         if not unit.table or 'rows' not in unit.table or not unit.table['rows']:
             # Fallback: just split text blindly if we don't have structured rows
-            return self._split_large_text_unit(unit, doc_id, section_title, is_table=True)
+            return self._split_large_text_unit(unit, doc_id, section_title, is_table=True, budget=budget)
 
         rows = unit.table['rows']
         if len(rows) < 2:
@@ -121,22 +231,20 @@ class Chunker:
                 order_index=unit.order_index
             )]
 
-        # Extract header and data
-        header_row = rows[0]
-        data_rows = rows[1:]
-        
-        # We will form small tables: [header_row] + subset_of_data_rows
+        # We will form small tables: header + subset of data rows.
+        # Each row is serialized once; a batch only numbers and joins its rows.
+        clean_headers = TableSerializer.clean_headers(rows[0])
         chunks = []
         current_batch = []
-        current_size = 0
+        # Token mode budgets the split note and schema line of every batch too
+        batch_overhead = self._table_batch_overhead(clean_headers, len(rows) - 1) if self.tokenizer else 0
+        current_size = batch_overhead
         
         # Helper to finish a batch
-        def make_chunk_from_batch(batch_rows):
-            # Create a mini-table with original header
-            mini_table = [header_row] + batch_rows
-            text = TableSerializer.to_row_kv_text(mini_table)
+        def make_chunk_from_batch(batch_bodies):
+            text = TableSerializer.assemble(clean_headers, batch_bodies)
             # Add note about splitting
-            text = f"[Table Split: showing {len(batch_rows)} rows]\n" + text
+            text = f"[Table Split: showing {len(batch_bodies)} rows]\n" + text
             return self._create_chunk(
                 text=text,
                 doc_id=doc_id,
@@ -146,16 +254,21 @@ class Chunker:
                 order_index=unit.order_index
             )
 
-        for row in data_rows:
-            # Rough size estimation: sum of char lengths of cells + overhead
-            row_len = sum(len(str(c)) for c in row) + len(row)*10 + 20 
+        data_rows = rows[1:]
+        for row, body in zip(data_rows, TableSerializer.row_bodies(data_rows, clean_headers)):
+            if self.tokenizer:
+                # "\nrow N: " prefix (rows are numbered within the batch) + the serialized row
+                row_len = self._measure(f"\nrow {len(current_batch) + 1}: ") + self._measure(body)
+            else:
+                # Rough size estimation: sum of char lengths of cells + overhead
+                row_len = sum(len(str(c)) for c in row) + len(row)*10 + 20 
             
-            if current_size + row_len > self.chunk_size and current_batch:
+            if current_size + row_len > budget and current_batch:
                 chunks.append(make_chunk_from_batch(current_batch))
                 current_batch = []
-                current_size = 0
+                current_size = batch_overhead
             
-            current_batch.append(row)
+            current_batch.append(body)
             current_size += row_len
             
         if current_batch:
@@ -163,8 +276,14 @@ class Chunker:
             
         return chunks
 
-    def _split_large_text_unit(self, unit: ContentUnit, doc_id: str, section_title: Optional[str], is_table: bool) -> List[Chunk]:
-        text_blocks = self._split_text(unit.text)
+    def _split_large_text_unit(
+        self,
+        unit: ContentUnit,
+        doc_id: str,
+        section_title: Optional[str],
+        is_table: bool,
+        budget: Optional[int] = None
+    ) -> List[Chunk]:
         return [
             self._create_chunk(
                 text=block,
@@ -174,55 +293,127 @@ class Chunker:
                 is_table=is_table,
                 order_index=unit.order_index
             )
-            for block in text_blocks
+            for block in self._iter_blocks(unit.text, budget=budget)
         ]
 
+    def _table_batch_overhead(self, clean_headers: List[str], max_rows: int) -> int:
+        """Tokens of the split note and schema line, sized for the largest possible row count."""
+        return self._measure(
+            f"[Table Split: showing {max_rows} rows]\n" + TableSerializer.schema_line(clean_headers, max_rows)
+        )
+
     def _split_text(self, text: str) -> List[str]:
-        if len(text) <= self.chunk_size:
-            return [text]
+        return list(self._iter_blocks(text))
+
+    def _iter_blocks(self, text: str, token_pieces=None, budget: Optional[int] = None) -> Iterator[str]:
+        """Blocks of text; budget (token mode) is the body size left after the context prefix."""
+        if self.tokenizer:
+            return self._iter_token_blocks(text, token_pieces, budget or self.chunk_size)
+        return self._iter_text_blocks(text)
+
+    def _iter_token_blocks(self, text: str, token_pieces=None, budget: Optional[int] = None) -> Iterator[str]:
+        """
+        Token-mode counterpart of _iter_text_blocks. The text is cut into words
+        with their trailing whitespace, each counted once (memoized, so overlap
+        regions and repeated words cost nothing extra); blocks are spans of whole
+        words up to budget (default chunk_size) tokens, preferring to end at a newline or sentence
+        break within the last fifth of the budget.
+        """
+        pieces, counts = token_pieces or self._token_pieces(text)
+        # offsets[i] - where piece i starts; blocks are slices of the original text
+        offsets = [0, *accumulate(map(len, pieces))]
+        budget = budget or self.chunk_size
+        break_window = max(1, budget // 5)
+        n = len(pieces)
+        start = 0
+        while start < n:
+            total = 0
+            end = start
+            # At least one piece per block, even if it alone is over budget
+            while end < n and (end == start or total + counts[end] <= budget):
+                total += counts[end]
+                end += 1
+
+            if end < n:
+                break_point = -1
+                for marks in ("\n", ". "):
+                    window = 0
+                    for k in range(end, start + 1, -1):
+                        window += counts[k - 1]
+                        if window > break_window:
+                            break
+                        piece = pieces[k - 1]
+                        if (marks == "\n" and "\n" in piece) or (marks == ". " and piece.rstrip().endswith(".")):
+                            break_point = k
+                            break
+                    if break_point != -1:
+                        break
+                if break_point != -1:
+                    end = break_point
+
+            yield text[offsets[start]:offsets[end]]
+            if end >= n:
+                break
+
+            # Step back over up to chunk_overlap tokens, always moving forward
+            next_start = end
+            overlap = 0
+            while next_start - 1 > start and overlap + counts[next_start - 1] <= self.chunk_overlap:
+                next_start -= 1
+                overlap += counts[next_start]
+            start = next_start
+
+    def _iter_text_blocks(self, text: str) -> Iterator[str]:
+        """
+        Yield blocks of at most chunk_size chars, preferring to end at a newline or
+        sentence break within the last 100 chars. Breaks are searched with rfind
+        bounds on the original string; only the yielded blocks are copied.
+        """
+        text_len = len(text)
+        if text_len <= self.chunk_size:
+            yield text
+            return
         
-        blocks = []
         start = 0
-        while start < len(text):
+        while start < text_len:
             end = start + self.chunk_size
             # Try to find a sentence break near the end
-            if end < len(text):
-                # Search back for period or newline
+            if end < text_len:
+                # Search back for period or newline in [window_start, end)
+                window_start = end - 100
+                # A negative window start counts from the end of the text, as a slice would
+                search_from = window_start if window_start >= 0 else max(0, text_len + window_start)
+
                 break_point = -1
-                search_window = text[start + self.chunk_size - 100 : start + self.chunk_size]
-                
-                last_period = search_window.rfind('. ')
-                last_newline = search_window.rfind('\n')
-                
+                last_newline = text.rfind('\n', search_from, end)
                 if last_newline != -1:
-                    break_point = start + self.chunk_size - 100 + last_newline + 1
-                elif last_period != -1:
-                     break_point = start + self.chunk_size - 100 + last_period + 2
+                    break_point = window_start + (last_newline - search_from) + 1
+                else:
+                    last_period = text.rfind('. ', search_from, end)
+                    if last_period != -1:
+                        break_point = window_start + (last_period - search_from) + 2
                      
                 if break_point != -1 and break_point > start:
                     end = break_point
             
-            blocks.append(text[start:end])
+            yield text[start:end]
+            previous_start = start
             start = end - self.chunk_overlap 
             if start < 0: start = 0 # Safety
             
             # Avoid infinite loop if no progress
             if end == start:
                 start += self.chunk_size
-
-        return blocks
+            elif start <= previous_start:
+                # Break point closer to the window start than the overlap - continue without overlap
+                start = end
 
     def _create_chunk(self, text: str, doc_id: str, page_number: Optional[int], section_title: Optional[str], is_table: bool, order_index: int) -> Chunk:
-        context_prefix = ""
-        if section_title:
-            context_prefix += f"[Section: {section_title}]\n"
-        if page_number:
-            context_prefix += f"[Page: {page_number}] "
-            
-        full_content = context_prefix + text
+        full_content = self._context_prefix(section_title, page_number) + text
         
+        # chunk_id depends on the chunk's position and is set by iter_chunks
         return Chunk(
-            chunk_id=str(uuid.uuid4()),
+            chunk_id="",
             doc_id=doc_id,
             text=full_content,
             metadata={
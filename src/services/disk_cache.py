@@ -0,0 +1,108 @@
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+
+class DiskLRUCache:
+    """
+    Base of the on-disk caches: one `<key>.json` file per entry under `cache_dir`,
+    the least recently used entries are evicted once the total size exceeds `max_bytes`.
+
+    Recency and sizes are kept in memory, seeded from the file mtimes when the cache is
+    opened, so reads and writes never list the directory. Every read also touches the
+    file's mtime, which is how processes sharing the directory see each other's reads.
+    The in-memory total only counts what this process has seen, so once it goes over
+    `max_bytes` eviction first re-reads the directory (picking up other processes'
+    writes) and then removes entries down to LOW_WATER of `max_bytes`: the directory
+    is listed once per that much headroom written, not on every write.
+    """
+    LOW_WATER = 0.9
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._rescan()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read(self, key: str) -> Optional[bytes]:
+        """Entry bytes (marking the entry as recently used), or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path, None)
+        except FileNotFoundError:
+            return None
+        self._touch(path, len(data))
+        return data
+
+    def _write(self, key: str, data: bytes) -> None:
+        # Write to a temp file first so readers never see a half-written entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        path = self._path(key)
+        os.replace(tmp_path, path)
+        self._touch(path, len(data))
+
+    def _discard(self, key: str) -> None:
+        """Drop a corrupt or outdated entry."""
+        path = self._path(key)
+        self._remove(path)
+        with self._lock:
+            self._total -= self._entries.pop(path, 0)
+
+    def evict(self) -> None:
+        with self._lock:
+            if self._total <= self.max_bytes:
+                return
+            self._rescan()
+            target = self.max_bytes * self.LOW_WATER
+            while self._total > target and self._entries:
+                path, size = self._entries.popitem(last=False)
+                self._total -= size
+                self._remove(path)
+
+    def _touch(self, path: str, size: int) -> None:
+        """Mark an entry as the most recently used one."""
+        with self._lock:
+            self._total += size - self._entries.pop(path, 0)
+            self._entries[path] = size
+
+    def _rescan(self) -> None:
+        """
+        Rebuild the index from the directory, least recently touched first. File times
+        are only as fine as the kernel tick, so ties keep this process's own order.
+        """
+        rank = {path: i for i, path in enumerate(self._entries)}
+        scanned = sorted(self._scan(), key=lambda entry: (entry[0], rank.get(entry[2], -1)))
+        self._entries = OrderedDict((path, size) for _, size, path in scanned)
+        self._total = sum(self._entries.values())
+
+    def _scan(self) -> List[Tuple[float, int, str]]:
+        """(mtime, size, path) of every entry on disk."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,130 @@
+import gzip
+import json
+from typing import Any, Dict, List
+from src.models.models import ParsedDocument
+from src.schemas import OutputFormat
+from src.services.table_serializer import TableSerializer
+
+_EXTENSIONS = {
+    OutputFormat.JSON: ".json",
+    OutputFormat.JSON_COMPACT: ".json",
+    OutputFormat.JSON_GZIP: ".json.gz",
+    OutputFormat.JSON_ZSTD: ".json.zst",
+    OutputFormat.MSGPACK: ".msgpack",
+}
+
+# Fields that can be rebuilt on load when omit_redundant is used
+_OMITTED_FIELDS = ["table_text", "chunk_doc_id"]
+
+def _require(module_name: str, fmt: OutputFormat):
+    try:
+        return __import__(module_name)
+    except ImportError:
+        raise ValueError(f"Output format '{fmt.value}' requires the '{module_name}' package")
+
+class DocumentSerializer:
+    """
+    Writes ParsedDocument in the selectable output formats.
+    omit_redundant drops table ContentUnit.text (it is TableSerializer output of
+    table.rows) and Chunk.doc_id (same as the document's); loads() rebuilds both.
+    msgpack stores content units and chunks column-wise.
+    """
+    @staticmethod
+    def extension(fmt: OutputFormat) -> str:
+        return _EXTENSIONS[fmt]
+
+    @staticmethod
+    def detect_format(file_name: str) -> OutputFormat:
+        """Format of a stored document by its file name (compact JSON reads as JSON)."""
+        name = file_name.lower()
+        for fmt, extension in _EXTENSIONS.items():
+            if extension != ".json" and name.endswith(extension):
+                return fmt
+        return OutputFormat.JSON
+
+    @staticmethod
+    def dumps(doc: ParsedDocument, fmt: OutputFormat = OutputFormat.JSON, omit_redundant: bool = False) -> bytes:
+        fmt = OutputFormat(fmt)
+        if fmt == OutputFormat.JSON and not omit_redundant:
+            # Historical output, byte for byte
+            return doc.model_dump_json(indent=2).encode("utf-8")
+
+        if omit_redundant:
+            payload = DocumentSerializer._compact_payload(doc)
+            if fmt == OutputFormat.JSON:
+                return json.dumps(payload, indent=2, ensure_ascii=False).encode("utf-8")
+            compact_json = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        else:
+            payload = None
+            compact_json = doc.model_dump_json().encode("utf-8")
+
+        if fmt == OutputFormat.JSON_COMPACT:
+            return compact_json
+        if fmt == OutputFormat.JSON_GZIP:
+            return gzip.compress(compact_json, compresslevel=6)
+        if fmt == OutputFormat.JSON_ZSTD:
+            zstandard = _require("zstandard", fmt)
+            return zstandard.ZstdCompressor(level=3).compress(compact_json)
+
+        msgpack = _require("msgpack", fmt)
+        if payload is None:
+            payload = doc.model_dump(mode="json")
+        payload = dict(payload)
+        payload["content_units"] = _to_columns(payload["content_units"])
+        payload["chunks"] = _to_columns(payload["chunks"])
+        payload["columnar"] = True
+        return msgpack.packb(payload, use_bin_type=True)
+
+    @staticmethod
+    def loads(data: bytes, fmt: OutputFormat = OutputFormat.JSON) -> ParsedDocument:
+        fmt = OutputFormat(fmt)
+        if fmt == OutputFormat.JSON_GZIP:
+            data = gzip.decompress(data)
+        elif fmt == OutputFormat.JSON_ZSTD:
+            data = _require("zstandard", fmt).ZstdDecompressor().decompress(data)
+
+        if fmt == OutputFormat.MSGPACK:
+            payload = _require("msgpack", fmt).unpackb(data, raw=False)
+            payload["content_units"] = _from_columns(payload["content_units"])
+            payload["chunks"] = _from_columns(payload["chunks"])
+            payload.pop("columnar", None)
+        else:
+            payload = json.loads(data)
+
+        omitted = payload.pop("omitted", [])
+        if "table_text" in omitted:
+            for unit in payload["content_units"]:
+                if unit.get("text") is None and unit.get("table") and "rows" in unit["table"]:
+                    unit["text"] = TableSerializer.to_row_kv_text(
+                        unit["table"]["rows"], first_row_number=unit["table"].get("first_row_number", 1)
+                    )
+        if "chunk_doc_id" in omitted:
+            for chunk in payload["chunks"]:
+                chunk["doc_id"] = payload["doc_id"]
+        return ParsedDocument.model_validate(payload)
+
+    @staticmethod
+    def _compact_payload(doc: ParsedDocument) -> Dict[str, Any]:
+        payload = doc.model_dump(mode="json")
+        for unit in payload["content_units"]:
+            if unit["type"] == "table" and unit.get("table") and "rows" in unit["table"]:
+                del unit["text"]
+        for chunk in payload["chunks"]:
+            del chunk["doc_id"]
+        payload["omitted"] = list(_OMITTED_FIELDS)
+        return payload
+
+
+def _to_columns(records: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    fields = []
+    for record in records:
+        for name in record:
+            if name not in fields:
+                fields.append(name)
+    columns = {name: [record.get(name) for record in records] for name in fields}
+    columns["_count"] = len(records)
+    return columns
+
+def _from_columns(columns: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    count = columns.pop("_count")
+    return [{name: values[i] for name, values in columns.items()} for i in range(count)]
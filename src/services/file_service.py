@@ -1,65 +1,349 @@
 import os
-import shutil
-import tempfile
 import asyncio
-from src.core.detector import get_parser_for_file
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.core.detector import get_parser_for_file, get_stream_for_file
+from src.core.utils import create_source_info
+from src.core.stream import ProgressCallback
 from src.services.chunker import Chunker
+from src.services.parse_cache import ParseCache
+from src.services.document_serializer import DocumentSerializer
+from src.services.chunk_diff import diff_chunks
 from src.schemas import ContentType
-from typing import List
+from src.models.models import OutputOptions, ParseOptions, ParsedDocument
+from typing import AsyncIterator, List, Optional
+
+class HashingReader:
+    """
+    File-like wrapper that hashes bytes as they are read, so the upload is
+    hashed during its single copy into storage instead of a separate pass.
+    """
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self._hasher = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        block = self._fileobj.read(size)
+        self._hasher.update(block)
+        return block
+
+    def hexdigest(self) -> str:
+        return self._hasher.hexdigest()
 
 class LocalFileService:
-    def __init__(self, s3_service):
+    def __init__(
+        self,
+        s3_service,
+        cache: Optional[ParseCache] = None,
+        max_concurrency: int = 4,
+        chunker: Optional[Chunker] = None
+    ):
         self.s3 = s3_service
-        self.chunker = Chunker(chunk_size=500, chunk_overlap=100)
-
-    async def process_files(self, files: List, file_ids: List[str]):
-        
-        initial_links = []
-        parsed_links = []
-        content_types = []
-
-        for file, f_id in zip(files, file_ids):
-            # 1. Сохраняем во временный файл (т.к. твоим парсерам нужен путь)
-            suffix = os.path.splitext(file.filename)[1].lower()
-            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-                shutil.copyfileobj(file.file, tmp)
-                tmp_path = tmp.name
-
-            try:
-                # 2. Загружаем оригинал в S3 (имитируем логику того сайта)
-                init_key = f"initial/{f_id}{suffix}"
-                with open(tmp_path, "rb") as f_data:
-                    await self.s3.upload_fileobj(f_data, init_key)
-
-                # 3. ЛОКАЛЬНЫЙ ПАРСИНГ (Твоя магия)
-                parser_func = get_parser_for_file(file.filename)
-                loop = asyncio.get_event_loop()
-                # Запускаем в потоке, чтобы не вешать сервер
-                doc = await loop.run_in_executor(None, parser_func, tmp_path)
-                
-                # Делаем чанки
-                doc.chunks = await loop.run_in_executor(
-                    None, self.chunker.split_units, doc.content_units, doc.doc_id
-                )
+        self.chunker = chunker or Chunker(chunk_size=500, chunk_overlap=100)
+        # Кэш результатов парсинга лежит рядом с "бакетом"
+        self.cache = cache or ParseCache(os.path.join(s3_service.base_path, "cache"))
+        # Отдельный пул под парсинг, чтобы не забивать дефолтный executor event loop'а
+        self.max_concurrency = max_concurrency
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="parser")
+        self._semaphore = None
+        self._semaphore_loop = None
 
-                # 4. Сохраняем полный ParsedDocument с чанками в JSON
-                parsed_key = f"parsed/{f_id}.json"
-                res = await self.s3.upload_file(
-                    parsed_key, 
-                    doc.model_dump_json(indent=2).encode("utf-8")
-                )
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Семафор привязан к event loop, поэтому создаем его под текущий loop
+        loop = asyncio.get_running_loop()
+        if self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    def _cache_key(self, content_hash: str, suffix: str, options: Optional[ParseOptions]) -> str:
+        return ParseCache.make_key(
+            content_hash, suffix, options or ParseOptions(),
+            extra=f"chunker:{Chunker.VERSION}:{self.chunker.chunk_size}:{self.chunker.chunk_overlap}:{self.chunker.size_unit}"
+        )
+
+    async def _save_upload(self, file, f_id: str):
+        """
+        Один раз потоково пишет загрузку сразу в initial/ (попутно считая sha256),
+        парсеры потом читают оригинал прямо оттуда - без временных копий.
+        Возвращает (path, suffix, content_hash, init_key).
+        """
+        suffix = os.path.splitext(file.filename)[1].lower()
+        init_key = f"initial/{f_id}{suffix}"
+        reader = HashingReader(file.file)
+        await self.s3.upload_fileobj(reader, init_key)
+        return self.s3.get_path(init_key), suffix, reader.hexdigest(), init_key
+
+    async def store_upload(self, file, f_id: str):
+        """Кладет оригинал в S3 без парсинга. Возвращает (init_key, content_hash)."""
+        _, _, content_hash, init_key = await self._save_upload(file, f_id)
+        return init_key, content_hash
+
+    @staticmethod
+    def _content_type(suffix: str) -> ContentType:
+        return ContentType.TABLE if suffix in ['.xlsx', '.csv'] else ContentType.TEXT
 
-                # 6. Собираем ссылки
-                initial_links.append(await self.s3.get_url(init_key))
-                parsed_links.append(res["url"])
-                content_types.append(ContentType.TABLE if suffix in ['.xlsx', '.csv'] else ContentType.TEXT)
+    async def _store_parsed(self, doc: ParsedDocument, f_id: str, output: Optional[OutputOptions]) -> dict:
+        """Сериализует документ в выбранном формате (в пуле парсера) и кладет в parsed/."""
+        output = output or OutputOptions()
+        data = await asyncio.get_running_loop().run_in_executor(
+            self.executor, DocumentSerializer.dumps, doc, output.format, output.omit_redundant
+        )
+        parsed_key = f"parsed/{f_id}{DocumentSerializer.extension(output.format)}"
+        return await self.s3.upload_file(parsed_key, data)
 
-            finally:
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
+    async def process_file(
+        self,
+        file,
+        f_id: str,
+        options: Optional[ParseOptions] = None,
+        output: Optional[OutputOptions] = None,
+        previous: Optional[ParsedDocument] = None
+    ) -> dict:
+        """
+        Полный цикл для одного файла: сохранение, парсинг (или кэш), чанки, JSON в S3.
+        previous - прошлый результат парсинга этого файла для повторного парсинга
+        только измененных страниц/листов.
+        """
+        async with self._get_semaphore():
+            start_time = time.time()
+            # 1-2. Оригинал в S3 (имитируем логику того сайта), парсим его же
+            path, suffix, content_hash, init_key = await self._save_upload(file, f_id)
 
+            result = await self.parse_and_store(
+                path, file.filename, content_hash, f_id, options, output=output, previous=previous
+            )
+            result["initial_link"] = await self.s3.get_url(init_key)
+            result["parsing_time_sec"] = round(time.time() - start_time, 2)
+            return result
+
+    async def _parse_cached(
+        self,
+        path: str,
+        file_name: str,
+        content_hash: str,
+        options: Optional[ParseOptions] = None,
+        progress: Optional[ProgressCallback] = None,
+        previous: Optional[ParsedDocument] = None
+    ):
+        """Парсит файл с чанками или берет его из кэша. Возвращает (doc, cache_hit)."""
+        suffix = os.path.splitext(file_name)[1].lower()
+        # 3. ЛОКАЛЬНЫЙ ПАРСИНГ (Твоя магия)
+        loop = asyncio.get_running_loop()
+        cache_key = self._cache_key(content_hash, suffix, options)
+        doc = await loop.run_in_executor(self.executor, self.cache.get, cache_key)
+        cache_hit = doc is not None
+
+        if cache_hit:
+            # Тот же контент - парсер не нужен, обновляем только source
+            doc.source = create_source_info(path)
+            if progress:
+                progress(1, 1)
+        else:
+            parser_func = get_parser_for_file(file_name, options, progress=progress, previous=previous)
+            # Запускаем в потоке, чтобы не вешать сервер
+            doc = await loop.run_in_executor(self.executor, parser_func, path)
+
+            # Делаем чанки; id чанков считаются от doc_id, как и в CLI,
+            # так что пересохраненный DOCX/XLSX с тем же контентом сохраняет их
+            doc.chunks = await loop.run_in_executor(
+                self.executor, self.chunker.split_units, doc.content_units, doc.doc_id
+            )
+            await loop.run_in_executor(self.executor, self.cache.put, cache_key, doc)
+
+        return doc, cache_hit
+
+    async def parse_and_store(
+        self,
+        path: str,
+        file_name: str,
+        content_hash: str,
+        f_id: str,
+        options: Optional[ParseOptions] = None,
+        progress: Optional[ProgressCallback] = None,
+        output: Optional[OutputOptions] = None,
+        previous: Optional[ParsedDocument] = None
+    ) -> dict:
+        """
+        Парсит уже сохраненный файл (или берет из кэша), режет на чанки
+        и кладет ParsedDocument в parsed/{f_id}.json (расширение зависит от формата вывода).
+        """
+        suffix = os.path.splitext(file_name)[1].lower()
+        doc, cache_hit = await self._parse_cached(path, file_name, content_hash, options, progress, previous)
+
+        # 4. Сохраняем полный ParsedDocument с чанками в выбранном формате
+        res = await self._store_parsed(doc, f_id, output)
+
+        # 5. Собираем ссылки
         return {
-            "initial_links": initial_links,
-            "parsed_links": parsed_links,
-            "content_types": content_types
-        }
\ No newline at end of file
+            "parsed_link": res["url"],
+            "content_type": self._content_type(suffix),
+            "cache_hit": cache_hit
+        }
+
+    async def process_files(
+        self,
+        files: List,
+        file_ids: List[str],
+        options: Optional[ParseOptions] = None,
+        output: Optional[OutputOptions] = None
+    ):
+        """
+        Обрабатывает файлы параллельно (не больше max_concurrency одновременно).
+        Первая ошибка пробрасывается наружу.
+        """
+        results = await asyncio.gather(*(
+            self.process_file(file, f_id, options, output) for file, f_id in zip(files, file_ids)
+        ))
+
+        return {
+            "initial_links": [r["initial_link"] for r in results],
+            "parsed_links": [r["parsed_link"] for r in results],
+            "content_types": [r["content_type"] for r in results],
+            "cache_hits": [r["cache_hit"] for r in results],
+            "parsing_times_sec": [r["parsing_time_sec"] for r in results]
+        }
+
+    async def process_batch(
+        self,
+        files: List,
+        file_ids: List[str],
+        options: Optional[ParseOptions] = None,
+        output: Optional[OutputOptions] = None
+    ) -> List[dict]:
+        """
+        Как process_files, но ошибка одного файла не валит весь батч:
+        возвращает результат по каждому файлу со status "ok" или "error".
+        """
+        results = await asyncio.gather(*(
+            self.process_file(file, f_id, options, output) for file, f_id in zip(files, file_ids)
+        ), return_exceptions=True)
+
+        batch = []
+        for file, f_id, result in zip(files, file_ids, results):
+            entry = {"file_name": file.filename, "file_id": f_id}
+            if isinstance(result, BaseException):
+                entry.update(status="error", error=str(result))
+            else:
+                entry.update(status="ok", **result)
+            batch.append(entry)
+        return batch
+
+    async def load_previous(self, data: bytes, file_name: str) -> ParsedDocument:
+        """Читает прошлый ParsedDocument в любом формате вывода (формат - по расширению)."""
+        fmt = DocumentSerializer.detect_format(file_name)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, DocumentSerializer.loads, data, fmt)
+        except (ValueError, OSError, EOFError) as e:
+            raise ValueError(f"Invalid previous document: {e}")
+
+    async def diff_file(
+        self,
+        file,
+        f_id: str,
+        previous: ParsedDocument,
+        options: Optional[ParseOptions] = None,
+        output: Optional[OutputOptions] = None
+    ) -> dict:
+        """
+        Парсит файл как process_file (неизмененные страницы/листы берутся из previous)
+        и сравнивает его чанки с previous: какие добавлены, удалены и не изменились.
+        """
+        async with self._get_semaphore():
+            start_time = time.time()
+            path, suffix, content_hash, init_key = await self._save_upload(file, f_id)
+            doc, cache_hit = await self._parse_cached(path, file.filename, content_hash, options, previous=previous)
+            res = await self._store_parsed(doc, f_id, output)
+            diff = diff_chunks(previous, doc)
+            return {
+                "initial_link": await self.s3.get_url(init_key),
+                "parsed_link": res["url"],
+                "content_type": self._content_type(suffix),
+                "cache_hit": cache_hit,
+                "parsing_time_sec": round(time.time() - start_time, 2),
+                **diff.model_dump(mode="json")
+            }
+
+    async def stream_file(
+        self,
+        file,
+        f_id: str,
+        options: Optional[ParseOptions] = None,
+        output: Optional[OutputOptions] = None,
+        previous: Optional[ParsedDocument] = None
+    ) -> AsyncIterator[str]:
+        """
+        Парсит один файл и отдает NDJSON-строки: по записи {"type": "chunk", ...} на чанк
+        по мере готовности, затем финальную {"type": "metadata", ...} со ссылками.
+        Неподдерживаемый формат падает ValueError сразу, до начала стрима.
+        """
+        stream_for = get_stream_for_file(file.filename, options, previous=previous)
+        path, suffix, content_hash, init_key = await self._save_upload(file, f_id)
+        return self._stream_chunks(stream_for, path, suffix, content_hash, init_key, f_id, options, output)
+
+    async def _stream_chunks(self, stream_for, path, suffix, content_hash, init_key, f_id, options, output):
+        start_time = time.time()
+        loop = asyncio.get_running_loop()
+        try:
+            cache_key = self._cache_key(content_hash, suffix, options)
+            doc = await loop.run_in_executor(self.executor, self.cache.get, cache_key)
+            cache_hit = doc is not None
+
+            if cache_hit:
+                doc.source = create_source_info(path)
+                for chunk in doc.chunks:
+                    yield _ndjson_record("chunk", chunk.model_dump(mode="json"))
+                chunk_ids = {chunk.chunk_id: chunk.chunk_id for chunk in doc.chunks}
+            else:
+                stream = stream_for(path)
+                units = []
+
+                def collect_units():
+                    for unit in stream:
+                        units.append(unit)
+                        yield unit
+
+                # doc_id контента известен только в конце, поэтому чанки в стриме
+                # помечены file_id, а итоговые chunk_id приходят в финальной записи
+                chunk_iter = self.chunker.iter_chunks(collect_units(), f_id)
+                chunks = []
+                while True:
+                    # Парсер и чанкер крутятся в потоке, по одному чанку за раз
+                    chunk = await loop.run_in_executor(self.executor, next, chunk_iter, None)
+                    if chunk is None:
+                        break
+                    chunks.append(chunk)
+                    yield _ndjson_record("chunk", chunk.model_dump(mode="json"))
+
+                doc = ParsedDocument(
+                    doc_id=stream.doc_id,
+                    source=create_source_info(path),
+                    content_units=units,
+                    metadata=stream.metadata,
+                    chunks=Chunker.restamp(chunks, stream.doc_id)
+                )
+                chunk_ids = {old.chunk_id: new.chunk_id for old, new in zip(chunks, doc.chunks)}
+                await loop.run_in_executor(self.executor, self.cache.put, cache_key, doc)
+
+            res = await self._store_parsed(doc, f_id, output)
+            yield _ndjson_record("metadata", {
+                "doc_id": doc.doc_id,
+                "metadata": doc.metadata,
+                "chunks_count": len(doc.chunks),
+                # Временный chunk_id из записи чанка -> итоговый, как в сохраненном документе
+                "chunk_ids": chunk_ids,
+                "initial_link": await self.s3.get_url(init_key),
+                "parsed_link": res["url"],
+                "content_type": self._content_type(suffix).value,
+                "parsing_time_sec": round(time.time() - start_time, 2),
+                "cache_hit": cache_hit
+            })
+        except Exception as e:
+            # Статус ответа уже отправлен, поэтому ошибка идет последней записью
+            yield _ndjson_record("error", {"detail": f"Internal Error: {e}"})
+
+
+def _ndjson_record(record_type: str, payload: dict) -> str:
+    return json.dumps({"type": record_type, **payload}, ensure_ascii=False, default=str) + "\n"
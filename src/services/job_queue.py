@@ -0,0 +1,218 @@
+import os
+import time
+import uuid
+import asyncio
+import sqlite3
+import argparse
+from contextlib import closing
+from typing import Any, Dict, Optional
+from src.models.models import OutputOptions, ParseOptions
+
+class JobQueue:
+    """
+    Persistent parse-job queue in SQLite.
+    Every call opens its own short-lived connection, so one queue file can be
+    shared by API threads, in-process workers and standalone worker processes.
+    """
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    file_name TEXT NOT NULL,
+                    file_key TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    options TEXT NOT NULL,
+                    output_options TEXT,
+                    pages_done INTEGER NOT NULL DEFAULT 0,
+                    pages_total INTEGER,
+                    parsed_link TEXT,
+                    cache_hit INTEGER,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+            # Очереди, созданные до появления форматов вывода
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "output_options" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN output_options TEXT")
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None - autocommit, транзакции открываем явно
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _update(self, job_id: str, **fields) -> None:
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with closing(self._connect()) as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", [*fields.values(), job_id])
+
+    def enqueue(
+        self,
+        file_name: str,
+        file_key: str,
+        content_hash: str,
+        options: ParseOptions,
+        job_id: Optional[str] = None,
+        output: Optional[OutputOptions] = None
+    ) -> str:
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        output = output or OutputOptions()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, file_name, file_key, content_hash, options, output_options, created_at, updated_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, file_name, file_key, content_hash, options.model_dump_json(), output.model_dump_json(), now, now)
+            )
+        return job_id
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest queued job to running and return it."""
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?",
+                    (time.time(), row["id"])
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        job = dict(row)
+        job["status"] = "running"
+        return job
+
+    def update_progress(self, job_id: str, pages_done: int, pages_total: int) -> None:
+        self._update(job_id, pages_done=pages_done, pages_total=pages_total)
+
+    def complete(self, job_id: str, parsed_link: str, cache_hit: bool) -> None:
+        self._update(job_id, status="done", parsed_link=parsed_link, cache_hit=int(cache_hit))
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._update(job_id, status="failed", error=error)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def requeue_stale(self, stale_after_sec: float = 900) -> int:
+        """
+        Return running jobs with no progress for stale_after_sec back to the queue
+        (their worker most likely died). Returns the number of requeued jobs.
+        """
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'queued', updated_at = ? WHERE status = 'running' AND updated_at < ?",
+                (time.time(), time.time() - stale_after_sec)
+            )
+            return cursor.rowcount
+
+
+class JobWorker:
+    """
+    Pulls jobs from a JobQueue and runs them through LocalFileService.parse_and_store.
+    Every stale_check_interval seconds it also returns jobs of dead workers to the
+    queue, so they are picked up without restarting the API or the worker process.
+    """
+    def __init__(self, queue: JobQueue, file_service, poll_interval: float = 0.5,
+                 stale_check_interval: float = 60, stale_after_sec: float = 900):
+        self.queue = queue
+        self.file_service = file_service
+        self.poll_interval = poll_interval
+        self.stale_check_interval = stale_check_interval
+        self.stale_after_sec = stale_after_sec
+        self._next_stale_check = time.monotonic() + stale_check_interval
+
+    async def run(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            if time.monotonic() >= self._next_stale_check:
+                await asyncio.to_thread(self.queue.requeue_stale, self.stale_after_sec)
+                self._next_stale_check = time.monotonic() + self.stale_check_interval
+            job = await asyncio.to_thread(self.queue.claim_next)
+            if job is None:
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.run_job(job)
+
+    async def run_job(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+
+        def progress(done: int, total: int):
+            # Вызывается из потока парсера
+            self.queue.update_progress(job_id, done, total)
+
+        try:
+            result = await self.file_service.parse_and_store(
+                self.file_service.s3.get_path(job["file_key"]),
+                job["file_name"],
+                job["content_hash"],
+                job_id,
+                ParseOptions.model_validate_json(job["options"]),
+                progress=progress,
+                output=OutputOptions.model_validate_json(job["output_options"]) if job["output_options"] else None
+            )
+            # Запись в SQLite может ждать блокировку до busy timeout - не на event loop
+            await asyncio.to_thread(self.queue.complete, job_id, result["parsed_link"], result["cache_hit"])
+        except Exception as e:
+            await asyncio.to_thread(self.queue.fail, job_id, str(e))
+
+
+async def run_workers(queue: JobQueue, file_service, workers: int, stop: asyncio.Event) -> None:
+    await asyncio.gather(*(JobWorker(queue, file_service).run(stop) for _ in range(workers)))
+
+
+if __name__ == "__main__":
+    # Отдельный процесс-воркер: python -m src.services.job_queue --storage local_storage --workers 2
+    from src.services.s3_service import LocalS3Service
+    from src.services.file_service import LocalFileService
+    from src.services.chunker import Chunker
+    from src.services.tokenizer import estimate_tokens
+
+    arg_parser = argparse.ArgumentParser(description="Parse job worker")
+    arg_parser.add_argument("--storage", default="local_storage")
+    arg_parser.add_argument("--workers", type=int, default=2)
+    # Должно совпадать с CHUNK_TOKENS у API, иначе чанки будут разными
+    arg_parser.add_argument("--chunk-tokens", type=int, default=int(os.getenv("CHUNK_TOKENS", "0")))
+    # Процессы OCR с прогретой моделью, общие для всех воркеров (0 - модель в этом процессе)
+    arg_parser.add_argument("--ocr-workers", type=int, default=int(os.getenv("OCR_WORKERS", "0")))
+    # Кэш OCR общий с API, если storage тот же (0 - выключен)
+    arg_parser.add_argument("--ocr-cache-mb", type=int, default=int(os.getenv("OCR_CACHE_MB", "256")))
+    args = arg_parser.parse_args()
+
+    s3_service = LocalS3Service(base_path=args.storage)
+    job_queue = JobQueue(os.path.join(args.storage, "jobs.sqlite3"))
+    job_queue.requeue_stale()
+    chunker = Chunker(args.chunk_tokens, args.chunk_tokens // 5, tokenizer=estimate_tokens) if args.chunk_tokens else None
+    service = LocalFileService(s3_service=s3_service, max_concurrency=args.workers, chunker=chunker)
+    if args.ocr_cache_mb > 0:
+        from src.services.ocr_cache import configure_ocr_cache
+        configure_ocr_cache(os.path.join(args.storage, "ocr_cache"), args.ocr_cache_mb * 1024 * 1024)
+    if args.ocr_workers > 0:
+        from src.services.ocr_service import start_ocr_pool, stop_ocr_pool
+        start_ocr_pool(args.ocr_workers)
+    try:
+        asyncio.run(run_workers(job_queue, service, args.workers, asyncio.Event()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.ocr_workers > 0:
+            stop_ocr_pool()
@@ -1,17 +1,80 @@
 import re
 import unicodedata
+from functools import lru_cache
+
+OCR_FIXES = {
+    "morelless": "more/less", "rvn": "run", "eqwal": "equal",
+    "yow": "you", "vvith": "with", "vvas": "was", "tlie": "the",
+    "n i m p r o vement": "improvement", "rvnning": "running"
+}
+
+FIX_RE = re.compile(r'\b(' + '|'.join(map(re.escape, OCR_FIXES.keys())) + r')\b', re.IGNORECASE)
+SPACING_RE = re.compile(r'(?<=\b\w)\s+(?=\w\b)')
+# \b is implied by the greedy \w+ (a match can only start a word), spelling it out
+# lets the scanner skip mid-word positions instead of rescanning each word
+HYPHEN_BREAK_RE = re.compile(r'\b(\w+)-\s*\n\s*(\w+)')
+
+# Cells longer than this are cleaned directly, not cached
+CELL_CACHE_MAX_LEN = 200
+CELL_CACHE_SIZE = 65536
+
+def _fix_ocr(match) -> str:
+    return OCR_FIXES.get(match.group(0).lower(), match.group(0))
 
 class Normalizer:
     @staticmethod
     def clean_text(text:str) -> str:
         if not text:
             return ""
-        text = unicodedata.normalize('NFKC', text)
+        # ASCII is NFKC-stable, isascii() is O(1) on str
+        if not text.isascii():
+            text = unicodedata.normalize('NFKC', text)
         text = Normalizer.dehyphenate(text)
-        text = re.sub(r'\s+', ' ', text)
-        text = text.strip()
-        return text
+        # split() uses the same whitespace class as \s, and drops the ends like strip()
+        return " ".join(text.split())
 
     @staticmethod
     def dehyphenate(text: str) -> str:
-        return re.sub(r'(\w+)-\s*\n\s*(\w+)', r'\1\2', text)
\ No newline at end of file
+        if '\n' not in text or '-' not in text:
+            return text
+        return HYPHEN_BREAK_RE.sub(r'\1\2', text)
+
+    @staticmethod
+    def fix_ocr_artifacts(text: str) -> str:
+        """
+        Joins letter-spaced words and fixes common OCR misreads.
+        Expects clean_text output: with single spaces and no line breaks there is
+        nothing left for a second dehyphenate / whitespace pass to do.
+        """
+        if not text:
+            return ""
+        text = SPACING_RE.sub('', text)
+        return FIX_RE.sub(_fix_ocr, text)
+
+    @staticmethod
+    def clean_pdf_text(text: str) -> str:
+        """clean_text + fix_ocr_artifacts; same result as super_clean_text(dehyphenate(clean_text(text)))."""
+        return Normalizer.fix_ocr_artifacts(Normalizer.clean_text(text))
+
+    @staticmethod
+    def clean_cell(text: str) -> str:
+        """clean_text for table cells; repeated short values are cleaned once."""
+        if len(text) > CELL_CACHE_MAX_LEN:
+            return Normalizer.clean_text(text)
+        return _clean_cell_cached(text)
+
+    @staticmethod
+    def clean_pdf_cell(text: str) -> str:
+        """clean_pdf_text for table cells; repeated short values are cleaned once."""
+        if len(text) > CELL_CACHE_MAX_LEN:
+            return Normalizer.clean_pdf_text(text)
+        return _clean_pdf_cell_cached(text)
+
+
+@lru_cache(maxsize=CELL_CACHE_SIZE)
+def _clean_cell_cached(text: str) -> str:
+    return Normalizer.clean_text(text)
+
+@lru_cache(maxsize=CELL_CACHE_SIZE)
+def _clean_pdf_cell_cached(text: str) -> str:
+    return Normalizer.clean_pdf_text(text)
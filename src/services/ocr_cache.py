@@ -0,0 +1,91 @@
+import json
+import hashlib
+from typing import List, Optional, Sequence, Tuple, TYPE_CHECKING
+from src.services.disk_cache import DiskLRUCache
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+class OCRCache(DiskLRUCache):
+    """
+    Persistent cache of OCR results (text, confidence), keyed on the pixels of the
+    recognized image and the reader's languages, so repeated pages (cover sheets,
+    disclaimers, letterheads) are recognized once across documents.
+    Same layout and eviction as ParseCache (see DiskLRUCache).
+    """
+    def __init__(self, cache_dir: str, max_bytes: int = 64 * 1024 * 1024):
+        super().__init__(cache_dir, max_bytes)
+
+    @staticmethod
+    def make_key(image: "Image.Image", languages: Sequence[str]) -> str:
+        """Byte hash of the decoded pixels: identical renders of a page hit, any change misses."""
+        hasher = hashlib.sha256(f"{image.mode}|{image.size}|{','.join(languages)}|".encode("utf-8"))
+        hasher.update(image.tobytes())
+        return hasher.hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        data = self._read(key)
+        if data is None:
+            return None
+        try:
+            entry = json.loads(data)
+            return entry["text"], float(entry["confidence"])
+        except (ValueError, KeyError, TypeError):
+            # Corrupt entry - drop it and recognize again
+            self._discard(key)
+            return None
+
+    def put(self, key: str, result: Tuple[str, float]) -> None:
+        """Store one result; call evict() once after a batch of puts."""
+        text, confidence = result
+        self._write(key, json.dumps({"text": text, "confidence": confidence}, ensure_ascii=False).encode("utf-8"))
+
+
+_ocr_cache: Optional[OCRCache] = None
+
+def configure_ocr_cache(cache_dir: Optional[str], max_bytes: int = 64 * 1024 * 1024) -> Optional[OCRCache]:
+    """Enable the OCR cache for all parsers of this process (None disables it)."""
+    global _ocr_cache
+    _ocr_cache = OCRCache(cache_dir, max_bytes) if cache_dir else None
+    return _ocr_cache
+
+def get_ocr_cache() -> Optional[OCRCache]:
+    return _ocr_cache
+
+def recognize_cached(
+    ocr_service,
+    images: List["Image.Image"],
+    batched: bool = False
+) -> Tuple[List[Tuple[str, float]], List[bool]]:
+    """
+    (text, confidence) per image and whether it came from the OCR cache.
+    Only cache misses reach ocr_service (in one batched call with batched).
+    Without a configured cache every image is recognized.
+    """
+    cache = get_ocr_cache()
+    if cache is None:
+        if batched:
+            return ocr_service.recognize_batch(images), [False] * len(images)
+        return [ocr_service.recognize(image) for image in images], [False] * len(images)
+
+    languages = getattr(ocr_service, "languages", ())
+    keys = [OCRCache.make_key(image, languages) for image in images]
+    results = [cache.get(key) for key in keys]
+    hits = [result is not None for result in results]
+    missing = [i for i, hit in enumerate(hits) if not hit]
+    if missing:
+        if batched:
+            recognized = ocr_service.recognize_batch([images[i] for i in missing])
+        else:
+            recognized = [ocr_service.recognize(images[i]) for i in missing]
+        for i, result in zip(missing, recognized):
+            results[i] = result
+            cache.put(keys[i], result)
+        cache.evict()
+    return results, hits
+
+def ocr_cache_stats(hits: int, misses: int) -> dict:
+    """Document metadata entry: OCR cache hits, misses and hit rate of one parse."""
+    lookups = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': round(hits / lookups, 3) if lookups else None}
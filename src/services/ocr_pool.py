@@ -0,0 +1,241 @@
+import os
+import sys
+import queue
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+def _default_service(languages):
+    from src.services.ocr_service import OCRService
+    return OCRService(languages)
+
+def _worker_main(service_factory, languages, threads: int, tasks, results, worker_id: int) -> None:
+    """
+    OCR worker process: loads the reader once, then serves recognize tasks until None.
+    Thread counts are capped so N workers share the CPU instead of oversubscribing it.
+    """
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        service = service_factory(languages)
+    except Exception as e:
+        results.put((worker_id, None, RuntimeError(f"OCR worker failed to start: {e}")))
+        return
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, images, batch_size = task
+        try:
+            if batch_size:
+                value = service.recognize_batch(images, batch_size)
+            else:
+                value = [service.recognize(images[0])]
+        except Exception as e:
+            # The original exception may not be picklable
+            value = RuntimeError(f"{type(e).__name__}: {e}")
+        results.put((worker_id, task_id, value))
+
+
+class OCRPool:
+    """
+    N OCR processes, each with its own warm reader, shared by all parses of this process.
+
+    Work is queued per owner (one parsed file) and handed out round-robin, one task
+    per idle worker, so a long scan and a one-page image take turns instead of the
+    image waiting for the whole scan. submit() blocks while the owner already has
+    max_queued_per_owner tasks waiting (backpressure on the parse thread), and
+    batches are split into tasks of batch_size images so they interleave too.
+    A worker that dies fails its current task and is restarted.
+    """
+    def __init__(
+        self,
+        workers: int = 2,
+        threads_per_worker: Optional[int] = None,
+        languages: Tuple[str, ...] = ('ru', 'en'),
+        max_queued_per_owner: int = 4,
+        service_factory: Callable = _default_service
+    ):
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        self.languages = list(languages)
+        self.max_queued_per_owner = max_queued_per_owner
+        self.service_factory = service_factory
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self._results = self._ctx.Queue()
+        self._lock = threading.Condition()
+        # owner -> deque of (task_id, images, batch_size); OrderedDict order is the round-robin turn
+        self._queued: "OrderedDict[str, deque]" = OrderedDict()
+        self._futures: Dict[int, Future] = {}
+        self._running: Dict[int, Optional[int]] = {}
+        self._processes: Dict[int, multiprocessing.Process] = {}
+        self._task_queues = {}
+        self._next_task_id = 0
+        self._closed = False
+
+        for worker_id in range(workers):
+            self._start_worker(worker_id)
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="ocr-dispatch", daemon=True)
+        self._collector = threading.Thread(target=self._collect_loop, name="ocr-collect", daemon=True)
+        self._dispatcher.start()
+        self._collector.start()
+
+    def _start_worker(self, worker_id: int) -> None:
+        tasks = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(self.service_factory, self.languages, self.threads_per_worker, tasks, self._results, worker_id),
+            name=f"ocr-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        self._task_queues[worker_id] = tasks
+        self._processes[worker_id] = process
+        self._running[worker_id] = None
+
+    def submit(self, owner: str, images: List["Image.Image"], batch_size: int = 0) -> Future:
+        """
+        Queue one task; its future resolves to a list of (text, confidence), one per image.
+        batch_size > 0 runs recognize_batch on the worker, 0 runs recognize on images[0].
+        """
+        with self._lock:
+            while not self._closed and len(self._queued.get(owner, ())) >= self.max_queued_per_owner:
+                self._lock.wait()
+            if self._closed:
+                raise RuntimeError("OCR pool is closed")
+            task_id = self._next_task_id
+            self._next_task_id += 1
+            future = Future()
+            self._futures[task_id] = future
+            self._queued.setdefault(owner, deque()).append((task_id, images, batch_size))
+            self._lock.notify_all()
+        return future
+
+    def recognize(self, owner: str, image: "Image.Image") -> Tuple[str, float]:
+        return self.submit(owner, [image]).result()[0]
+
+    def recognize_batch(self, owner: str, images: List["Image.Image"], batch_size: int = 8) -> List[Tuple[str, float]]:
+        futures = [
+            self.submit(owner, images[start:start + batch_size], batch_size)
+            for start in range(0, len(images), batch_size)
+        ]
+        return [result for future in futures for result in future.result()]
+
+    def client(self, owner: str) -> "PooledOCRService":
+        return PooledOCRService(self, owner)
+
+    def _next_task(self):
+        """Round robin: the first owner with queued work gives one task and goes to the back."""
+        for owner in list(self._queued):
+            tasks = self._queued.pop(owner)
+            task = tasks.popleft()
+            if tasks:
+                self._queued[owner] = tasks
+            return task
+        return None
+
+    def _dispatch_loop(self) -> None:
+        with self._lock:
+            while not self._closed:
+                idle = [worker_id for worker_id, task_id in self._running.items() if task_id is None]
+                task = self._next_task() if idle else None
+                if task is None:
+                    self._lock.wait()
+                    continue
+                self._running[idle[0]] = task[0]
+                self._task_queues[idle[0]].put(task)
+                # A queued slot of the owner is free: wake blocked submit() calls
+                self._lock.notify_all()
+
+    def _collect_loop(self) -> None:
+        while True:
+            self._restart_dead_workers()
+            try:
+                worker_id, task_id, value = self._results.get(timeout=1)
+            except queue.Empty:
+                if self._closed:
+                    return
+                continue
+            with self._lock:
+                if task_id is None:
+                    # The worker could not load its reader: fail everything, it would fail again
+                    self._fail_all(value)
+                    continue
+                self._running[worker_id] = None
+                future = self._futures.pop(task_id, None)
+                self._lock.notify_all()
+            if future is None:
+                continue
+            if isinstance(value, Exception):
+                future.set_exception(value)
+            else:
+                future.set_result(value)
+
+    def _restart_dead_workers(self) -> None:
+        with self._lock:
+            for worker_id, process in list(self._processes.items()):
+                if process.is_alive() or self._closed:
+                    continue
+                task_id = self._running.get(worker_id)
+                future = self._futures.pop(task_id, None) if task_id is not None else None
+                if future is not None:
+                    future.set_exception(RuntimeError(f"OCR worker exited with code {process.exitcode}"))
+                self._start_worker(worker_id)
+                self._lock.notify_all()
+
+    def _fail_all(self, error: Exception) -> None:
+        self._closed = True
+        for future in self._futures.values():
+            future.set_exception(error)
+        self._futures.clear()
+        self._queued.clear()
+        self._lock.notify_all()
+
+    def close(self) -> None:
+        with self._lock:
+            was_closed = self._closed
+            self._closed = True
+            for future in self._futures.values():
+                if not future.done():
+                    future.set_exception(RuntimeError("OCR pool is closed"))
+            self._futures.clear()
+            self._queued.clear()
+            self._lock.notify_all()
+        for worker_id, process in self._processes.items():
+            if process.is_alive():
+                self._task_queues[worker_id].put(None)
+        for process in self._processes.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._dispatcher.join(timeout=5)
+        self._collector.join(timeout=5)
+
+
+class PooledOCRService:
+    """OCRService interface on top of an OCRPool, for one owner (one parsed file)."""
+    def __init__(self, pool: OCRPool, owner: str):
+        self.pool = pool
+        self.owner = owner
+        self.languages = pool.languages
+
+    def recognize(self, pil_image: "Image.Image") -> Tuple[str, float]:
+        return self.pool.recognize(self.owner, pil_image)
+
+    def recognize_batch(self, pil_images: List["Image.Image"], batch_size: int = 8) -> List[Tuple[str, float]]:
+        return self.pool.recognize_batch(self.owner, pil_images, batch_size)
+
+    def extract_text(self, pil_image: "Image.Image") -> str:
+        return self.recognize(pil_image)[0]
+
+    def extract_text_batch(self, pil_images: List["Image.Image"], batch_size: int = 8) -> List[str]:
+        return [text for text, _ in self.recognize_batch(pil_images, batch_size)]
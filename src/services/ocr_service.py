@@ -1,23 +1,110 @@
-import easyocr
-import torch
-import numpy as np
-from PIL import Image
+import os
+from typing import List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
 
 class OCRService:
     def __init__(self, languages=['ru', 'en']):
+        # easyocr/torch take seconds to import, so they are only loaded
+        # when an OCR service is actually created
+        import easyocr
+        import torch
+
+        self.languages = list(languages)
         self.use_gpu = torch.cuda.is_available()
         self.reader = easyocr.Reader(languages, gpu=self.use_gpu)
         print(f"OCR Service initialized. GPU: {self.use_gpu}")
 
-    def extract_text(self, pil_image: Image.Image) -> str:
-        img_array = np.array(pil_image)
-        results = self.reader.readtext(img_array, detail=0)
-        return " ".join(results)
+    def extract_text(self, pil_image: "Image.Image") -> str:
+        return self.recognize(pil_image)[0]
+
+    def extract_text_batch(self, pil_images: List["Image.Image"], batch_size: int = 8) -> List[str]:
+        return [text for text, _ in self.recognize_batch(pil_images, batch_size)]
+
+    def recognize(self, pil_image: "Image.Image") -> Tuple[str, float]:
+        """Text of the image and its confidence (0..1, see _join_results)."""
+        import numpy as np
+
+        return _join_results(self.reader.readtext(np.array(pil_image), detail=1))
+
+    def recognize_batch(self, pil_images: List["Image.Image"], batch_size: int = 8) -> List[Tuple[str, float]]:
+        """
+        OCR several images with batched inference. easyocr batches only same-sized
+        inputs, so images are grouped by shape; results keep the input order.
+        """
+        import numpy as np
+
+        img_arrays = [np.array(img) for img in pil_images]
+        groups = {}
+        for i, img_array in enumerate(img_arrays):
+            groups.setdefault(img_array.shape, []).append(i)
+
+        results = [("", 0.0)] * len(img_arrays)
+        for indexes in groups.values():
+            if len(indexes) == 1:
+                results[indexes[0]] = self.recognize(pil_images[indexes[0]])
+                continue
+            batch_results = self.reader.readtext_batched(
+                [img_arrays[i] for i in indexes], batch_size=batch_size, detail=1
+            )
+            for i, detections in zip(indexes, batch_results):
+                results[i] = _join_results(detections)
+        return results
+
+
+def _join_results(detections) -> Tuple[str, float]:
+    """
+    easyocr (bbox, text, confidence) detections -> text joined as with detail=0,
+    and the mean confidence weighted by text length (0.0 when nothing was found).
+    """
+    texts = [text for _, text, _ in detections]
+    chars = sum(len(text) for text in texts)
+    if not chars:
+        return " ".join(texts), 0.0
+    confidence = sum(len(text) * conf for _, text, conf in detections) / chars
+    return " ".join(texts), float(confidence)
 
 _ocr_instance = None
+_ocr_pool = None
+_ocr_pool_pid = None
+
+def start_ocr_pool(workers: int, threads_per_worker: Optional[int] = None, **kwargs):
+    """
+    Serve get_ocr_service() from a pool of OCR processes with warm readers
+    (see OCRPool) instead of one reader in this process.
+    """
+    global _ocr_pool, _ocr_pool_pid
+    from src.services.ocr_pool import OCRPool
+
+    stop_ocr_pool()
+    _ocr_pool = OCRPool(workers, threads_per_worker, **kwargs)
+    _ocr_pool_pid = os.getpid()
+    return _ocr_pool
+
+def stop_ocr_pool() -> None:
+    global _ocr_pool
+    if _ocr_pool is not None and _ocr_pool_pid == os.getpid():
+        _ocr_pool.close()
+    _ocr_pool = None
+
+def get_ocr_pool():
+    """The OCR pool serving this process, None without one."""
+    if _ocr_pool is not None and _ocr_pool_pid == os.getpid():
+        return _ocr_pool
+    return None
 
-def get_ocr_service():
+def get_ocr_service(owner: Optional[str] = None):
+    """
+    OCR service for one parse. With a started pool this is a client of the pool and
+    owner (the parsed file) is its fair-scheduling key; otherwise it is the reader of
+    this process. Forked page workers do not inherit the pool's threads, so they use
+    their own reader as before.
+    """
     global _ocr_instance
+    pool = get_ocr_pool()
+    if pool is not None:
+        return pool.client(owner or "default")
     if _ocr_instance is None:
         _ocr_instance = OCRService()
-    return _ocr_instance
\ No newline at end of file
+    return _ocr_instance
@@ -0,0 +1,58 @@
+import hashlib
+from typing import Optional
+from src.models.models import ParsedDocument, ParseOptions
+from src.services.disk_cache import DiskLRUCache
+
+_EXCEL_OPTIONS = ('excel_read_only', 'excel_rows_per_unit')
+_IMAGE_OPTIONS = ('image_max_side', 'image_grayscale', 'image_binarize')
+
+# ParseOptions fields that change the output of each parser. Worker counts and OCR
+# batching only change how the same result is computed, so they stay out of the key
+OUTPUT_OPTIONS = {
+    'docx': (),
+    'pdf': ('use_ocr',),
+    'xlsx': _EXCEL_OPTIONS,
+    'xls': _EXCEL_OPTIONS,
+    'png': _IMAGE_OPTIONS,
+    'jpg': _IMAGE_OPTIONS,
+    'jpeg': _IMAGE_OPTIONS,
+    'tif': _IMAGE_OPTIONS,
+    'tiff': _IMAGE_OPTIONS,
+}
+
+class ParseCache(DiskLRUCache):
+    """
+    Persistent cache of ParsedDocument JSON, keyed on the uploaded bytes.
+    Entries live as files under `cache_dir`; the least recently used ones are
+    evicted once the total size exceeds `max_bytes` (see DiskLRUCache).
+    """
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024):
+        super().__init__(cache_dir, max_bytes)
+
+    @staticmethod
+    def make_key(content_hash: str, extension: str, options: ParseOptions, extra: str = "") -> str:
+        """Key = hash of file bytes + extension (selects the parser) + the options that parser's output depends on."""
+        extension = extension.lower()
+        fields = OUTPUT_OPTIONS.get(extension.lstrip('.'))
+        # Unknown extensions keep every option in the key
+        options_json = options.model_dump_json(include=set(fields) if fields is not None else None)
+        key_source = "|".join([content_hash, extension, options_json, extra])
+        return hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[ParsedDocument]:
+        data = self._read(key)
+        if data is None:
+            return None
+        try:
+            return ParsedDocument.model_validate_json(data)
+        except ValueError:
+            # Corrupt or outdated entry - drop it and reparse
+            self._discard(key)
+            return None
+
+    def put(self, key: str, doc: ParsedDocument) -> None:
+        data = doc.model_dump_json().encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        self._write(key, data)
+        self.evict()
@@ -1,11 +1,20 @@
 import os
 import shutil
+import asyncio
+import tempfile
 from datetime import datetime
+from typing import AsyncIterator
+
+# Размер блока при потоковом копировании и чтении объектов
+COPY_BLOCK_SIZE = 1024 * 1024
 
 class LocalS3Service:
     """
-    Заглушка для S3. Сохраняет файлы локально, 
+    Заглушка для S3. Сохраняет файлы локально,
     но имитирует поведение облачного хранилища.
+    Весь файловый I/O идет в потоках, event loop не блокируется;
+    запись атомарная (временный файл + rename), как у настоящего S3 -
+    читатель видит либо старый объект, либо новый целиком.
     """
     def __init__(self, base_path: str = "local_storage"):
         self.base_path = base_path
@@ -13,27 +22,63 @@ class LocalS3Service:
         os.makedirs(os.path.join(base_path, "initial"), exist_ok=True)
         os.makedirs(os.path.join(base_path, "parsed"), exist_ok=True)
 
-    async def upload_file(self, key: str, data: bytes, content_type: str = None):
-        """Имитация загрузки файла в облако"""
-        file_path = os.path.join(self.base_path, key)
+    def _write_atomic(self, key: str, write) -> None:
+        """Пишет объект через write(f) во временный файл рядом и переименовывает его в ключ."""
+        file_path = self.get_path(key)
         # Создаем подпапки, если их нет
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, "wb") as f:
-            f.write(data)
-            
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path), prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    async def upload_file(self, key: str, data: bytes, content_type: str = None):
+        """Имитация загрузки файла в облако"""
+        await asyncio.to_thread(self._write_atomic, key, lambda f: f.write(data))
+
         # Возвращаем структуру как у реального S3 ответа
         return {
             "status": 200,
-            "url": f"http://localhost:8000/download/{key}" # Имитация ссылки
+            "url": await self.get_url(key) # Имитация ссылки
         }
 
     async def upload_fileobj(self, fileobj, key: str, **kwargs):
-        """Имитация загрузки объекта (из памяти/временного файла)"""
-        data = fileobj.read()
-        if hasattr(fileobj, 'seek'):
-            fileobj.seek(0)
-        return await self.upload_file(key, data)
+        """
+        Имитация загрузки объекта (из памяти/временного файла).
+        Копирует блоками по COPY_BLOCK_SIZE, не читая объект в память целиком.
+        """
+        await asyncio.to_thread(
+            self._write_atomic, key, lambda f: shutil.copyfileobj(fileobj, f, COPY_BLOCK_SIZE)
+        )
+        return {
+            "status": 200,
+            "url": await self.get_url(key)
+        }
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(os.path.isfile, self.get_path(key))
+
+    async def iter_file(self, key: str, block_size: int = COPY_BLOCK_SIZE) -> AsyncIterator[bytes]:
+        """Потоковое чтение объекта блоками (аналог StreamingBody у S3)."""
+        f = await asyncio.to_thread(open, self.get_path(key), "rb")
+        try:
+            while True:
+                block = await asyncio.to_thread(f.read, block_size)
+                if not block:
+                    break
+                yield block
+        finally:
+            await asyncio.to_thread(f.close)
+
+    def get_path(self, key: str) -> str:
+        """Локальный путь объекта (у настоящего S3 такого нет - только для локальных воркеров)"""
+        return os.path.join(self.base_path, key)
 
     async def get_url(self, key: str):
         """Имитация получения публичной ссылки"""
-        return f"http://localhost:8000/download/{key}"
\ No newline at end of file
+        return f"http://localhost:8000/download/{key}"
@@ -1,7 +1,11 @@
 from typing import List, Dict, Any
+
+# Stands in for the value quotes of a row template until values are escaped
+_QUOTE = "\x01"
+
 class TableSerializer:			
     @staticmethod
-    def to_row_kv_text(rows:List[List[str]]) -> str:
+    def to_row_kv_text(rows:List[List[str]], first_row_number: int = 1) -> str:
         if not rows:
             return ""
         if len(rows) == 1:
@@ -10,22 +14,59 @@ class TableSerializer:
         else:
             headers = rows[0]
             data_rows = rows[1:]
-        clean_headers = [h if h else f"col_{i}" for i, h in enumerate(headers)]
-        schema_summary = f"Table Schema: Columns: {', '.join(clean_headers)} | Rows: {len(data_rows)}"
-
-        result = [schema_summary]
-        for i, row in enumerate(data_rows, 1):
-            row_parts = []
-            for j, cell in enumerate(row):
-                header_name = clean_headers[j] if j<len(headers) else f'col{j}'
-                val = str(cell).replace('"', "'")
-                row_parts.append(f'{header_name}="{val}"')
-            
-            row_str = f"row {i}: {{{', '.join(row_parts)}}}"
-            result.append(row_str)
-            
-        return "\n".join(result)
-      
-      
+        clean_headers = TableSerializer.clean_headers(headers)
+        bodies = TableSerializer.row_bodies(data_rows, clean_headers)
+        return TableSerializer.assemble(clean_headers, bodies, first_row_number)
+
+    @staticmethod
+    def clean_headers(headers: List[str]) -> List[str]:
+        return [h if h else f"col_{i}" for i, h in enumerate(headers)]
+
+    @staticmethod
+    def row_body(row: List[Any], clean_headers: List[str]) -> str:
+        """`{h1="v1", h2="v2"}` part of a row line; does not depend on the row number."""
+        if len(row) <= len(clean_headers):
+            row_parts = ['%s="%s"' % (h, str(cell).replace('"', "'")) for h, cell in zip(clean_headers, row)]
+        else:
+            row_parts = [
+                '%s="%s"' % (clean_headers[j] if j < len(clean_headers) else f'col{j}', str(cell).replace('"', "'"))
+                for j, cell in enumerate(row)
+            ]
+        return f"{{{', '.join(row_parts)}}}"
 
-      
\ No newline at end of file
+    @staticmethod
+    def row_bodies(rows: List[List[Any]], clean_headers: List[str]) -> List[str]:
+        """
+        row_body() of every row. When all rows have one cell per header, the
+        table is serialized with a single %-template built from the headers
+        (one C-level format call per row instead of one per cell); the value
+        quotes are a placeholder char, so escaping `"` is one replace per row.
+        """
+        width = len(clean_headers)
+        if (not rows or any(len(row) != width for row in rows)
+                or any('"' in h or _QUOTE in h for h in clean_headers)):
+            return [TableSerializer.row_body(row, clean_headers) for row in rows]
+
+        template = "{" + ", ".join(f"{h.replace('%', '%%')}={_QUOTE}%s{_QUOTE}" for h in clean_headers) + "}"
+        quotes = 2 * width
+        bodies = []
+        for row, body in zip(rows, map(template.__mod__, map(tuple, rows))):
+            if body.count(_QUOTE) != quotes:
+                # A value contains the placeholder itself
+                bodies.append(TableSerializer.row_body(row, clean_headers))
+            elif '"' in body:
+                bodies.append(body.replace('"', "'").replace(_QUOTE, '"'))
+            else:
+                bodies.append(body.replace(_QUOTE, '"'))
+        return bodies
+
+    @staticmethod
+    def schema_line(clean_headers: List[str], rows_count: int) -> str:
+        return f"Table Schema: Columns: {', '.join(clean_headers)} | Rows: {rows_count}"
+
+    @staticmethod
+    def assemble(clean_headers: List[str], bodies: List[str], first_row_number: int = 1) -> str:
+        """Schema line + numbered rows from row_body() parts, so split tables serialize each row once."""
+        result = [TableSerializer.schema_line(clean_headers, len(bodies))]
+        result.extend(map("row {}: {}".format, range(first_row_number, first_row_number + len(bodies)), bodies))
+        return "\n".join(result)
@@ -0,0 +1,69 @@
+import re
+from typing import Callable, Dict, List
+
+# Callback text -> number of tokens, e.g. lambda s: len(encoding.encode(s))
+Tokenizer = Callable[[str], int]
+
+# One match = one token: up to 3 digits, up to 6 ASCII letters, up to 3 letters
+# of other scripts (Cyrillic splits into more pieces), any other single char
+_TOKEN_RE = re.compile(r"\d{1,3}|[A-Za-z]{1,6}|[^\W\d_A-Za-z]{1,3}|\S")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Fast offline token estimate, close to BPE tokenizers of embedding models
+    (~6 chars per token for English words, ~3 for numbers and non-Latin words,
+    1 per punctuation char). A single regex pass, no vocabulary needed.
+    """
+    return len(_TOKEN_RE.findall(text))
+
+def tiktoken_counter(encoding_name: str = "cl100k_base") -> Tokenizer:
+    """Exact counts with tiktoken (optional package)."""
+    try:
+        import tiktoken
+    except ImportError:
+        raise ValueError("tiktoken_counter requires the 'tiktoken' package")
+    encoding = tiktoken.get_encoding(encoding_name)
+    counter = lambda text: len(encoding.encode(text, disallowed_special=()))
+    counter.__name__ = f"tiktoken:{encoding_name}"
+    return counter
+
+class TokenCounter:
+    """
+    Memoizes a tokenizer per string. Chunking counts the same short strings over
+    and over (words of overlap regions, repeated table headers and cells), so
+    strings up to max_cached_len are cached; long ones are counted directly.
+    The cache is dropped as a whole once it holds maxsize strings.
+    """
+    def __init__(self, tokenizer: Tokenizer, max_cached_len: int = 1000, maxsize: int = 100_000):
+        self.tokenizer = tokenizer
+        self.name = getattr(tokenizer, "__name__", type(tokenizer).__name__)
+        self.max_cached_len = max_cached_len
+        self.maxsize = maxsize
+        self._cache: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, text: str) -> int:
+        count = self._cache.get(text)
+        if count is not None:
+            self.hits += 1
+            return count
+        self.misses += 1
+        count = self.tokenizer(text)
+        if len(text) <= self.max_cached_len:
+            if len(self._cache) >= self.maxsize:
+                self._cache.clear()
+            self._cache[text] = count
+        return count
+
+    def count_many(self, texts: List[str]) -> List[int]:
+        """Counts for many short strings; cache hits skip the per-call overhead."""
+        cache = self._cache
+        counts = [cache.get(text) for text in texts]
+        missing = 0
+        for i, count in enumerate(counts):
+            if count is None:
+                missing += 1
+                counts[i] = self(texts[i])
+        self.hits += len(texts) - missing
+        return counts
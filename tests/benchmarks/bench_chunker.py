@@ -0,0 +1,74 @@
+"""
+Chunker throughput on synthetic documents:
+- 10k small text units (paragraph grouping)
+- 1k large text units (splitting at sentence/newline breaks)
+- one 100k-row table (row batches with repeated headers)
+Reports MB/s of unit text fed into Chunker.split_units (best of REPEATS,
+GC paused while timing, as timeit does), in character mode and in token mode
+with the default estimate_tokens tokenizer.
+
+    python -m tests.benchmarks.bench_chunker
+"""
+import gc
+import time
+import random
+from src.models.models import ContentUnit
+from src.services.chunker import Chunker
+from src.services.table_serializer import TableSerializer
+from src.services.tokenizer import estimate_tokens
+
+REPEATS = 5
+WORDS = ["data", "parser", "chunk", "table", "section.", "retrieval", "embedding", "vector", "page\n"]
+
+def sentence(rnd: random.Random, words: int) -> str:
+    return " ".join(rnd.choice(WORDS) for _ in range(words))
+
+def small_text_units(rnd: random.Random):
+    return [
+        ContentUnit(type="text", text=sentence(rnd, rnd.randint(5, 40)), page_number=i // 50 + 1, order_index=i)
+        for i in range(10_000)
+    ]
+
+def large_text_units(rnd: random.Random):
+    return [
+        ContentUnit(type="text", text=sentence(rnd, 2_000), page_number=i + 1, order_index=i)
+        for i in range(1_000)
+    ]
+
+def table_units(rnd: random.Random):
+    rows = [["ID", "Name", "Region", "Revenue"]] + [
+        [str(i), f"Client {i}", rnd.choice(["North", "South", "East", "West"]), str(rnd.randint(1, 10**6))]
+        for i in range(100_000)
+    ]
+    return [ContentUnit(type="table", text=TableSerializer.to_row_kv_text(rows), table={"rows": rows}, order_index=0)]
+
+def bench(name: str, units, chunker: Chunker):
+    size_mb = sum(len(u.text.encode("utf-8")) for u in units) / 1024 / 1024
+    best = float("inf")
+    for _ in range(REPEATS):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            chunks = chunker.split_units(units, "bench")
+            best = min(best, time.perf_counter() - start)
+        finally:
+            gc.enable()
+    print(f"{name:<24} {size_mb:7.1f} MB  {len(chunks):7d} chunks  {best:6.2f} s  {size_mb / best:7.1f} MB/s")
+
+def main():
+    rnd = random.Random(0)
+    documents = [
+        ("10k small text units", small_text_units(rnd)),
+        ("1k large text units", large_text_units(rnd)),
+        ("100k-row table", table_units(rnd)),
+    ]
+    print("chars: chunk_size=500, overlap=100")
+    for name, units in documents:
+        bench(name, units, Chunker(chunk_size=500, chunk_overlap=100))
+    print("tokens: chunk_size=256, overlap=32, estimate_tokens")
+    for name, units in documents:
+        bench(name, units, Chunker(chunk_size=256, chunk_overlap=32, tokenizer=estimate_tokens))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Merged-cell resolution benchmark on a synthetic 100k-cell, 5k-merge workbook.
+Compares the per-cell range scan with the precomputed build_merged_value_map index.
+The range scan is quadratic, so it is timed on the first SAMPLE_ROWS rows and
+extrapolated to the full sheet.
+
+    python -m tests.benchmarks.bench_excel_merged
+"""
+import os
+import time
+import tempfile
+import openpyxl
+from src.parsers.excel_parser import parse_excel, build_merged_value_map, get_cell_value
+
+ROWS = 2000
+COLS = 50
+MERGES = 5000
+SAMPLE_ROWS = 20
+
+def build_workbook(path: str):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for r in range(1, ROWS + 1):
+        ws.append([f"r{r}c{c}" for c in range(1, COLS + 1)])
+    # Vertical 2-cell merges spread over the sheet
+    merges = 0
+    for c in range(1, COLS + 1, 2):
+        for r in range(1, ROWS, 4):
+            if merges == MERGES:
+                break
+            ws.merge_cells(start_row=r, start_column=c, end_row=r + 1, end_column=c)
+            merges += 1
+    wb.save(path)
+
+def resolve(sheet, rows, merged_values=None):
+    return [[get_cell_value(sheet, cell, merged_values) for cell in row] for row in rows]
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "merged.xlsx")
+        build_workbook(path)
+        sheet = openpyxl.load_workbook(path, data_only=True).active
+        print(f"sheet: {ROWS * COLS} cells, {len(sheet.merged_cells.ranges)} merged ranges")
+
+        sample = list(sheet.iter_rows(max_row=SAMPLE_ROWS))
+        start = time.perf_counter()
+        scanned = resolve(sheet, sample)
+        scan_time = (time.perf_counter() - start) * ROWS / SAMPLE_ROWS
+
+        start = time.perf_counter()
+        merged_values = build_merged_value_map(sheet)
+        indexed_all = resolve(sheet, sheet.iter_rows(), merged_values)
+        index_time = time.perf_counter() - start
+
+        assert indexed_all[:SAMPLE_ROWS] == scanned, "index and range scan disagree"
+        print(f"range scan (extrapolated): {scan_time:.2f}s")
+        print(f"merged index:              {index_time:.2f}s  ({scan_time / index_time:.0f}x faster)")
+
+        start = time.perf_counter()
+        parse_excel(path)
+        print(f"parse_excel end-to-end:    {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Image preprocessing benchmark: decode + preprocess time, size of the array handed
+to OCR and, when the EasyOCR models are available, OCR time and accuracy
+(similarity of the recognized text to the rendered one) for a 12 MP phone photo
+(JPEG, EXIF-rotated) and a 300 DPI scan (PNG) at different settings.
+"baseline" is the previous behavior: the full-resolution RGB image as decoded.
+
+    python -m tests.benchmarks.bench_image_preprocess
+    python -m tests.benchmarks.bench_image_preprocess --no-ocr
+"""
+import argparse
+import difflib
+import os
+import random
+import tempfile
+import time
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+from src.parsers.image_parser import preprocess_image
+
+REPEATS = 3
+
+WORDS = ["invoice", "total", "amount", "delivery", "contract", "payment", "quarter",
+         "report", "balance", "customer", "address", "number", "date", "signature"]
+
+SETTINGS = [
+    ("baseline", None),
+    ("full size, gray", dict(max_side=0)),
+    ("max_side 3200", dict(max_side=3200)),
+    ("max_side 2560 (default)", dict(max_side=2560)),
+    ("max_side 1600", dict(max_side=1600)),
+    ("max_side 1024", dict(max_side=1024)),
+    ("max_side 2560, binarize", dict(max_side=2560, binarize=True)),
+]
+
+def text_lines(rnd, count=12):
+    return [" ".join(rnd.choice(WORDS) for _ in range(5)) + f" {rnd.randint(100, 99999)}" for _ in range(count)]
+
+def render_page(lines, size, font_size, background, ink):
+    img = Image.new("RGB", size, background)
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=font_size)
+    y = size[1] // 10
+    for line in lines:
+        draw.text((size[0] // 12, y), line, fill=ink, font=font)
+        y += int(font_size * 1.8)
+    return img
+
+def make_photo(path, lines):
+    # Stored sideways with EXIF orientation 6, as phones do; slightly blurred paper
+    img = render_page(lines, (3000, 4000), 70, (226, 220, 205), (40, 40, 60))
+    img = img.filter(ImageFilter.GaussianBlur(1.5)).rotate(90, expand=True)
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    img.save(path, quality=90, exif=exif)
+
+def make_scan(path, lines):
+    render_page(lines, (2480, 3508), 40, "white", "black").save(path)
+
+def similarity(text, expected):
+    return difflib.SequenceMatcher(None, " ".join(text.lower().split()), " ".join(expected.lower().split())).ratio()
+
+def load(path, settings):
+    img = Image.open(path)
+    if settings is None:
+        img.load()
+        return img
+    return preprocess_image(img, **settings)
+
+def bench(path, expected, ocr):
+    print(f"{'setting':<26} {'prep ms':>8} {'size':>11} {'array MB':>9}" + (f" {'OCR s':>7} {'accuracy':>9}" if ocr else ""))
+    for name, settings in SETTINGS:
+        best = float("inf")
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            img = load(path, settings)
+            array = np.array(img)
+            best = min(best, time.perf_counter() - start)
+        line = f"{name:<26} {best * 1000:8.1f} {'x'.join(map(str, img.size)):>11} {array.nbytes / 1e6:9.1f}"
+        if ocr:
+            start = time.perf_counter()
+            text, _ = ocr.recognize(img)
+            line += f" {time.perf_counter() - start:7.2f} {similarity(text, expected):9.3f}"
+        print(line)
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--no-ocr", action="store_true", help="Preprocessing only")
+    args = arg_parser.parse_args()
+
+    ocr = None
+    if not args.no_ocr:
+        try:
+            from src.services.ocr_service import OCRService
+            ocr = OCRService()
+        except Exception as e:
+            print(f"OCR unavailable ({type(e).__name__}: {e}), measuring preprocessing only\n")
+
+    rnd = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, make in [("photo.jpg", make_photo), ("scan.png", make_scan)]:
+            lines = text_lines(rnd)
+            path = os.path.join(tmp, name)
+            make(path, lines)
+            print(f"== {name} ({os.path.getsize(path) / 1e6:.1f} MB)")
+            bench(path, "\n".join(lines), ocr)
+            print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Normalizer benchmark: MB/s of input for the baseline pipeline (re.sub per call,
+NFKC always, dehyphenate + super_clean_text again on PDF text, every table cell
+cleaned) and for the current one, on ASCII and Cyrillic page text and on a
+repetitive table column.
+
+    python -m tests.benchmarks.bench_normalizer
+"""
+import gc
+import random
+import re
+import time
+import unicodedata
+from src.parsers.pdf_parser import super_clean_text
+from src.services.normalizer import Normalizer
+
+REPEATS = 5
+
+def baseline_clean_text(text: str) -> str:
+    if not text:
+        return ""
+    text = unicodedata.normalize('NFKC', text)
+    text = re.sub(r'(\w+)-\s*\n\s*(\w+)', r'\1\2', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+def baseline_pdf_text(text: str) -> str:
+    text = baseline_clean_text(text)
+    text = re.sub(r'(\w+)-\s*\n\s*(\w+)', r'\1\2', text)
+    return super_clean_text(text)
+
+def pages(rnd, words, count=200, words_per_page=400):
+    result = []
+    for _ in range(count):
+        lines = []
+        for _ in range(words_per_page // 10):
+            line = " ".join(rnd.choice(words) for _ in range(10))
+            lines.append(line + ("-" if rnd.random() < 0.1 else ""))
+        result.append("\n".join(lines))
+    return result
+
+def cells(rnd, count=200_000):
+    values = ["Да", "Нет", "Moscow", "N/A", "2023-01-01", " 100 ", "in progress"] + [str(i) for i in range(50)]
+    return [rnd.choice(values) for _ in range(count)]
+
+def bench(name, texts, func):
+    size = sum(len(t.encode("utf-8")) for t in texts) / 1e6
+    best = float("inf")
+    for _ in range(REPEATS):
+        gc.disable()
+        start = time.perf_counter()
+        for text in texts:
+            func(text)
+        best = min(best, time.perf_counter() - start)
+        gc.enable()
+    print(f"{name:<34} {size:6.1f} MB  {best:6.3f} s  {size / best:7.1f} MB/s")
+
+def main():
+    rnd = random.Random(0)
+    ascii_pages = pages(rnd, ["report", "value", "the", "information", "quarterly", "data", "a", "of", "2023"])
+    cyrillic_pages = pages(rnd, ["отчет", "значение", "информация", "квартал", "данные", "и", "в", "2023"])
+    table_cells = cells(rnd)
+    for label, texts in (("ASCII pages", ascii_pages), ("Cyrillic pages", cyrillic_pages)):
+        bench(f"{label}: clean_text baseline", texts, baseline_clean_text)
+        bench(f"{label}: clean_text", texts, Normalizer.clean_text)
+        bench(f"{label}: PDF pipeline baseline", texts, baseline_pdf_text)
+        bench(f"{label}: clean_pdf_text", texts, Normalizer.clean_pdf_text)
+    bench("table cells: baseline", table_cells, lambda t: super_clean_text(baseline_clean_text(t)))
+    bench("table cells: clean_pdf_cell", table_cells, Normalizer.clean_pdf_cell)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Output format benchmark: write time and size of the stored ParsedDocument
+for every OutputFormat, with and without omit_redundant, on the sample files.
+
+    python -m tests.benchmarks.bench_output_formats
+"""
+import os
+import time
+from src.core.detector import get_parser_for_file
+from src.models.models import ParseOptions
+from src.schemas import OutputFormat
+from src.services.chunker import Chunker
+from src.services.document_serializer import DocumentSerializer
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data")
+REPEATS = 5
+
+def parse(path: str):
+    doc = get_parser_for_file(path, ParseOptions(use_ocr=False))(path)
+    doc.chunks = Chunker(chunk_size=500, chunk_overlap=100).split_units(doc.content_units, doc.doc_id)
+    return doc
+
+def main():
+    for name in sorted(os.listdir(DATA_DIR)):
+        if not name.startswith("test."):
+            continue
+        path = os.path.join(DATA_DIR, name)
+        try:
+            doc = parse(path)
+        except ValueError:
+            continue
+        print(f"\n{name}: {len(doc.content_units)} units, {len(doc.chunks)} chunks")
+        for fmt in OutputFormat:
+            for omit_redundant in (False, True):
+                try:
+                    start = time.perf_counter()
+                    for _ in range(REPEATS):
+                        data = DocumentSerializer.dumps(doc, fmt, omit_redundant=omit_redundant)
+                    elapsed = (time.perf_counter() - start) / REPEATS
+                except ValueError as e:
+                    print(f"  {fmt.value:<13} {'omit' if omit_redundant else 'full':<4}  skipped: {e}")
+                    continue
+                print(f"  {fmt.value:<13} {'omit' if omit_redundant else 'full':<4}  {len(data) / 1024:9.1f} KiB  {elapsed * 1000:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
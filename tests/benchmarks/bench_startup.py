@@ -0,0 +1,48 @@
+"""
+CLI startup benchmark: wall time of `src/main.py data/test.docx` and whether
+the OCR stack got imported along the way.
+
+    python -m tests.benchmarks.bench_startup
+"""
+import os
+import sys
+import time
+import subprocess
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+RUNS = 5
+
+CLI_SCRIPT = """
+import sys
+sys.argv = ["main.py", {path!r}]
+from src.main import main
+main()
+heavy = [m for m in ("torch", "easyocr", "pandas", "pdfplumber") if m in sys.modules]
+print("HEAVY_MODULES=" + ",".join(heavy))
+"""
+
+def run_cli(file_path: str):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    with tempfile.TemporaryDirectory() as cwd:
+        start = time.perf_counter()
+        out = subprocess.run(
+            [sys.executable, "-c", CLI_SCRIPT.format(path=file_path)],
+            cwd=cwd, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        elapsed = time.perf_counter() - start
+    heavy = out.rsplit("HEAVY_MODULES=", 1)[-1].strip()
+    return elapsed, heavy
+
+def main():
+    for name in ("test.docx", "test.xlsx"):
+        file_path = os.path.join(ROOT, "data", name)
+        timings = []
+        heavy = ""
+        for _ in range(RUNS):
+            elapsed, heavy = run_cli(file_path)
+            timings.append(elapsed)
+        print(f"{name}: best {min(timings):.3f}s, mean {sum(timings) / RUNS:.3f}s, heavy modules loaded: {heavy or 'none'}")
+
+if __name__ == "__main__":
+    main()
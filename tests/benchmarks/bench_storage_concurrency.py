@@ -0,0 +1,73 @@
+"""
+Storage concurrency benchmark: latency of lightweight requests served by the
+event loop while several large parsed-JSON writes run in parallel.
+Compares the previous on-loop write with LocalS3Service's off-loop atomic write.
+
+    python -m tests.benchmarks.bench_storage_concurrency
+"""
+import os
+import time
+import asyncio
+import tempfile
+import statistics
+from src.services.s3_service import LocalS3Service
+
+PARALLEL_UPLOADS = 8
+UPLOAD_SIZE = 64 * 1024 * 1024
+PROBE_INTERVAL = 0.005
+
+class OnLoopS3Service(LocalS3Service):
+    """The previous upload_file: synchronous write on the event loop thread."""
+    async def upload_file(self, key: str, data: bytes, content_type: str = None):
+        file_path = self.get_path(key)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as f:
+            f.write(data)
+            os.fsync(f.fileno())
+        return {"status": 200, "url": await self.get_url(key)}
+
+class FsyncS3Service(LocalS3Service):
+    """Current implementation plus fsync, so both variants do the same disk work."""
+    def _write_atomic(self, key, write):
+        def write_and_sync(f):
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        super()._write_atomic(key, write_and_sync)
+
+async def probe_latency(stop: asyncio.Event, latencies: list):
+    """Stand-in for a cheap concurrent request: how late does the loop run it?"""
+    while not stop.is_set():
+        scheduled = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        latencies.append((time.perf_counter() - scheduled - PROBE_INTERVAL) * 1000)
+
+async def run(service: LocalS3Service):
+    data = os.urandom(1024) * (UPLOAD_SIZE // 1024)
+    latencies = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_latency(stop, latencies))
+    start = time.perf_counter()
+    await asyncio.gather(*(service.upload_file(f"parsed/bench_{i}.json", data) for i in range(PARALLEL_UPLOADS)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    return elapsed, latencies
+
+def report(name: str, elapsed: float, latencies: list):
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if len(latencies) > 1 else latencies[-1]
+    print(
+        f"{name:<10} uploads {elapsed:6.2f}s | request latency ms: "
+        f"p50 {statistics.median(latencies):7.1f}  p99 {p99:7.1f}  max {latencies[-1]:7.1f}  (n={len(latencies)})"
+    )
+
+def main():
+    print(f"{PARALLEL_UPLOADS} parallel uploads x {UPLOAD_SIZE // (1024 * 1024)} MiB")
+    for name, service_cls in (("on-loop", OnLoopS3Service), ("off-loop", FsyncS3Service)):
+        with tempfile.TemporaryDirectory() as base_path:
+            elapsed, latencies = asyncio.run(run(service_cls(base_path=base_path)))
+            report(name, elapsed, latencies)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Table serialization benchmark on a 100k-row, 8-column (forward-filled) table:
+TableSerializer.to_row_kv_text and the Chunker table split against the previous
+per-cell serialization (copied below), best of REPEATS with GC left on -
+allocation count is part of what is being measured.
+
+    python -m tests.benchmarks.bench_tables
+"""
+import random
+import time
+from src.parsers.pdf_parser import forward_fill_table
+from src.models.models import ContentUnit
+from src.services.chunker import Chunker
+from src.services.table_serializer import TableSerializer
+
+ROWS = 100_000
+REPEATS = 5
+
+def baseline_to_row_kv_text(rows):
+    clean_headers = TableSerializer.clean_headers(rows[0])
+    bodies = [TableSerializer.row_body(row, clean_headers) for row in rows[1:]]
+    result = [TableSerializer.schema_line(clean_headers, len(bodies))]
+    result.extend(f"row {i}: {body}" for i, body in enumerate(bodies, 1))
+    return "\n".join(result)
+
+def make_table(rnd):
+    # Two category columns with gaps to fill, the rest dense
+    regions = ["North", "South", "East", "West"]
+    values = ["Moscow", "N/A", "2023-01-01", 'Model "X"', "in progress"] + [str(i) for i in range(100)]
+    rows = [["Region", "Segment", "City", "Date", "Status", "Qty", "Price", "Comment"]]
+    for i in range(ROWS):
+        row = [rnd.choice(values) for _ in range(8)]
+        row[0] = rnd.choice(regions) if i % 50 == 0 else ""
+        row[1] = rnd.choice(regions) if i % 5 == 0 else ""
+        rows.append(row)
+    return rows
+
+def bench(name, func, table):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func(table)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<32} {best:6.3f} s")
+    return result
+
+def main():
+    table = make_table(random.Random(0))
+    print(f"{ROWS} rows x {len(table[0])} columns")
+    table = bench("forward fill", forward_fill_table, table)
+    before = bench("to_row_kv_text: baseline", baseline_to_row_kv_text, table)
+    after = bench("to_row_kv_text", TableSerializer.to_row_kv_text, table)
+    assert before == after
+
+    unit = ContentUnit(type="table", text=after, table={"rows": table}, order_index=0)
+    chunker = Chunker(chunk_size=500, chunk_overlap=100)
+    row_body = TableSerializer.row_body
+    baseline_bodies = lambda rows, clean_headers: [row_body(row, clean_headers) for row in rows]
+    original = TableSerializer.row_bodies
+    try:
+        TableSerializer.row_bodies = staticmethod(baseline_bodies)
+        before = bench("chunk table: baseline", lambda u: chunker.split_units([u], "doc"), unit)
+    finally:
+        TableSerializer.row_bodies = original
+    after = bench("chunk table", lambda u: chunker.split_units([u], "doc"), unit)
+    assert [c.text for c in before] == [c.text for c in after]
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
+import json
+import shutil
+import pytest
 from fastapi.testclient import TestClient
 from api import app
+from src.core.detector import get_parser_for_file
 from src.services.file_service import LocalFileService
 from src.services.s3_service import LocalS3Service
 import os
@@ -18,3 +22,116 @@ def test_health_check_ish():
     # We validat that app starts and has endpoints
     assert "/parse" in [route.path for route in app.routes]
     assert "/download/{path:path}" in [route.path for route in app.routes]
+
+SAMPLE_DOCX = os.path.join(os.path.dirname(__file__), "..", "data", "test.docx")
+
+@pytest.fixture
+def tmp_file_service(tmp_path, monkeypatch):
+    import api
+    service = LocalFileService(s3_service=LocalS3Service(base_path=str(tmp_path)))
+    monkeypatch.setattr(api, "file_service", service)
+    monkeypatch.setattr(api, "s3_service", service.s3)
+    return service
+
+def test_parse_stream_ndjson(tmp_file_service):
+    with open(SAMPLE_DOCX, "rb") as f:
+        response = client.post("/parse?stream=true", files={"file": ("test.docx", f)})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    records = [json.loads(line) for line in response.text.splitlines() if line]
+    chunk_records = [r for r in records if r["type"] == "chunk"]
+    final = records[-1]
+    assert chunk_records
+    assert final["type"] == "metadata"
+    assert final["chunks_count"] == len(chunk_records)
+    assert final["parsed_link"].endswith(".json")
+
+    parsed_path = final["parsed_link"].split("/download/", 1)[1]
+    saved = client.get(f"/download/{parsed_path}").json()
+    assert saved["doc_id"] == final["doc_id"]
+    assert all(c["doc_id"] == final["doc_id"] for c in saved["chunks"])
+
+def stream_records(data):
+    response = client.post("/parse?stream=true", files={"file": ("test.docx", data)})
+    records = [json.loads(line) for line in response.text.splitlines() if line]
+    return [r for r in records if r["type"] == "chunk"], records[-1]
+
+def test_parse_stream_ids_match_stored_document(tmp_file_service):
+    with open(SAMPLE_DOCX, "rb") as f:
+        data = f.read()
+    chunk_records, final = stream_records(data)
+    assert final["cache_hit"] is False
+
+    # Provisional ids are mapped to the stored ones, which are the CLI's ids (keyed by doc_id)
+    parsed_path = final["parsed_link"].split("/download/", 1)[1]
+    saved = client.get(f"/download/{parsed_path}").json()
+    stored_ids = [c["chunk_id"] for c in saved["chunks"]]
+    assert [final["chunk_ids"][r["chunk_id"]] for r in chunk_records] == stored_ids
+    doc = get_parser_for_file(SAMPLE_DOCX)(SAMPLE_DOCX)
+    assert stored_ids == [c.chunk_id for c in tmp_file_service.chunker.split_units(doc.content_units, doc.doc_id)]
+
+    # The cache hit streams the final ids, and a fresh non-streaming parse stores them too
+    cached_records, cached_final = stream_records(data)
+    assert cached_final["cache_hit"] is True
+    assert [r["chunk_id"] for r in cached_records] == stored_ids
+    assert all(r["doc_id"] == final["doc_id"] for r in cached_records)
+    assert all(cached_final["chunk_ids"][i] == i for i in stored_ids)
+    shutil.rmtree(tmp_file_service.cache.cache_dir)
+    os.makedirs(tmp_file_service.cache.cache_dir)
+    response = client.post("/parse", files={"file": ("test.docx", data)})
+    assert response.json()["cache_hit"] is False
+    parsed_path = response.json()["parsed_link"].split("/download/", 1)[1]
+    assert [c["chunk_id"] for c in client.get(f"/download/{parsed_path}").json()["chunks"]] == stored_ids
+
+def test_parse_stream_unsupported_format(tmp_file_service):
+    response = client.post("/parse?stream=true", files={"file": ("notes.txt", b"hello")})
+    assert response.status_code == 400
+
+def test_parse_batch(tmp_file_service):
+    with open(SAMPLE_DOCX, "rb") as f:
+        data = f.read()
+    files = [
+        ("files", ("a.docx", data)),
+        ("files", ("b.docx", data)),
+        ("files", ("bad.txt", b"hello")),
+    ]
+    response = client.post("/parse/batch", files=files)
+    assert response.status_code == 200
+
+    results = response.json()["results"]
+    assert [r["file_name"] for r in results] == ["a.docx", "b.docx", "bad.txt"]
+    assert [r["status"] for r in results] == ["ok", "ok", "error"]
+    assert all("parsing_time_sec" in r for r in results[:2])
+    assert len({r["parsed_link"] for r in results[:2]}) == 2
+
+def test_parse_output_format(tmp_file_service):
+    from src.schemas import OutputFormat
+    from src.services.document_serializer import DocumentSerializer
+    with open(SAMPLE_DOCX, "rb") as f:
+        response = client.post(
+            "/parse?output_format=json_gzip&omit_redundant=true", files={"file": ("test.docx", f)}
+        )
+    assert response.status_code == 200
+    parsed_link = response.json()["parsed_link"]
+    assert parsed_link.endswith(".json.gz")
+
+    download = client.get(f"/download/{parsed_link.split('/download/', 1)[1]}")
+    assert download.headers["content-type"] == "application/gzip"
+    doc = DocumentSerializer.loads(download.content, OutputFormat.JSON_GZIP)
+    assert doc.chunks and all(c.doc_id == doc.doc_id for c in doc.chunks)
+
+def test_diff_endpoint(tmp_file_service):
+    with open(SAMPLE_DOCX, "rb") as f:
+        data = f.read()
+    first = client.post("/parse", files={"file": ("test.docx", data)}).json()
+    previous = client.get(f"/download/{first['parsed_link'].split('/download/', 1)[1]}").content
+
+    response = client.post("/diff", files={"file": ("test.docx", data), "previous": ("prev.json", previous)})
+    assert response.status_code == 200
+    diff = response.json()
+    assert diff["added"] == [] and diff["removed"] == []
+    assert all(u["chunk_id"] == u["previous_chunk_id"] for u in diff["unchanged"])
+
+    response = client.post("/diff", files={"file": ("test.docx", data), "previous": ("prev.json", b"not json")})
+    assert response.status_code == 400
@@ -0,0 +1,25 @@
+from src.models.models import ContentUnit, ParsedDocument, SourceInfo
+from src.services.chunker import Chunker
+from src.services.chunk_diff import diff_chunks
+
+SOURCE = SourceInfo(file_name="a.docx", file_path="/tmp/a.docx", file_size=1)
+
+def make_doc(doc_id, texts):
+    units = [ContentUnit(type="text", text=text, order_index=i) for i, text in enumerate(texts)]
+    chunker = Chunker(chunk_size=20, chunk_overlap=0)
+    return ParsedDocument(doc_id=doc_id, source=SOURCE, content_units=units, chunks=chunker.split_units(units, doc_id))
+
+def test_same_document_is_unchanged():
+    doc = make_doc("d1", ["alpha paragraph", "beta paragraph", "gamma paragraph"])
+    diff = diff_chunks(doc, make_doc("d1", ["alpha paragraph", "beta paragraph", "gamma paragraph"]))
+    assert diff.added == [] and diff.removed == []
+    assert [(u.chunk_id, u.previous_chunk_id) for u in diff.unchanged] == [(c.chunk_id, c.chunk_id) for c in doc.chunks]
+
+def test_edit_reports_only_changed_chunks():
+    previous = make_doc("d1", ["alpha paragraph", "beta paragraph", "gamma paragraph"])
+    current = make_doc("d2", ["inserted paragraph", "alpha paragraph", "gamma paragraph"])
+    diff = diff_chunks(previous, current)
+
+    assert [c.text for c in diff.added] == ["inserted paragraph"]
+    assert diff.removed == [previous.chunks[1].chunk_id]
+    assert [u.previous_chunk_id for u in diff.unchanged] == [previous.chunks[0].chunk_id, previous.chunks[2].chunk_id]
@@ -0,0 +1,52 @@
+import pytest
+from src.models.models import ParsedDocument, SourceInfo, ContentUnit, Chunk
+from src.schemas import OutputFormat
+from src.services.document_serializer import DocumentSerializer
+from src.services.table_serializer import TableSerializer
+
+@pytest.fixture
+def doc():
+    rows = [["ID", "Name"], ["1", "Alice"], ["2", "Bob"]]
+    return ParsedDocument(
+        doc_id="abc",
+        source=SourceInfo(file_name="t.xlsx", file_path="/tmp/t.xlsx", file_size=10),
+        content_units=[
+            ContentUnit(type="text", text="Привет", order_index=0),
+            ContentUnit(
+                type="table",
+                text=TableSerializer.to_row_kv_text(rows),
+                table={"sheet_name": "Sheet1", "headers": rows[0], "rows": rows},
+                sheet_name="Sheet1",
+                order_index=1
+            ),
+        ],
+        metadata={"language": "ru", "warnings": []},
+        chunks=[
+            Chunk(chunk_id="c1", doc_id="abc", text="Привет", metadata={"order_index": 0}),
+            Chunk(chunk_id="c2", doc_id="abc", text="row 1", metadata={"order_index": 1, "sheet_name": "Sheet1"}),
+        ]
+    )
+
+def test_default_json_is_unchanged(doc):
+    assert DocumentSerializer.dumps(doc) == doc.model_dump_json(indent=2).encode("utf-8")
+
+@pytest.mark.parametrize("fmt", list(OutputFormat))
+@pytest.mark.parametrize("omit_redundant", [False, True])
+def test_roundtrip(doc, fmt, omit_redundant):
+    if fmt == OutputFormat.JSON_ZSTD:
+        pytest.importorskip("zstandard")
+    if fmt == OutputFormat.MSGPACK:
+        pytest.importorskip("msgpack")
+    data = DocumentSerializer.dumps(doc, fmt, omit_redundant=omit_redundant)
+    assert DocumentSerializer.loads(data, fmt) == doc
+
+def test_omit_redundant_drops_duplicates(doc):
+    compact = DocumentSerializer.dumps(doc, OutputFormat.JSON_COMPACT)
+    omitted = DocumentSerializer.dumps(doc, OutputFormat.JSON_COMPACT, omit_redundant=True)
+    assert len(omitted) < len(compact)
+    assert b"Table Schema" not in omitted
+    assert b'"doc_id":"abc"' in omitted and omitted.count(b'"doc_id"') == 1
+
+def test_extension():
+    assert DocumentSerializer.extension(OutputFormat.JSON_GZIP) == ".json.gz"
+    assert DocumentSerializer.extension(OutputFormat.MSGPACK) == ".msgpack"
@@ -0,0 +1,106 @@
+import openpyxl
+import pytest
+from src.parsers.excel_parser import parse_excel, build_merged_value_map, get_cell_value
+
+@pytest.fixture
+def merged_workbook(tmp_path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Report"
+    ws.append(["Region", "Quarter", "Revenue"])
+    ws.append(["North", "Q1", 10])
+    ws.append([None, "Q2", 20])
+    ws.append(["South", "Q1", 30])
+    ws.merge_cells("A2:A3")
+    path = tmp_path / "merged.xlsx"
+    wb.save(path)
+    return str(path)
+
+def test_merged_map_matches_range_scan(merged_workbook):
+    wb = openpyxl.load_workbook(merged_workbook, data_only=True)
+    sheet = wb["Report"]
+    merged_values = build_merged_value_map(sheet)
+    for row in sheet.iter_rows():
+        for cell in row:
+            assert get_cell_value(sheet, cell, merged_values) == get_cell_value(sheet, cell)
+
+def test_merged_cells_are_filled(merged_workbook):
+    doc = parse_excel(merged_workbook)
+    rows = doc.content_units[0].table["rows"]
+    assert rows[1][0] == "North"
+    assert rows[2][0] == "North"
+    assert doc.metadata["sheet_names"] == ["Report"]
+
+def test_read_only_mode(merged_workbook):
+    full = parse_excel(merged_workbook)
+    streamed = parse_excel(merged_workbook, read_only=True)
+    assert streamed.metadata["pages_count"] == full.metadata["pages_count"] == 1
+    rows = streamed.content_units[0].table["rows"]
+    # Merged cells are not filled without the merge map
+    assert rows[2][0] == ""
+    assert rows[3] == full.content_units[0].table["rows"][3]
+    assert streamed.metadata["warnings"]
+
+def test_rows_per_unit_splits_sheet(merged_workbook):
+    whole = parse_excel(merged_workbook)
+    blocks = parse_excel(merged_workbook, rows_per_unit=2)
+
+    assert len(blocks.content_units) == 2
+    assert [u.order_index for u in blocks.content_units] == [0, 1]
+    assert [u.order_index_in_page for u in blocks.content_units] == [0, 1]
+    headers = whole.content_units[0].table["rows"][0]
+    assert all(u.table["rows"][0] == headers for u in blocks.content_units)
+    # Data rows are carried over in order, numbering continues across blocks
+    data_rows = [row for u in blocks.content_units for row in u.table["rows"][1:]]
+    assert data_rows == whole.content_units[0].table["rows"][1:]
+    assert blocks.content_units[1].text.splitlines()[1].startswith("row 3:")
+
+def build_sheets(path, changed_sheet=None):
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for s in range(4):
+        ws = wb.create_sheet(f"S{s}")
+        ws.append(["Name", "Value"])
+        for r in range(5):
+            ws.append([f"s{s}r{r}" + ("!" if s == changed_sheet and r == 2 else ""), r])
+    wb.save(path)
+    return str(path)
+
+@pytest.mark.parametrize("read_only", [False, True])
+def test_reparse_reuses_unchanged_sheets(tmp_path, read_only):
+    previous = parse_excel(build_sheets(tmp_path / "a.xlsx"), read_only=read_only)
+    changed = build_sheets(tmp_path / "b.xlsx", changed_sheet=2)
+
+    full = parse_excel(changed, read_only=read_only)
+    incremental = parse_excel(changed, read_only=read_only, previous=previous)
+
+    assert incremental.metadata.pop("sheets_reused") == 3
+    assert incremental.doc_id == full.doc_id
+    assert incremental.metadata == full.metadata
+    assert incremental.content_units == full.content_units
+    assert [s["fingerprint"] == p["fingerprint"] for s, p in zip(full.metadata["sheets"], previous.metadata["sheets"])] == [True, True, False, True]
+
+def test_fingerprints_do_not_depend_on_block_size(tmp_path, monkeypatch):
+    from src.parsers import excel_parser
+    path = build_sheets(tmp_path / "a.xlsx")
+    expected = excel_parser.sheet_fingerprints(path)
+    # Sheet XML and shared strings are read in blocks; elements split across blocks must still match
+    monkeypatch.setattr(excel_parser, "_BLOCK_SIZE", 7)
+    assert excel_parser.sheet_fingerprints(path) == expected
+    assert [s["fingerprint"] for s in parse_excel(path).metadata["sheets"]] == list(expected.values())
+
+def test_read_only_workbook_closed_on_error(tmp_path, monkeypatch):
+    from src.parsers import excel_parser
+    opened = []
+    load_workbook = openpyxl.load_workbook
+    def tracking_load_workbook(*args, **kwargs):
+        opened.append(load_workbook(*args, **kwargs))
+        return opened[-1]
+    def failing_serializer(*args, **kwargs):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(excel_parser.openpyxl, "load_workbook", tracking_load_workbook)
+    monkeypatch.setattr(excel_parser.TableSerializer, "to_row_kv_text", failing_serializer)
+
+    with pytest.raises(RuntimeError):
+        parse_excel(build_sheets(tmp_path / "a.xlsx"), read_only=True)
+    assert opened[0]._archive.fp is None
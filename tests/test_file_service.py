@@ -0,0 +1,102 @@
+import io
+import time
+import asyncio
+import threading
+from starlette.datastructures import UploadFile
+from src.models.models import ParsedDocument, SourceInfo, ContentUnit
+from src.services import file_service as file_service_module
+from src.services.file_service import LocalFileService
+from src.services.s3_service import LocalS3Service
+
+def test_process_files_bounded_concurrency(tmp_path, monkeypatch):
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+
+    def slow_parser(path):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.1)
+        with lock:
+            state["running"] -= 1
+        return ParsedDocument(
+            doc_id=path,
+            source=SourceInfo(file_name="f", file_path=path, file_size=1),
+            content_units=[ContentUnit(type="text", text="text", order_index=0)]
+        )
+
+    monkeypatch.setattr(file_service_module, "get_parser_for_file", lambda name, options=None, progress=None, previous=None: slow_parser)
+    service = LocalFileService(s3_service=LocalS3Service(base_path=str(tmp_path)), max_concurrency=2)
+    files = [UploadFile(file=io.BytesIO(f"file {i}".encode()), filename=f"{i}.docx") for i in range(6)]
+
+    start = time.time()
+    result = asyncio.run(service.process_files(files, [str(i) for i in range(6)]))
+    elapsed = time.time() - start
+
+    assert state["peak"] == 2
+    assert len(result["parsed_links"]) == 6
+    assert result["parsed_links"][0].endswith("/parsed/0.json")
+    assert elapsed < 6 * 0.1
+
+class RecordingReader:
+    def __init__(self, data: bytes):
+        self._buffer = io.BytesIO(data)
+        self.read_sizes = []
+
+    def read(self, size: int = -1) -> bytes:
+        self.read_sizes.append(size)
+        return self._buffer.read(size)
+
+def test_upload_fileobj_streams_in_blocks(tmp_path):
+    from src.services.s3_service import COPY_BLOCK_SIZE
+    s3 = LocalS3Service(base_path=str(tmp_path))
+    data = b"x" * (COPY_BLOCK_SIZE * 2 + 10)
+    reader = RecordingReader(data)
+
+    asyncio.run(s3.upload_fileobj(reader, "initial/big.bin"))
+
+    assert all(size == COPY_BLOCK_SIZE for size in reader.read_sizes)
+    with open(s3.get_path("initial/big.bin"), "rb") as f:
+        assert f.read() == data
+
+def test_parser_reads_stored_original(tmp_path):
+    import os
+    sample = os.path.join(os.path.dirname(__file__), "..", "data", "test.docx")
+    with open(sample, "rb") as f:
+        data = f.read()
+    service = LocalFileService(s3_service=LocalS3Service(base_path=str(tmp_path)))
+
+    asyncio.run(service.process_files([UploadFile(file=io.BytesIO(data), filename="test.docx")], ["42"]))
+
+    stored = service.s3.get_path("initial/42.docx")
+    with open(stored, "rb") as f:
+        assert f.read() == data
+    with open(service.s3.get_path("parsed/42.json")) as f:
+        doc = ParsedDocument.model_validate_json(f.read())
+    assert doc.source.file_path == os.path.abspath(stored)
+
+def test_upload_is_atomic(tmp_path):
+    s3 = LocalS3Service(base_path=str(tmp_path))
+    asyncio.run(s3.upload_file("parsed/doc.json", b"old"))
+
+    class FailingReader:
+        def read(self, size=-1):
+            raise OSError("connection reset")
+
+    try:
+        asyncio.run(s3.upload_fileobj(FailingReader(), "parsed/doc.json"))
+    except OSError:
+        pass
+
+    with open(s3.get_path("parsed/doc.json"), "rb") as f:
+        assert f.read() == b"old"
+    assert sorted(p.name for p in (tmp_path / "parsed").iterdir()) == ["doc.json"]
+
+def test_iter_file_streams_blocks(tmp_path):
+    s3 = LocalS3Service(base_path=str(tmp_path))
+    asyncio.run(s3.upload_file("parsed/doc.json", b"abcdefghij"))
+
+    async def read_all():
+        return [block async for block in s3.iter_file("parsed/doc.json", block_size=4)]
+
+    assert asyncio.run(read_all()) == [b"abcd", b"efgh", b"ij"]
@@ -0,0 +1,133 @@
+import threading
+import time
+import pytest
+from types import SimpleNamespace
+from PIL import Image, ImageDraw
+from src.core.detector import get_parser_for_file
+from src.parsers import image_parser
+from src.parsers.image_parser import parse_image, preprocess_image
+from src.services import ocr_cache
+
+@pytest.fixture(autouse=True)
+def no_ocr_cache(monkeypatch):
+    # Importing api configures the OCR cache for the whole test session
+    monkeypatch.setattr(ocr_cache, "_ocr_cache", None)
+
+class FakeOCR:
+    def __init__(self):
+        self.images = []
+
+    def recognize(self, image):
+        self.images.append(image)
+        return "Scanned photo text", 0.9
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    fake = FakeOCR()
+    monkeypatch.setattr(image_parser, "get_ocr_service", lambda owner=None: fake)
+    return fake
+
+def photo(size=(4000, 3000), orientation=None):
+    img = Image.new("RGB", size, "white")
+    ImageDraw.Draw(img).rectangle((0, 0, size[0] // 2, size[1] // 4), fill=(200, 30, 30))
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    return img, exif
+
+def test_preprocess_downscales_rotates_and_grays(tmp_path):
+    img, exif = photo(orientation=6)
+    path = tmp_path / "photo.jpg"
+    img.save(path, exif=exif)
+
+    result = preprocess_image(Image.open(path), max_side=1000)
+    # Orientation 6 = rotated 90 degrees: portrait after transposing
+    assert result.size == (750, 1000)
+    assert result.mode == "L"
+
+def test_preprocess_drafts_mpo_photos(tmp_path):
+    img, _ = photo()
+    path = tmp_path / "photo.jpg"
+    img.save(path, format="MPO", save_all=True, append_images=[img])
+    opened = Image.open(path)
+    assert opened.format == "MPO"
+
+    result = preprocess_image(opened, max_side=1000)
+    # Decoded at a reduced scale, straight to grayscale
+    assert (opened.size, opened.mode) == ((1000, 750), "L")
+    assert result.size == (1000, 750)
+
+def test_preprocess_keeps_full_resolution_and_color(tmp_path):
+    img, _ = photo(size=(1200, 900))
+    result = preprocess_image(img, max_side=0, grayscale=False)
+    assert result.size == (1200, 900)
+    assert result.mode == "RGB"
+
+def test_preprocess_binarize():
+    img = Image.new("L", (100, 100), 200)
+    ImageDraw.Draw(img).rectangle((10, 10, 40, 40), fill=60)
+    result = preprocess_image(img, binarize=True)
+    assert sorted(color for _, color in result.getcolors()) == [0, 255]
+    assert result.getpixel((20, 20)) == 0
+    assert result.getpixel((80, 80)) == 255
+
+def test_parse_image_ocrs_preprocessed_image(tmp_path, fake_ocr):
+    img, exif = photo()
+    path = tmp_path / "photo.jpg"
+    img.save(path, exif=exif)
+
+    doc = parse_image(str(path), max_side=2000)
+    assert doc.content_units[0].text == "Scanned photo text"
+    assert doc.metadata['image_size'] == [4000, 3000]
+    assert doc.metadata['ocr_image_size'] == [2000, 1500]
+    assert fake_ocr.images[0].size == (2000, 1500)
+    assert fake_ocr.images[0].mode == "L"
+
+class FrameOCR:
+    """Reads the frame number from the frame width; the first frames are the slowest."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sizes = []
+
+    def recognize(self, image):
+        frame = image.width // 100
+        time.sleep(0.02 * (5 - frame))
+        with self.lock:
+            self.sizes.append(image.size)
+        return f"Text of frame {frame}", 0.9
+
+@pytest.fixture
+def fax_tiff(tmp_path):
+    frames = [Image.new("1", (100 * n, 300), 1) for n in range(1, 5)]
+    path = tmp_path / "fax.tiff"
+    frames[0].save(path, save_all=True, append_images=frames[1:], compression="group4")
+    return str(path)
+
+@pytest.mark.parametrize("workers", [0, 3])
+def test_parse_multi_frame_tiff(monkeypatch, fax_tiff, workers):
+    fake = FrameOCR()
+    monkeypatch.setattr(image_parser, "get_ocr_service", lambda owner=None: fake)
+    monkeypatch.setattr(image_parser, "get_ocr_pool", lambda: SimpleNamespace(workers=workers) if workers else None)
+
+    doc = get_parser_for_file(fax_tiff)(fax_tiff)
+    assert [u.page_number for u in doc.content_units] == [1, 2, 3, 4]
+    assert [u.order_index for u in doc.content_units] == [0, 1, 2, 3]
+    assert [u.text for u in doc.content_units] == [f"Text of frame {n}" for n in range(1, 5)]
+    assert doc.metadata['pages_count'] == 4
+    assert [p['image_size'] for p in doc.metadata['pages']] == [[100 * n, 300] for n in range(1, 5)]
+    assert doc.metadata['warnings'][0].startswith("Page 1: ")
+    assert sorted(fake.sizes) == [(100 * n, 300) for n in range(1, 5)]
+
+@pytest.mark.parametrize("file_name, format", [("photo.jpg", "MPO"), ("animation.png", "PNG")])
+def test_only_tiff_frames_are_pages(tmp_path, fake_ocr, file_name, format):
+    img, _ = photo(size=(400, 300))
+    path = tmp_path / file_name
+    img.save(path, format=format, save_all=True, append_images=[img.rotate(90)])
+    assert Image.open(path).n_frames == 2
+
+    doc = parse_image(str(path))
+    assert len(doc.content_units) == 1
+    assert doc.content_units[0].page_number is None
+    assert doc.metadata['image_size'] == [400, 300]
+    assert 'pages_count' not in doc.metadata
+    assert len(fake_ocr.images) == 1
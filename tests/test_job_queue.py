@@ -0,0 +1,97 @@
+import os
+import time
+import asyncio
+import pytest
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+from src.models.models import OutputOptions, ParseOptions
+from src.schemas import OutputFormat
+from src.services.job_queue import JobQueue, JobWorker
+from src.services.file_service import LocalFileService
+from src.services.s3_service import LocalS3Service
+
+SAMPLE_DOCX = os.path.join(os.path.dirname(__file__), "..", "data", "test.docx")
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+def test_claim_in_fifo_order(queue):
+    first = queue.enqueue("a.pdf", "initial/a.pdf", "h1", ParseOptions())
+    second = queue.enqueue("b.pdf", "initial/b.pdf", "h2", ParseOptions(use_ocr=False))
+
+    job = queue.claim_next()
+    assert job["id"] == first
+    assert job["status"] == "running"
+    assert queue.claim_next()["id"] == second
+    assert ParseOptions.model_validate_json(queue.get(second)["options"]).use_ocr is False
+    assert queue.claim_next() is None
+
+def test_progress_and_completion(queue):
+    job_id = queue.enqueue("a.pdf", "initial/a.pdf", "h1", ParseOptions())
+    queue.claim_next()
+    queue.update_progress(job_id, 3, 10)
+    assert (queue.get(job_id)["pages_done"], queue.get(job_id)["pages_total"]) == (3, 10)
+
+    queue.complete(job_id, "http://localhost/parsed/a.json", cache_hit=False)
+    job = queue.get(job_id)
+    assert job["status"] == "done"
+    assert job["parsed_link"].endswith("a.json")
+
+def test_requeue_stale(queue):
+    job_id = queue.enqueue("a.pdf", "initial/a.pdf", "h1", ParseOptions())
+    queue.claim_next()
+    assert queue.requeue_stale(stale_after_sec=60) == 0
+    assert queue.requeue_stale(stale_after_sec=-1) == 1
+    assert queue.get(job_id)["status"] == "queued"
+
+def test_worker_requeues_stale_jobs(queue):
+    job_id = queue.enqueue("a.pdf", "initial/a.pdf", "h1", ParseOptions())
+    queue.claim_next()
+
+    class FileService:
+        s3 = SimpleNamespace(get_path=lambda key: key)
+        async def parse_and_store(self, *args, **kwargs):
+            stop.set()
+            return {"parsed_link": "http://localhost/parsed/a.json", "cache_hit": False}
+
+    async def main():
+        worker = JobWorker(queue, FileService(), poll_interval=0.01, stale_check_interval=0.05, stale_after_sec=0)
+        await asyncio.wait_for(worker.run(stop), timeout=5)
+
+    stop = asyncio.Event()
+    # The worker that claimed the job died: a running worker picks it up again
+    asyncio.run(main())
+    assert queue.get(job_id)["status"] == "done"
+
+def test_job_endpoints(tmp_path, monkeypatch):
+    import api
+    s3 = LocalS3Service(base_path=str(tmp_path))
+    monkeypatch.setattr(api, "s3_service", s3)
+    monkeypatch.setattr(api, "file_service", LocalFileService(s3_service=s3))
+    monkeypatch.setattr(api, "job_queue", JobQueue(str(tmp_path / "jobs.sqlite3")))
+
+    with TestClient(api.app) as client:
+        with open(SAMPLE_DOCX, "rb") as f:
+            response = client.post("/jobs", files={"file": ("test.docx", f)})
+        assert response.status_code == 200
+        job_id = response.json()["job_id"]
+
+        deadline = time.time() + 30
+        status = client.get(f"/jobs/{job_id}").json()
+        while status["status"] in ("queued", "running") and time.time() < deadline:
+            time.sleep(0.1)
+            status = client.get(f"/jobs/{job_id}").json()
+
+        assert status["status"] == "done", status
+        assert status["pages_done"] == status["pages_total"] == 1
+        assert status["parsed_link"].endswith(f"{job_id}.json")
+
+        assert client.get("/jobs/unknown").status_code == 404
+        assert client.post("/jobs", files={"file": ("notes.txt", b"hi")}).status_code == 400
+
+def test_output_options_stored(queue):
+    job_id = queue.enqueue("a.pdf", "initial/a.pdf", "h1", ParseOptions(), output=OutputOptions(format=OutputFormat.JSON_GZIP))
+    job = queue.claim_next()
+    assert job["id"] == job_id
+    assert OutputOptions.model_validate_json(job["output_options"]).format == OutputFormat.JSON_GZIP
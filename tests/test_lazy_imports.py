@@ -0,0 +1,28 @@
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+def loaded_modules_after(code: str) -> set:
+    script = code + "\nimport sys, json; print(json.dumps(sorted(sys.modules)))"
+    out = subprocess.run(
+        [sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return set(json.loads(out.strip().splitlines()[-1]))
+
+def test_api_import_does_not_load_ocr_stack():
+    modules = loaded_modules_after("import api")
+    assert "torch" not in modules
+    assert "easyocr" not in modules
+    assert "pandas" not in modules
+
+def test_docx_parse_does_not_load_ocr_stack():
+    modules = loaded_modules_after(
+        "from src.core.detector import get_parser_for_file\n"
+        "get_parser_for_file('data/test.docx')('data/test.docx')"
+    )
+    assert "src.parsers.docx_parser" in modules
+    assert "torch" not in modules
+    assert "pdfplumber" not in modules
@@ -0,0 +1,46 @@
+import random
+import re
+import unicodedata
+from src.parsers.pdf_parser import super_clean_text
+from src.services.normalizer import Normalizer, _clean_cell_cached
+
+def legacy_clean_text(text):
+    if not text:
+        return ""
+    text = unicodedata.normalize('NFKC', text)
+    text = re.sub(r'(\w+)-\s*\n\s*(\w+)', r'\1\2', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+def random_texts(count=2000):
+    rnd = random.Random(0)
+    alphabet = list("abcXYZ019 -.,\n\t") + ["  ", "-\n", "- \n ", " ", " ", "\x1c", "ﬁ", "Ⅳ", "ё", "Привет", "tlie", "rvn", "a b c"]
+    return [
+        "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 40)))
+        for _ in range(count)
+    ]
+
+def test_clean_text_matches_legacy():
+    for text in random_texts():
+        assert Normalizer.clean_text(text) == legacy_clean_text(text)
+
+def test_clean_text_ascii_and_unicode():
+    assert Normalizer.clean_text("  in-\n  formation\t here ") == "information here"
+    # The word after a joined break is consumed, so a chained break stays
+    assert Normalizer.clean_text("a-\nbc-\nd") == legacy_clean_text("a-\nbc-\nd") == "abc- d"
+    # NFKC still applies to non-ASCII text
+    assert Normalizer.clean_text("ﬁle № 5") == "file No 5"
+
+def test_clean_pdf_text_matches_pipeline():
+    for text in random_texts():
+        legacy = super_clean_text(Normalizer.dehyphenate(legacy_clean_text(text)))
+        assert Normalizer.clean_pdf_text(text) == legacy
+        assert Normalizer.clean_pdf_cell(text) == legacy
+    assert Normalizer.clean_pdf_text("tlie  v a l u e\nvvas ok") == "the value was ok"
+
+def test_clean_cell_is_cached():
+    assert Normalizer.clean_cell(" 42 ") == "42"
+    hits = _clean_cell_cached.cache_info().hits
+    assert Normalizer.clean_cell(" 42 ") == "42"
+    assert _clean_cell_cached.cache_info().hits == hits + 1
+    long_cell = "x  " * 100
+    assert Normalizer.clean_cell(long_cell) == legacy_clean_text(long_cell)
@@ -0,0 +1,74 @@
+import os
+from PIL import Image
+from src.services.ocr_cache import OCRCache, configure_ocr_cache, recognize_cached
+
+class CountingOCR:
+    languages = ["en"]
+
+    def __init__(self):
+        self.recognized = []
+
+    def recognize(self, image):
+        self.recognized.append(image.size)
+        return f"text {image.size[0]}", 0.8
+
+    def recognize_batch(self, images):
+        return [self.recognize(image) for image in images]
+
+def test_key_depends_on_pixels_and_languages():
+    white = Image.new("L", (10, 10), 255)
+    black = Image.new("L", (10, 10), 0)
+    assert OCRCache.make_key(white, ["en"]) == OCRCache.make_key(white.copy(), ["en"])
+    assert OCRCache.make_key(white, ["en"]) != OCRCache.make_key(black, ["en"])
+    assert OCRCache.make_key(white, ["en"]) != OCRCache.make_key(white, ["ru", "en"])
+
+def test_roundtrip_and_eviction(tmp_path):
+    cache = OCRCache(str(tmp_path), max_bytes=100)
+    assert cache.get("missing") is None
+    cache.put("a", ("a" * 40, 0.5))
+    cache.put("b", ("b" * 40, 0.5))
+    # Reading "a" leaves "b" as the least recently used entry
+    assert cache.get("a") == ("a" * 40, 0.5)
+    cache.evict()
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+
+def test_recognize_cached_sends_only_misses(tmp_path):
+    configure_ocr_cache(str(tmp_path))
+    try:
+        ocr = CountingOCR()
+        images = [Image.new("L", (w, 5)) for w in (5, 6)]
+        results, hits = recognize_cached(ocr, images, batched=True)
+        assert hits == [False, False]
+        results, hits = recognize_cached(ocr, images + [Image.new("L", (7, 5))])
+        assert hits == [True, True, False]
+        assert [text for text, _ in results] == ["text 5", "text 6", "text 7"]
+        assert ocr.recognized == [(5, 5), (6, 5), (7, 5)]
+    finally:
+        configure_ocr_cache(None)
+
+def test_eviction_lists_the_directory_once_per_headroom(tmp_path, monkeypatch):
+    cache = OCRCache(str(tmp_path), max_bytes=2000)
+    entry_size = len(b'{"text": "aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa", "confidence": 0.5}')
+    scans = []
+    scandir = os.scandir
+    monkeypatch.setattr(os, "scandir", lambda path: scans.append(path) or scandir(path))
+    for i in range(200):
+        cache.put(f"{i:03d}", (chr(ord("a") + i % 26) * 40, 0.5))
+        cache.evict()
+    # Writes below the cap never list it; each eviction frees LOW_WATER headroom
+    written = 200 * entry_size
+    assert 0 < len(scans) <= written // (cache.max_bytes * (1 - cache.LOW_WATER))
+    assert cache.get("199") is not None
+    assert cache.get("000") is None
+
+def test_eviction_sees_other_processes_entries(tmp_path):
+    # Two caches on one directory stand for two processes: neither sees the other's writes
+    first = OCRCache(str(tmp_path), max_bytes=500)
+    second = OCRCache(str(tmp_path), max_bytes=500)
+    for i in range(20):
+        for cache in (first, second):
+            cache.put(f"{id(cache)}-{i}", ("x" * 40, 0.5))
+            cache.evict()
+    on_disk = sum(entry.stat().st_size for entry in os.scandir(str(tmp_path)))
+    assert on_disk <= 500
@@ -0,0 +1,67 @@
+import os
+import time
+import threading
+import pytest
+from PIL import Image
+from src.services.ocr_pool import OCRPool
+
+class FakeService:
+    """Stands in for OCRService in the worker processes (no models needed)."""
+    def __init__(self, languages):
+        self.pid = os.getpid()
+
+    def recognize(self, image):
+        if image.size == (13, 13):
+            os._exit(1)
+        time.sleep(0.05)
+        return f"{image.size[0]}x{image.size[1]}@{self.pid}", 0.9
+
+    def recognize_batch(self, images, batch_size=8):
+        return [self.recognize(image) for image in images]
+
+def fake_service(languages):
+    return FakeService(languages)
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = OCRPool(workers=1, threads_per_worker=1, max_queued_per_owner=2, service_factory=fake_service)
+    yield pool
+    pool.close()
+
+def test_pool_recognizes_and_keeps_order(pool):
+    images = [Image.new("L", (width, 10)) for width in range(20, 30)]
+    results = pool.recognize_batch("doc", images, batch_size=3)
+    assert [text.split("@")[0] for text, _ in results] == [f"{w}x10" for w in range(20, 30)]
+    # One warm worker served every task
+    assert len({text.split("@")[1] for text, _ in results}) == 1
+    assert pool.client("doc").extract_text(Image.new("L", (5, 5))).startswith("5x5@")
+
+def test_small_request_is_not_starved(pool):
+    done = []
+    lock = threading.Lock()
+
+    def on_done(name):
+        def callback(future):
+            with lock:
+                done.append(name)
+        return callback
+
+    def big_scan():
+        # Blocks in submit() once 2 tasks of this owner are waiting
+        for i in range(8):
+            pool.submit("scan", [Image.new("L", (30, 30))]).add_done_callback(on_done(f"scan{i}"))
+
+    thread = threading.Thread(target=big_scan)
+    thread.start()
+    time.sleep(0.1)
+    pool.recognize("image", Image.new("L", (10, 10)))
+    with lock:
+        done.append("image")
+    thread.join()
+    assert done.index("image") <= 3
+
+def test_dead_worker_fails_task_and_is_restarted(pool):
+    with pytest.raises(RuntimeError):
+        pool.recognize("doc", Image.new("L", (13, 13)))
+    text, _ = pool.recognize("doc", Image.new("L", (7, 7)))
+    assert text.startswith("7x7@")
@@ -0,0 +1,73 @@
+import os
+import io
+import asyncio
+from starlette.datastructures import UploadFile
+from src.models.models import ParsedDocument, ParseOptions, SourceInfo, ContentUnit
+from src.services.parse_cache import ParseCache
+from src.services.file_service import LocalFileService
+from src.services.s3_service import LocalS3Service
+
+SAMPLE_DOCX = os.path.join(os.path.dirname(__file__), "..", "data", "test.docx")
+
+def make_doc(doc_id: str, text: str = "hello") -> ParsedDocument:
+    return ParsedDocument(
+        doc_id=doc_id,
+        source=SourceInfo(file_name="a.txt", file_path="/tmp/a.txt", file_size=1),
+        content_units=[ContentUnit(type="text", text=text, order_index=0)]
+    )
+
+def test_key_depends_on_options():
+    k1 = ParseCache.make_key("abc", ".pdf", ParseOptions())
+    k2 = ParseCache.make_key("abc", ".pdf", ParseOptions(use_ocr=False))
+    k3 = ParseCache.make_key("abc", ".docx", ParseOptions())
+    assert len({k1, k2, k3}) == 3
+
+def test_key_ignores_options_without_effect_on_output():
+    pdf = ParseCache.make_key("abc", ".pdf", ParseOptions())
+    assert ParseCache.make_key("abc", ".pdf", ParseOptions(pdf_workers=4, ocr_batch_size=8)) == pdf
+    assert ParseCache.make_key("abc", ".pdf", ParseOptions(image_max_side=1000)) == pdf
+    docx = ParseCache.make_key("abc", ".docx", ParseOptions())
+    assert ParseCache.make_key("abc", ".docx", ParseOptions(use_ocr=False, excel_rows_per_unit=10)) == docx
+    xlsx = ParseCache.make_key("abc", ".xlsx", ParseOptions())
+    assert ParseCache.make_key("abc", ".xlsx", ParseOptions(excel_rows_per_unit=10)) != xlsx
+    png = ParseCache.make_key("abc", ".png", ParseOptions())
+    assert ParseCache.make_key("abc", ".png", ParseOptions(image_binarize=True)) != png
+
+def test_roundtrip(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    assert cache.get("missing") is None
+    cache.put("k", make_doc("d1"))
+    assert cache.get("k").doc_id == "d1"
+
+def test_lru_eviction(tmp_path):
+    entry_size = len(make_doc("d0", "x" * 100).model_dump_json())
+    # Room for two entries, also after evicting down to the low-water mark
+    cache = ParseCache(str(tmp_path), max_bytes=entry_size * 5 // 2)
+    cache.put("a", make_doc("d0", "x" * 100))
+    cache.put("b", make_doc("d0", "y" * 100))
+    # Make "a" the most recently used entry
+    assert cache.get("a") is not None
+    cache.put("c", make_doc("d0", "z" * 100))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+def test_second_upload_is_cache_hit(tmp_path):
+    service = LocalFileService(s3_service=LocalS3Service(base_path=str(tmp_path)))
+    with open(SAMPLE_DOCX, "rb") as f:
+        data = f.read()
+
+    def upload():
+        return UploadFile(file=io.BytesIO(data), filename="test.docx")
+
+    first = asyncio.run(service.process_files([upload()], ["1"]))
+    second = asyncio.run(service.process_files([upload()], ["2"]))
+
+    assert first["cache_hits"] == [False]
+    assert second["cache_hits"] == [True]
+    with open(os.path.join(str(tmp_path), "parsed", "1.json")) as f1, open(os.path.join(str(tmp_path), "parsed", "2.json")) as f2:
+        doc1 = ParsedDocument.model_validate_json(f1.read())
+        doc2 = ParsedDocument.model_validate_json(f2.read())
+    assert doc1.doc_id == doc2.doc_id
+    assert [c.text for c in doc1.chunks] == [c.text for c in doc2.chunks]
@@ -0,0 +1,223 @@
+import os
+import pytest
+from src.parsers.pdf_parser import forward_fill_table, parse_pdf, _page_ranges
+
+pypdf = pytest.importorskip("pypdf")
+
+SAMPLE_PDF = os.path.join(os.path.dirname(__file__), "..", "data", "test.pdf")
+
+@pytest.fixture
+def multi_page_pdf(tmp_path):
+    # Repeat the sample page so there is something to shard
+    reader = pypdf.PdfReader(SAMPLE_PDF)
+    writer = pypdf.PdfWriter()
+    for _ in range(5):
+        writer.add_page(reader.pages[0])
+    path = tmp_path / "multi.pdf"
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+def test_page_ranges_cover_all_pages():
+    ranges = _page_ranges(10, 2)
+    assert ranges[0][0] == 0
+    assert ranges[-1][1] == 10
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+def test_parallel_matches_serial(multi_page_pdf):
+    serial = parse_pdf(multi_page_pdf, use_ocr=False)
+    parallel = parse_pdf(multi_page_pdf, use_ocr=False, workers=3)
+
+    assert parallel.doc_id == serial.doc_id
+    assert parallel.metadata == serial.metadata
+    assert [u.model_dump() for u in parallel.content_units] == [u.model_dump() for u in serial.content_units]
+    assert {u.page_number for u in parallel.content_units} == {1, 2, 3, 4, 5}
+
+class FakeOCR:
+    def __init__(self, confidence=lambda image: 0.9):
+        self.single_calls = 0
+        self.batch_sizes = []
+        self.image_sizes = []
+        self.confidence = confidence
+
+    def recognize(self, image):
+        self.single_calls += 1
+        self.image_sizes.append(image.size)
+        return "Scanned page text that is long enough to be kept as a block.", self.confidence(image)
+
+    def recognize_batch(self, images):
+        self.batch_sizes.append(len(images))
+        return [self.recognize(img) for img in images]
+
+def without_timings(metadata):
+    pages = [{k: v for k, v in page.items() if k != 'ocr_time'} for page in metadata['pages']]
+    return {**metadata, 'pages': pages}
+
+@pytest.fixture
+def scanned_pdf(tmp_path):
+    writer = pypdf.PdfWriter()
+    for _ in range(5):
+        writer.add_blank_page(width=200, height=200)
+    path = tmp_path / "scanned.pdf"
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+def test_batched_ocr_matches_per_page(scanned_pdf, monkeypatch):
+    import src.parsers.pdf_parser as pdf_parser
+    fake = FakeOCR()
+    monkeypatch.setattr(pdf_parser, "get_ocr_service", lambda owner=None: fake)
+
+    per_page = parse_pdf(scanned_pdf)
+    assert fake.batch_sizes == []
+
+    batched = parse_pdf(scanned_pdf, ocr_batch_size=2)
+    assert fake.batch_sizes == [2, 2, 1]
+
+    assert batched.doc_id == per_page.doc_id
+    assert without_timings(batched.metadata) == without_timings(per_page.metadata)
+    assert [u.model_dump() for u in batched.content_units] == [u.model_dump() for u in per_page.content_units]
+    assert [u.page_number for u in batched.content_units] == [1, 2, 3, 4, 5]
+
+def test_reparse_reuses_unchanged_pages(tmp_path):
+    sample = pypdf.PdfReader(SAMPLE_PDF).pages[0]
+    writer = pypdf.PdfWriter()
+    writer.add_page(sample)
+    writer.add_blank_page(width=300, height=300)
+    previous_path = tmp_path / "previous.pdf"
+    writer.write(str(previous_path))
+    # A page inserted in front shifts every old page by one
+    writer = pypdf.PdfWriter()
+    writer.add_blank_page(width=100, height=100)
+    writer.add_page(sample)
+    writer.add_blank_page(width=300, height=300)
+    changed_path = tmp_path / "changed.pdf"
+    writer.write(str(changed_path))
+
+    previous = parse_pdf(str(previous_path), use_ocr=False)
+    full = parse_pdf(str(changed_path), use_ocr=False)
+    incremental = parse_pdf(str(changed_path), use_ocr=False, previous=previous)
+
+    assert incremental.metadata.pop("pages_reused") == 2
+    assert incremental.doc_id == full.doc_id
+    assert incremental.metadata == full.metadata
+    assert incremental.content_units == full.content_units
+    assert {u.page_number for u in incremental.content_units} == {2}
+
+
+def test_forward_fill_table():
+    table = [
+        ["Region", "City", "Sales"],
+        ["North", "A", "1"],
+        ["", "B", " "],
+        ["", "", "3"],
+        ["South", "C"],
+        ["", "", "", ""],
+    ]
+    assert forward_fill_table(table) == [
+        ["Region", "City", "Sales"],
+        ["North", "A", "1"],
+        ["North", "B", "1"],
+        ["North", "B", "3"],
+        ["South", "C"],
+        ["South", "C", "", ""],
+    ]
+
+def test_ocr_escalates_dpi_on_low_confidence(scanned_pdf, monkeypatch):
+    import src.parsers.pdf_parser as pdf_parser
+    # Confident only on images rendered at the highest resolution
+    fake = FakeOCR(confidence=lambda image: 0.9 if image.size[0] > 600 else 0.2)
+    monkeypatch.setattr(pdf_parser, "get_ocr_service", lambda owner=None: fake)
+
+    doc = parse_pdf(scanned_pdf, ocr_batch_size=5)
+    # 200pt pages: 5 renders at 150 dpi, then 5 at 300 dpi
+    assert fake.batch_sizes == [5, 5]
+    assert [size[0] for size in fake.image_sizes] == [417] * 5 + [834] * 5
+    assert [page['ocr_dpi'] for page in doc.metadata['pages']] == [300] * 5
+    assert all(page['ocr_regions'] == 0 for page in doc.metadata['pages'])
+
+    fake = FakeOCR()
+    monkeypatch.setattr(pdf_parser, "get_ocr_service", lambda owner=None: fake)
+    doc = parse_pdf(scanned_pdf)
+    assert fake.single_calls == 5
+    assert [page['ocr_dpi'] for page in doc.metadata['pages']] == [150] * 5
+
+def write_captioned_image_pdf(path):
+    """One 400x400pt page: a short caption and a 200x100pt image below it."""
+    pixels = bytes([255, 255, 255]) * 64
+    content = b"BT /F1 12 Tf 50 350 Td (Figure 1) Tj ET q 200 0 0 100 50 200 cm /Im1 Do Q"
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 400 400] /Contents 4 0 R"
+        b" /Resources << /Font << /F1 5 0 R >> /XObject << /Im1 6 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Type /XObject /Subtype /Image /Width 8 /Height 8 /ColorSpace /DeviceRGB"
+        b" /BitsPerComponent 8 /Length %d >>\nstream\n%s\nendstream" % (len(pixels), pixels),
+    ]
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(data)
+
+def test_ocr_only_image_regions_of_page_with_text(tmp_path, monkeypatch):
+    import src.parsers.pdf_parser as pdf_parser
+    fake = FakeOCR()
+    monkeypatch.setattr(pdf_parser, "get_ocr_service", lambda owner=None: fake)
+    path = tmp_path / "captioned.pdf"
+    write_captioned_image_pdf(path)
+
+    doc = parse_pdf(str(path))
+    # Only the 200x100pt image is rendered, not the 400x400pt page
+    assert fake.image_sizes == [(417, 208)]
+    page = doc.metadata['pages'][0]
+    assert page['ocr_regions'] == 1
+    assert page['ocr_dpi'] == 150
+    assert page['ocr_time'] >= 0
+    text = " ".join(u.text for u in doc.content_units)
+    assert text.startswith("Figure 1 ")
+    assert "Scanned page text" in text
+
+def test_ocr_cache_skips_repeated_pages(scanned_pdf, tmp_path, monkeypatch):
+    import src.parsers.pdf_parser as pdf_parser
+    from src.services.ocr_cache import configure_ocr_cache
+    fake = FakeOCR()
+    monkeypatch.setattr(pdf_parser, "get_ocr_service", lambda owner=None: fake)
+    configure_ocr_cache(str(tmp_path / "ocr_cache"))
+    try:
+        # The 5 blank pages render identically: only the first one is recognized
+        first = parse_pdf(scanned_pdf)
+        assert fake.single_calls == 1
+        assert first.metadata['ocr_cache'] == {'hits': 4, 'misses': 1, 'hit_rate': 0.8}
+        second = parse_pdf(scanned_pdf, ocr_batch_size=5)
+        assert fake.batch_sizes == []
+        assert second.metadata['ocr_cache'] == {'hits': 5, 'misses': 0, 'hit_rate': 1.0}
+        assert [u.text for u in second.content_units] == [u.text for u in first.content_units]
+    finally:
+        configure_ocr_cache(None)
+
+def test_batched_ocr_yields_text_pages_without_waiting(multi_page_pdf, monkeypatch):
+    import pdfplumber
+    from src.parsers import pdf_parser
+
+    parsed = []
+    parse_page = pdf_parser._parse_page
+    def counting_parse_page(page, page_number, *args, **kwargs):
+        parsed.append(page_number)
+        return parse_page(page, page_number, *args, **kwargs)
+    monkeypatch.setattr(pdf_parser, "_parse_page", counting_parse_page)
+
+    with pdfplumber.open(multi_page_pdf) as pdf:
+        pages = pdf_parser._iter_parsed_pages(enumerate(pdf.pages, start=1), True, 8)
+        assert next(pages)['page_number'] == 1
+        # The sample page has text: nothing waits for OCR, so nothing is held back
+        assert parsed == [1]
+        assert [r['page_number'] for r in pages] == [2, 3, 4, 5]
@@ -44,3 +44,19 @@ def test_to_row_kv_text_special_chars():
     result = TableSerializer.to_row_kv_text(rows)
     # Should escape double quotes to single quotes as per implementation
     assert 'Key="Quote\'"' in result
+
+def test_row_bodies_match_row_body():
+    headers = ["Name", "Rate %", "col_2"]
+    rows = [
+        ["a", 'say "hi"', "50%"],
+        [1, None, 2.5],
+        ["x\x01y", "", "z"],
+    ]
+    expected = [TableSerializer.row_body(row, headers) for row in rows]
+    assert TableSerializer.row_bodies(rows, headers) == expected
+    assert expected[0] == '{Name="a", Rate %="say \'hi\'", col_2="50%"}'
+    # Ragged rows and quoted headers take the per-row path
+    ragged = [["a"], ["b", "c", "d", "e"]]
+    assert TableSerializer.row_bodies(ragged, headers) == [TableSerializer.row_body(r, headers) for r in ragged]
+    quoted = ['say "x"', "b", "c"]
+    assert TableSerializer.row_bodies(rows, quoted) == [TableSerializer.row_body(r, quoted) for r in rows]
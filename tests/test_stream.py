@@ -0,0 +1,49 @@
+import os
+import pytest
+from src.core.detector import get_stream_for_file
+from src.models.models import ContentUnit
+from src.parsers.docx_parser import iter_units, parse_docx
+from src.services.chunker import Chunker
+
+SAMPLE_DOCX = os.path.join(os.path.dirname(__file__), "..", "data", "test.docx")
+
+def test_stream_matches_list_parser():
+    stream = iter_units(SAMPLE_DOCX)
+    assert stream.doc_id is None
+    units = list(stream)
+    doc = parse_docx(SAMPLE_DOCX)
+
+    assert stream.finished
+    assert stream.doc_id == doc.doc_id
+    assert stream.metadata == doc.metadata
+    assert units == doc.content_units
+
+def test_stream_is_single_use():
+    stream = get_stream_for_file(SAMPLE_DOCX)(SAMPLE_DOCX)
+    list(stream)
+    with pytest.raises(RuntimeError):
+        list(stream)
+
+def test_iter_chunks_emits_before_input_is_exhausted():
+    consumed = []
+
+    def units():
+        for i in range(10):
+            consumed.append(i)
+            yield ContentUnit(type="text", text=f"Paragraph {i} " + "x" * 60, page_number=i + 1, order_index=i)
+
+    chunker = Chunker(chunk_size=100, chunk_overlap=10)
+    first = next(chunker.iter_chunks(units(), "doc1"))
+    assert "Paragraph 0" in first.text
+    assert len(consumed) < 10
+
+def test_iter_chunks_matches_split_units():
+    chunker = Chunker(chunk_size=100, chunk_overlap=10)
+    units = [
+        ContentUnit(type="text", text="A" * 150, page_number=1, order_index=0),
+        ContentUnit(type="table", text="t" * 20, table={"rows": [["a"], ["b"]]}, page_number=1, order_index=1),
+        ContentUnit(type="text", text="Tail", page_number=2, order_index=2),
+    ]
+    streamed = [c.text for c in chunker.iter_chunks(iter(units), "doc1")]
+    listed = [c.text for c in chunker.split_units(units, "doc1")]
+    assert streamed == listed
@@ -0,0 +1,26 @@
+from src.services.tokenizer import TokenCounter, estimate_tokens
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("Hello, world!") == 4
+    # Long words, numbers and Cyrillic take several tokens
+    assert estimate_tokens("internationalization") == 4
+    assert estimate_tokens("123456") == 2
+    assert estimate_tokens("Привет") == 2
+
+def test_token_counter_memoizes():
+    calls = []
+    def tokenizer(text):
+        calls.append(text)
+        return len(text.split())
+
+    counter = TokenCounter(tokenizer, max_cached_len=10)
+    assert counter("a b") == 2
+    assert counter("a b") == 2
+    assert counter.count_many(["a b", "c", "c"]) == [2, 1, 1]
+    assert calls == ["a b", "c"]
+    # Long strings are not cached
+    long_text = "x " * 20
+    counter(long_text)
+    counter(long_text)
+    assert calls.count(long_text) == 2